@@ -0,0 +1,72 @@
+import re
+
+from .model.chart.bundle_layout import BundleLayout
+from .svg_chart_builder import DEFAULT_HEIGHT, DEFAULT_WIDTH, PX_TO_PT
+
+# size and position attributes of a chart's root element, replaced by its place in the bundle
+_ROOT_GEOMETRY = re.compile(rb'\s(?:x|y|width|height)="[^"]*"')
+# ids and references to them, e.g. clip paths, which are prefixed per chart
+_ID_REFERENCES = re.compile(rb'(\sid="|url\(#|href="#)')
+
+
+def compose_svg(
+    charts: list[tuple[bytes, int | None, int | None]], layout: BundleLayout
+) -> bytes:
+    """
+    Composes rendered SVG charts into a single SVG document.
+
+    Parameters:
+    charts (list[tuple[bytes, int | None, int | None]]): Rendered charts with their height and width in pixels,
+                                                         None sizes mean the default chart size.
+    layout (BundleLayout): Whether the charts are stacked vertically or placed side by side.
+
+    Returns:
+    bytes: The composite SVG document.
+
+    Notes:
+    - The root <svg> element of each chart is nested in the document and positioned with x, y, width and height,
+      so the charts stay selectable and stylable text.
+    - Ids inside charts are prefixed with the index of the chart, so they can't collide.
+    - The document is sized in points like the charts themselves, so it's displayed at the same scale.
+    """
+    nested: list[bytes] = []
+    offset = 0
+    total_width = 0
+    total_height = 0
+
+    for i, (content, height, width) in enumerate(charts):
+        if height is None or width is None:
+            width, height = DEFAULT_WIDTH, DEFAULT_HEIGHT
+
+        x, y = (0, offset) if layout == BundleLayout.VERTICAL else (offset, 0)
+        nested.append(_nest(content, i, x, y, width, height))
+
+        if layout == BundleLayout.VERTICAL:
+            offset += height
+            total_width = max(total_width, width)
+            total_height = offset
+        else:
+            offset += width
+            total_width = offset
+            total_height = max(total_height, height)
+
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" '
+        f'width="{total_width * PX_TO_PT:g}pt" height="{total_height * PX_TO_PT:g}pt" '
+        f'viewBox="0 0 {total_width} {total_height}">'
+    ).encode() + b"".join(nested) + b"</svg>"
+
+
+def _nest(content: bytes, index: int, x: int, y: int, width: int, height: int) -> bytes:
+    """
+    Turns a chart document into an <svg> element placed at x, y, dropping the XML declaration and doctype.
+    """
+    start = content.index(b"<svg")
+    end = content.index(b">", start)
+    root = _ROOT_GEOMETRY.sub(b"", content[start:end])
+    body = content[end:]
+
+    if b'id="' in body:
+        body = _ID_REFERENCES.sub(rb"\1c" + str(index).encode() + b"-", body)
+
+    return root + f' x="{x}" y="{y}" width="{width}" height="{height}"'.encode() + body
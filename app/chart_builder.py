@@ -1,57 +1,127 @@
+import io
 import logging
-from uuid import UUID
+import os
+import re
 import matplotlib
-import matplotlib.pyplot as plt
+import xml.etree.ElementTree as ElementTree
+from dotenv import load_dotenv
+from matplotlib import font_manager
+from matplotlib.backends.backend_svg import FigureCanvasSVG
+from matplotlib.figure import Figure
 
-from . import chart_manager
+from .chart_style import GITHUB_BG_COLOR, GITHUB_FG_COLOR, PIE_CHART_ITEMS
+from .model.chart.chart_format import ChartFormat
 from .model.wakatime.wakatime_item import WakatimeItem
 
-custom_font = {
-    "font.family": "sans-serif",
-    "font.serif": ["Segoe UI"],
-}
+log = logging.getLogger(__name__)
+log.setLevel(logging.DEBUG)
 
-matplotlib.rcParams.update(custom_font)
+_ = load_dotenv()
 
-GITHUB_BG_COLOR: str = "#0D1117"
-GITHUB_FG_COLOR: str = "#C3D1D9"
+# shipped with matplotlib, so it's available on every image without system fonts
+DEFAULT_FONT_FAMILY: str = "DejaVu Sans"
+FONT_PATH: str | None = os.getenv("CHART_FONT_PATH") or None
 
-log = logging.getLogger(__name__)
-log.setLevel(logging.DEBUG)
+# compact SVGs keep text as <text> drawn with the viewer's fonts instead of embedding glyph paths,
+# round coordinates to SVG_PRECISION decimals and drop everything that isn't drawn
+SVG_COMPACT: bool = os.getenv("CHART_SVG_COMPACT", "true").lower() in ("1", "true", "yes")
+SVG_PRECISION: int = 2
+
+SVG_NAMESPACE: str = "http://www.w3.org/2000/svg"
+NUMERIC_ATTRIBUTES: tuple[str, ...] = ("d", "x", "y", "width", "height", "transform", "viewBox")
+
+# without them the PNG and SVG outputs change on every render, e.g. by their creation date
+SVG_METADATA: dict[str, str | None] = {"Creator": None, "Date": None, "Format": None, "Type": None}
+PNG_METADATA: dict[str, str | None] = {"Software": None}
 
 
-def create_pie_chart(
+def _resolve_font() -> str:
+    """
+    Resolves the chart font once, so renders never search for a missing font and fall back.
+
+    Returns:
+    str: Family name of the font registered from CHART_FONT_PATH, or DEFAULT_FONT_FAMILY.
+    """
+    family = DEFAULT_FONT_FAMILY
+
+    if FONT_PATH is not None:
+        font_manager.fontManager.addfont(FONT_PATH)
+        family = font_manager.FontProperties(fname=FONT_PATH).get_name()
+
+    # findfont() caches the lookup, later renders resolve the font without scanning the font list
+    path = font_manager.findfont(
+        font_manager.FontProperties(family=family), fallback_to_default=False
+    )
+    log.debug(f"Resolved chart font {family} to {path}")
+
+    return family
+
+
+FONT_FAMILY: str = _resolve_font()
+
+# the font stack of compact SVGs starts with the font the legend was laid out with
+SVG_FONT_STACK: str = f"'{FONT_FAMILY}', 'Segoe UI', Helvetica, Arial, sans-serif"
+
+matplotlib.rcParams.update(
+    {"font.family": [FONT_FAMILY], "svg.fonttype": "none" if SVG_COMPACT else "path"}
+)
+
+
+def render_pie_chart(
     data_list: list[WakatimeItem],
-    uuid: UUID,
     colors_data: dict[str, str] | None,
     height: int | None,
     width: int | None,
-) -> None:
+    output_format: ChartFormat = ChartFormat.SVG,
+) -> bytes:
     """
-    Creates a pie chart using Matplotlib based on the provided data.
+    Renders a pie chart into SVG, PNG or WebP using Matplotlib based on the provided data.
 
     Parameters:
     data_list (list[WakatimeItem]): A list of WakatimeItem objects containing data for the pie chart.
-    uuid (UUID): A unique identifier for the chart.
     colors_data (dict[str, str] | None): A dictionary mapping item names to colors. If None, default colors are used.
     height (int | None): Height of the chart in inches. If None, uses default size.
     width (int | None): Width of the chart in inches. If None, uses default size.
+    output_format (ChartFormat): Format of the rendered chart.
 
     Returns:
-    None
+    bytes: The rendered chart, an SVG document compacted by _compact_svg() if SVG_COMPACT is enabled.
 
     Notes:
-    - This function creates a pie chart with the top 5 items from data_list based on percent.
+    - This function creates a pie chart with the top PIE_CHART_ITEMS items from data_list based on percent.
     - If colors_data is provided, it maps colors to corresponding items; otherwise, default colors are used.
-    - The chart is saved using chart_manager.save_chart() with the provided uuid.
+    - The figure is owned by this call and never registered in pyplot, so concurrent renders in
+      different threads don't share state and the figure is released as soon as the call returns.
     """
-    log.info(f"Creating pie chart {uuid}")
-    box, (left_plot, right_plot) = plt.subplots(1, 2)  # type: ignore[all]
+    log.info("Rendering pie chart")
+    box = Figure()
+    _ = FigureCanvasSVG(box)
+
+    try:
+        content = _draw_pie_chart(box, data_list, colors_data, height, width, output_format)
+    finally:
+        box.clear()
 
-    percents: list[float] = [data.percent for data in data_list[:5]]
-    names: list[str] = [data.name for data in data_list[:5]]
-    hours: list[int] = [data.hours for data in data_list[:5]]
-    minutes: list[int] = [data.minutes for data in data_list[:5]]
+    if output_format == ChartFormat.SVG and SVG_COMPACT:
+        return _compact_svg(content)
+
+    return content
+
+
+def _draw_pie_chart(
+    box: Figure,
+    data_list: list[WakatimeItem],
+    colors_data: dict[str, str] | None,
+    height: int | None,
+    width: int | None,
+    output_format: ChartFormat,
+) -> bytes:
+    left_plot, right_plot = box.subplots(1, 2)  # type: ignore[all]
+
+    percents: list[float] = [data.percent for data in data_list[:PIE_CHART_ITEMS]]
+    names: list[str] = [data.name for data in data_list[:PIE_CHART_ITEMS]]
+    hours: list[int] = [data.hours for data in data_list[:PIE_CHART_ITEMS]]
+    minutes: list[int] = [data.minutes for data in data_list[:PIE_CHART_ITEMS]]
 
     colors = _map_colors(colors_data, data_list)
 
@@ -89,7 +159,18 @@ def create_pie_chart(
 
     box.subplots_adjust(right=0.95, left=0.1)
 
-    chart_manager.save_chart(box, uuid)
+    buffer = io.BytesIO()
+
+    match output_format:
+        case ChartFormat.SVG:
+            box.savefig(buffer, format="svg", metadata=SVG_METADATA)  # type: ignore[all]
+        case ChartFormat.PNG:
+            box.savefig(buffer, format="png", metadata=PNG_METADATA)  # type: ignore[all]
+        case ChartFormat.WEBP:
+            # charts are flat colors, lossless WebP is both sharper and smaller than lossy
+            box.savefig(buffer, format="webp", pil_kwargs={"lossless": True})  # type: ignore[all]
+
+    return buffer.getvalue()
 
 
 def _map_colors(
@@ -109,13 +190,13 @@ def _map_colors(
     Notes:
     - This function maps colors to items based on the item_colors dictionary.
     - If item_colors is None, returns None indicating no color mapping.
-    - Uses default colors from plt.get_cmap("tab10") for items without specified colors.
+    - Uses default colors from the "tab10" colormap for items without specified colors.
     """
     if item_colors is None:
         return None
 
     colors: list[str | tuple[float, float, float, float]] = []
-    defaultColors = plt.get_cmap("tab10")
+    defaultColors = matplotlib.colormaps["tab10"]
 
     for index, item in enumerate(items):
         found = False
@@ -130,3 +211,139 @@ def _map_colors(
             _ = colors.append(defaultColors(index))
 
     return colors
+
+
+def _compact_svg(content: bytes) -> bytes:
+    """
+    Shrinks an SVG written by matplotlib without changing how it's drawn.
+
+    Parameters:
+    content (bytes): An SVG document written with svg.fonttype "none".
+
+    Returns:
+    bytes: The compacted SVG document.
+
+    Notes:
+    - Ids that nothing refers to and the groups left without attributes are dropped, their children are kept.
+    - Numbers are rounded to SVG_PRECISION decimals and whitespace between path commands is removed.
+    - The font family repeated by every <text> is replaced with a single SVG_FONT_STACK rule in the stylesheet.
+    - The DOCTYPE and the whitespace between elements are dropped, the XML declaration is kept.
+    """
+    referenced_ids = set(re.findall(rb"#([\w.\-]+)\)|href=\"#([\w.\-]+)\"", content))
+    referenced = {match.decode() for pair in referenced_ids for match in pair if match}
+
+    root = ElementTree.fromstring(content)
+    _compact_element(root, referenced)
+
+    for style in root.iter(f"{{{SVG_NAMESPACE}}}style"):
+        style.text = (style.text or "") + f"text{{font-family:{SVG_FONT_STACK}}}"
+
+    # SVG is written as the default namespace by hand, registering it would change the output of every other
+    # ElementTree user in the process
+    for element in root.iter():
+        element.tag = element.tag.removeprefix(f"{{{SVG_NAMESPACE}}}")
+
+    root.attrib = {"xmlns": SVG_NAMESPACE, **root.attrib}
+
+    return b'<?xml version="1.0" encoding="utf-8"?>\n' + ElementTree.tostring(root).replace(b" />", b"/>")
+
+
+def _compact_element(element: ElementTree.Element, referenced_ids: set[str]) -> None:
+    is_text = element.tag == f"{{{SVG_NAMESPACE}}}text"
+
+    if not is_text and (element.text or "").strip() == "":
+        element.text = None
+
+    children: list[ElementTree.Element] = []
+
+    for child in element:
+        _compact_element(child, referenced_ids)
+        child.tail = None
+
+        # a group without attributes doesn't change how its children are drawn
+        if child.tag == f"{{{SVG_NAMESPACE}}}g" and len(child.attrib) == 0:
+            children.extend(child)
+        else:
+            children.append(child)
+
+    element[:] = children
+
+    if element.get("id") is not None and element.get("id") not in referenced_ids:
+        del element.attrib["id"]
+
+    for attribute in NUMERIC_ATTRIBUTES:
+        value = element.get(attribute)
+
+        if value is not None:
+            element.set(attribute, _compact_numbers(value, attribute == "d"))
+
+    # matplotlib rotates every text by -0 degrees
+    if is_text and (element.get("transform") or "").startswith("rotate(-0 "):
+        del element.attrib["transform"]
+
+    style = element.get("style")
+
+    if style is not None:
+        element.set("style", _compact_style(style))
+
+
+def _compact_numbers(value: str, is_path: bool) -> str:
+    value = re.sub(r"-?\d+\.\d+", lambda match: _round(float(match.group())), value)
+
+    if is_path:
+        value = re.sub(r"\s*([MLQCZz])\s*", r"\1", value).strip()
+
+    return value
+
+
+def _compact_style(style: str) -> str:
+    """
+    Removes whitespace from an inline style and replaces the font shorthand with its size, style, variant and weight,
+    the family is set once by the stylesheet.
+    """
+    declarations: list[str] = []
+
+    for declaration in style.split(";"):
+        name, _, value = declaration.partition(":")
+        name, value = name.strip(), value.strip()
+
+        if name == "font":
+            declarations.extend(_font_declarations(value))
+        elif name == "text-anchor" and value == "start":
+            continue
+        elif name != "":
+            declarations.append(f"{name}:{value}")
+
+    return ";".join(declarations)
+
+
+def _font_declarations(font: str) -> list[str]:
+    """
+    Splits a font shorthand written by matplotlib, e.g. "italic 700 10px 'DejaVu Sans'", into longhand declarations
+    without the family. Style, variant and weight are only written by matplotlib if they aren't normal.
+    """
+    tokens = font.split(" ")
+    size_index = next((i for i, token in enumerate(tokens) if token.endswith("px")), None)
+
+    if size_index is None:
+        return [f"font:{font}"]
+
+    declarations: list[str] = []
+
+    for token in tokens[:size_index]:
+        if token in ("italic", "oblique"):
+            declarations.append(f"font-style:{token}")
+        elif token == "small-caps":
+            declarations.append(f"font-variant:{token}")
+        else:
+            declarations.append(f"font-weight:{token}")
+
+    declarations.append(f"font-size:{tokens[size_index]}")
+
+    return declarations
+
+
+def _round(value: float) -> str:
+    rounded = f"{value:.{SVG_PRECISION}f}".rstrip("0").rstrip(".")
+
+    return "0" if rounded == "-0" else rounded
@@ -1,31 +1,72 @@
+import asyncio
 import datetime
 import logging
 import os
+import threading
+import time
+from collections import OrderedDict
 from uuid import UUID
-from matplotlib.figure import Figure
+from dotenv import load_dotenv
+
+_ = load_dotenv()
 
 PLOTS_DIRECTORY: str = "plots"
 DATE_SEPARATOR: str = "_"
+TEMP_SUFFIX: str = ".tmp"
+
+# charts are served from memory, writing them to PLOTS_DIRECTORY is only needed to keep a copy on disk
+PERSIST_CHARTS: bool = os.getenv("PERSIST_CHARTS", "false").lower() in ("1", "true", "yes")
+
+# retention of the PLOTS_DIRECTORY, 0 disables the limit
+MAX_BYTES: int = int(os.getenv("CHART_STORE_MAX_BYTES", str(512 * 1024 * 1024)))
+MAX_FILES: int = int(os.getenv("CHART_STORE_MAX_FILES", "10000"))
+MAX_AGE_SECONDS: float = float(os.getenv("CHART_STORE_MAX_AGE_SECONDS", str(7 * 24 * 3600)))
+JANITOR_INTERVAL_SECONDS: float = float(
+    os.getenv("CHART_STORE_JANITOR_INTERVAL_SECONDS", "300")
+)
 
 log = logging.getLogger(__name__)
 log.setLevel(logging.DEBUG)
 
 
-def save_chart(figure: Figure, uuid: UUID):
+class _StoredChart:
+    path: str
+    size: int
+    created_at: float
+
+    def __init__(self, path: str, size: int, created_at: float) -> None:
+        self.path = path
+        self.size = size
+        self.created_at = created_at
+
+
+# ordered from the least to the most recently used chart
+_index: OrderedDict[UUID, _StoredChart] | None = None
+_total_bytes: int = 0
+_index_lock = threading.Lock()
+
+
+def save_chart(content: bytes, uuid: UUID, extension: str = "svg"):
     """
-    Saves a matplotlib Figure object as an SVG file with the specified UUID and current date.
+    Saves a rendered chart as a file with the specified UUID and current date.
 
     Parameters:
-    figure (Figure): A matplotlib Figure object to save.
+    content (bytes): A rendered chart to save.
     uuid (UUID): A unique identifier for the chart.
+    extension (str): File extension of the chart's format, e.g. "svg" or "png".
 
     Returns:
     None
 
     Notes:
-    - This function saves the plot as an SVG file in the PLOTS_DIRECTORY with the format "{uuid}_{current_date}.svg".
+    - This function saves the plot in the PLOTS_DIRECTORY with the format "{uuid}_{current_date}.{extension}".
     - Creates the PLOTS_DIRECTORY if it doesn't exist.
+    - The file is written to a temporary file and renamed, so readers never see a partial chart.
+    - The saved file is added to the index used by find_by_uuid(), evicting the least recently used
+      charts if MAX_FILES or MAX_BYTES is exceeded.
     """
+    global _total_bytes
+
     log.debug(f"Saving plot {uuid}")
 
     date = datetime.datetime.now()
@@ -34,7 +75,28 @@ def save_chart(figure: Figure, uuid: UUID):
     if not os.path.exists(PLOTS_DIRECTORY):
         os.makedirs(PLOTS_DIRECTORY)
 
-    figure.savefig(f"{PLOTS_DIRECTORY}/{uuid}{DATE_SEPARATOR}{date}.svg")  # type: ignore[all]
+    path = os.path.join(PLOTS_DIRECTORY, f"{uuid}{DATE_SEPARATOR}{date}.{extension}")
+    temp_path = f"{path}{TEMP_SUFFIX}"
+
+    with open(temp_path, "wb") as file:
+        _ = file.write(content)
+
+    os.replace(temp_path, path)
+
+    index = _get_index()
+
+    with _index_lock:
+        previous = index.pop(uuid, None)
+
+        if previous is not None:
+            _total_bytes -= previous.size
+
+        index[uuid] = _StoredChart(path, len(content), time.time())
+        _total_bytes += len(content)
+
+        evicted = _pop_over_limits(index)
+
+    _remove_files(evicted)
 
 
 def find_by_uuid(uuid: UUID) -> str | None:
@@ -48,13 +110,156 @@ def find_by_uuid(uuid: UUID) -> str | None:
     str | None: The path to the plot file if found, otherwise None.
 
     Notes:
-    - This function searches for a plot file in the PLOTS_DIRECTORY with a filename containing the given UUID.
+    - This function looks the plot file up in an in-memory index from UUID to path.
+    - The index is built from the PLOTS_DIRECTORY once and kept up to date by save_chart() and evict().
+    - A found chart becomes the most recently used one.
     - Returns the full path to the plot file if found, otherwise returns None.
     """
     log.debug(f"Searching plot {uuid}")
 
-    for plot in os.listdir(PLOTS_DIRECTORY):
-        if str(uuid) in plot:
-            return os.path.join(PLOTS_DIRECTORY, plot)
+    index = _get_index()
+
+    with _index_lock:
+        chart = index.get(uuid)
+
+        if chart is None:
+            return None
+
+        index.move_to_end(uuid)
+
+        return chart.path
+
+
+def evict() -> int:
+    """
+    Removes charts older than MAX_AGE_SECONDS and the least recently used charts above MAX_FILES or MAX_BYTES.
+
+    Returns:
+    int: The number of removed charts.
+    """
+    global _total_bytes
+
+    index = _get_index()
+    now = time.time()
+
+    with _index_lock:
+        expired: list[_StoredChart] = []
+
+        if MAX_AGE_SECONDS > 0:
+            for uuid in [
+                uuid
+                for uuid, chart in index.items()
+                if now - chart.created_at > MAX_AGE_SECONDS
+            ]:
+                chart = index.pop(uuid)
+                _total_bytes -= chart.size
+                expired.append(chart)
+
+        evicted = expired + _pop_over_limits(index)
+
+    _remove_files(evicted)
+
+    if len(evicted) != 0:
+        log.info(f"Evicted {len(evicted)} charts from {PLOTS_DIRECTORY}")
+
+    return len(evicted)
+
+
+def stats() -> dict[str, int]:
+    """
+    Returns the number of stored charts and their total size in bytes.
+    """
+    index = _get_index()
+
+    with _index_lock:
+        return {"files": len(index), "bytes": _total_bytes}
+
+
+async def run_janitor() -> None:
+    """
+    Evicts charts every JANITOR_INTERVAL_SECONDS, meant to run as a background task.
+    """
+    while True:
+        try:
+            _ = await asyncio.to_thread(evict)
+        except Exception as e:
+            log.warning(f"Couldn't evict charts: {e}")
+
+        await asyncio.sleep(JANITOR_INTERVAL_SECONDS)
+
+
+def _pop_over_limits(index: OrderedDict[UUID, _StoredChart]) -> list[_StoredChart]:
+    """
+    Pops the least recently used charts until MAX_FILES and MAX_BYTES are respected, must hold _index_lock.
+    """
+    global _total_bytes
+
+    evicted: list[_StoredChart] = []
+
+    while len(index) > 0 and (
+        (MAX_FILES > 0 and len(index) > MAX_FILES)
+        or (MAX_BYTES > 0 and _total_bytes > MAX_BYTES)
+    ):
+        _, chart = index.popitem(last=False)
+        _total_bytes -= chart.size
+        evicted.append(chart)
+
+    return evicted
+
+
+def _remove_files(charts: list[_StoredChart]) -> None:
+    for chart in charts:
+        try:
+            os.remove(chart.path)
+        except FileNotFoundError:
+            pass
+
+
+def _get_index() -> OrderedDict[UUID, _StoredChart]:
+    """
+    Returns the index from chart UUID to stored chart, scanning the PLOTS_DIRECTORY on the first call only.
+    """
+    global _index, _total_bytes
+
+    if _index is not None:
+        return _index
+
+    with _index_lock:
+        if _index is None:
+            _index = _scan_plots_directory()
+            _total_bytes = sum(chart.size for chart in _index.values())
+
+    return _index
+
+
+def _scan_plots_directory() -> OrderedDict[UUID, _StoredChart]:
+    """
+    Builds the index from the files in the PLOTS_DIRECTORY, oldest files first.
+    Leftovers of interrupted writes are removed.
+    """
+    charts: list[tuple[UUID, _StoredChart]] = []
+
+    if not os.path.exists(PLOTS_DIRECTORY):
+        return OrderedDict()
+
+    for entry in os.scandir(PLOTS_DIRECTORY):
+        if entry.name.endswith(TEMP_SUFFIX):
+            os.remove(entry.path)
+            continue
+
+        uuid, separator, _ = entry.name.partition(DATE_SEPARATOR)
+
+        if separator == "":
+            continue
+
+        try:
+            stat = entry.stat()
+            charts.append(
+                (UUID(uuid), _StoredChart(entry.path, stat.st_size, stat.st_mtime))
+            )
+        except (ValueError, OSError):
+            log.debug(f"Skipping unknown file {entry.name}")
+
+    charts.sort(key=lambda x: x[1].created_at)
 
-    return None
+    return OrderedDict(charts)
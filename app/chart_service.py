@@ -1,24 +1,38 @@
-from functools import reduce
+from functools import lru_cache
+import asyncio
+import hashlib
 import logging
+import math
 import re
 
-from . import chart_builder
 from . import chart_manager
-from .client import github_api_client
+from . import compression
+from . import language_color_index
+from . import metrics
+from . import render_cache
+from . import render_pool
+from . import stats_cache
+from .chart_style import PIE_CHART_ITEMS
+from .model.chart.cached_render import CachedRender
 from .model.chart.chart_data_type import ChartDataType
+from .model.chart.chart_format import ChartFormat
 from .model.chart.chart_request import ChartRequest
 from .model.chart.chart import Chart
-from .client import wakatime_api_client
-from .model.chart.chart_type import ChartType
-from .model.github_language_item import GithubLanguageItem
+from .model.chart.prepared_chart import PreparedChart
+from .model.chart.item_matcher import ItemMatcher
 from .model.wakatime.wakatime_item import WakatimeItem
-from .model.wakatime.wakatime_response import WakatimeResponse
+from .model.wakatime.cached_wakatime_response import CachedWakatimeResponse
 
 log = logging.getLogger(__name__)
 log.level = logging.DEBUG
 
+MATCHER_CACHE_SIZE: int = 256
 
-def create_chart(chart_request: ChartRequest) -> Chart | None:
+# PNG and WebP are compressed already
+COMPRESSIBLE_FORMATS: tuple[ChartFormat, ...] = (ChartFormat.SVG,)
+
+
+async def create_chart(chart_request: ChartRequest) -> Chart | None:
     """
     Creates a chart based on the provided ChartRequest.
 
@@ -28,98 +42,243 @@ def create_chart(chart_request: ChartRequest) -> Chart | None:
     Returns:
     Chart | None: A Chart object representing the created chart, or None if the chart could not be created.
 
+    Notes:
+    This function is a shortcut for prepare_chart() followed by render_chart().
+    """
+    return await render_chart(await prepare_chart(chart_request))
+
+
+async def prepare_chart(chart_request: ChartRequest, record_stats: bool = True) -> PreparedChart:
+    """
+    Fetches and processes everything needed to render a chart, without rendering it.
+
+    Parameters:
+    chart_request (ChartRequest): An object containing all necessary parameters to create the chart.
+    record_stats (bool): Whether the stats lookup counts towards the stats cache counters,
+                         False for charts that nobody requested, e.g. pre-warmed ones.
+
+    Returns:
+    PreparedChart: The processed data and colors of the chart along with its render key and the stats fetch time.
+
     Raises:
     AssertionError: If data is unexpectedly None after processing.
 
     Notes:
-    This function fetches data from external APIs (Wakatime and possibly GitHub) based on chart_request.
+    This function fetches the stats of the requested range from Wakatime through stats_cache based on chart_request.
+    For languages charts the stats and the GitHub language colors are obtained concurrently.
     It processes and organizes the data according to the specified parameters in chart_request.
-    The created chart is stored and can be retrieved later using its unique uuid with the help of chart_manager.
+    The render key identifies the chart content, so it can be used as an ETag before rendering.
+    """
+    log.info(f"Preparing chart {chart_request.uuid}")
+
+    stats: CachedWakatimeResponse
+    data: list[WakatimeItem] | None = None
+    # colors are normalized in place, the request keeps its fingerprint
+    colors: dict[str, str] | None = None if chart_request.colors is None else chart_request.colors.copy()
+    github_colors: dict[str, str] | None = None
+    chart_data = chart_request.chart_data
+
+    with metrics.time_stage("fetch", chart_data):
+        match chart_data:
+            case ChartDataType.LANGUAGES:
+                stats, github_colors = await asyncio.gather(
+                    stats_cache.get_stats(chart_request.username, chart_request.stats_range, record_stats),
+                    language_color_index.get_colors(),
+                )
+                data = stats.response.data.languages
+
+            case ChartDataType.PROJECTS:
+                stats = await stats_cache.get_stats(chart_request.username, chart_request.stats_range, record_stats)
+                data = stats.response.data.projects
+
+            case ChartDataType.EDITORS:
+                stats = await stats_cache.get_stats(chart_request.username, chart_request.stats_range, record_stats)
+                data = stats.response.data.editors
+
+    with metrics.time_stage("colors", chart_data):
+        if github_colors is not None:
+            colors = _merge_github_lang_colors(colors, github_colors)
+
+        colors = _merge_group_colors(colors, chart_request.group_colors)
+        colors = _normalize_colors(colors)
+
+    assert data is not None
+
+    with metrics.time_stage("group_hide", chart_data):
+        matcher = _get_matcher(chart_request.hide, chart_request.groups)
+        data = _group_and_hide(data, matcher)
+
+    render_key = _render_key(chart_request, data, colors)
+
+    return PreparedChart(chart_request, data, colors, render_key, stats.fetched_at)
+
+
+async def render_chart(
+    prepared_chart: PreparedChart,
+    use_cache: bool = True,
+    record_stats: bool = True,
+    inline: bool = False,
+) -> Chart:
     """
-    log.info(f"Creating chart {chart_request.uuid}")
+    Renders a prepared chart.
 
-    response: WakatimeResponse = wakatime_api_client.get_last_7_days(
-        chart_request.username
+    Parameters:
+    prepared_chart (PreparedChart): A chart returned by prepare_chart().
+    use_cache (bool): Whether the chart may be served from the render cache, e.g. False when it's profiled.
+    record_stats (bool): Whether the render cache lookup counts towards its counters, see prepare_chart().
+    inline (bool): Whether to render on the event loop thread instead of the render pool, see render_pool.render().
+
+    Returns:
+    Chart: A Chart object representing the rendered chart.
+
+    Notes:
+    Rendering is done by render_pool, the chart is returned from memory and
+    is also stored with the help of chart_manager if chart_manager.PERSIST_CHARTS is enabled.
+    Rendered charts are cached by render_cache, so identical requests over unchanged data aren't rendered twice.
+    SVG charts are compressed once when they're rendered and their compressed variants are cached along with them.
+    """
+    chart_request = prepared_chart.request
+    cached_render: CachedRender | None = (
+        render_cache.get_render(prepared_chart.render_key, record_stats) if use_cache else None
     )
 
-    data: list[WakatimeItem] | None = None
-    colors: dict[str, str] | None = chart_request.colors
+    if cached_render is not None:
+        log.debug(f"Serving chart {chart_request.uuid} from the render cache")
+        return Chart(chart_request.uuid, cached_render.content, cached_render.encoded)
 
-    match chart_request.chart_data:
-        case ChartDataType.LANGUAGES:
-            data = response.data.languages
-            github_languages = github_api_client.get_github_languages()
-            colors = _merge_github_lang_colors(colors, github_languages)
+    content = await _render_chart(
+        chart_request, prepared_chart.data, prepared_chart.colors, inline
+    )
+    encoded: dict[str, bytes] = {}
 
-        case ChartDataType.PROJECTS:
-            data = response.data.projects
+    if chart_request.output_format in COMPRESSIBLE_FORMATS:
+        with metrics.time_stage("compress", chart_request.chart_data):
+            encoded = compression.compress(content)
 
-        case ChartDataType.EDITORS:
-            data = response.data.editors
+    render_cache.put(prepared_chart.render_key, content, encoded)
 
-    colors = _merge_group_colors(colors, chart_request.group_colors)
-    colors = _normalize_colors(colors)
+    return Chart(chart_request.uuid, content, encoded)
 
-    assert data is not None
 
-    data = _group(data, chart_request.groups)
-    data = _hide(data, chart_request.hide)
+async def _render_chart(
+    chart_request: ChartRequest,
+    data: list[WakatimeItem],
+    colors: dict[str, str] | None,
+    inline: bool = False,
+) -> bytes:
+    """
+    Renders the chart with render_pool and stores it with chart_manager if persistence is enabled.
+
+    Parameters:
+    chart_request (ChartRequest): The request the chart is rendered for.
+    data (list[WakatimeItem]): Grouped and filtered items to render.
+    colors (dict[str, str] | None): Normalized colors to render with.
+    inline (bool): Whether to render on the event loop thread instead of the render pool.
 
-    match chart_request.chart_type:
-        case ChartType.PIE:
-            chart_builder.create_pie_chart(
-                data,
+    Returns:
+    bytes: The rendered chart.
+
+    Raises:
+    RenderQueueFullError: If too many charts are already waiting to be rendered.
+    """
+    with metrics.time_stage("render", chart_request.chart_data):
+        content = await render_pool.render(
+            chart_request.chart_type,
+            data[:PIE_CHART_ITEMS],
+            colors,
+            height=chart_request.height,
+            width=chart_request.width,
+            output_format=chart_request.output_format,
+            inline=inline,
+        )
+
+    if chart_manager.PERSIST_CHARTS:
+        with metrics.time_stage("persist", chart_request.chart_data):
+            await asyncio.to_thread(
+                chart_manager.save_chart,
+                content,
                 chart_request.uuid,
-                colors,
-                height=chart_request.height,
-                width=chart_request.width,
+                chart_request.output_format.value,
             )
 
-    chart_path: str | None = chart_manager.find_by_uuid(chart_request.uuid)
+    return content
 
-    if chart_path is None:
-        return None
 
-    return Chart(chart_request.uuid, chart_path)
+def _render_key(
+    chart_request: ChartRequest,
+    data: list[WakatimeItem],
+    colors: dict[str, str] | None,
+) -> str:
+    """
+    Computes a content address of the chart that is going to be rendered.
+
+    Parameters:
+    chart_request (ChartRequest): The request the chart is rendered for.
+    data (list[WakatimeItem]): Grouped and filtered items the chart is rendered from.
+    colors (dict[str, str] | None): Normalized colors the chart is rendered with.
+
+    Returns:
+    str: A hex digest of the request fingerprint combined with the drawn items and their resolved colors.
+
+    Notes:
+    - Only the items that are actually drawn (the top PIE_CHART_ITEMS) contribute to the key.
+    - Colors are resolved per drawn item, so unrelated colors (e.g. the whole GitHub index) don't affect the key.
+    """
+    drawn_items = data[:PIE_CHART_ITEMS]
+    folded_colors: dict[str, str] = (
+        {}
+        if colors is None
+        else {name.lower(): color for name, color in colors.items()}
+    )
+
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(chart_request.fingerprint().encode())
+    digest.update(render_pool.CHART_RENDERER.encode())
+    digest.update(str(colors is None).encode())
+
+    for item in drawn_items:
+        digest.update(
+            repr(
+                (
+                    item.name,
+                    item.total_seconds,
+                    item.percent,
+                    item.hours,
+                    item.minutes,
+                    folded_colors.get(item.name.lower()),
+                )
+            ).encode()
+        )
+
+    return digest.hexdigest()
 
 
 def _merge_github_lang_colors(
-    param_colors: dict[str, str] | None, github_languages: list[GithubLanguageItem]
+    param_colors: dict[str, str] | None, github_colors: dict[str, str]
 ) -> dict[str, str] | None:
     """
     Merges GitHub language colors with parameter colors, prioritizing parameter colors.
 
     Parameters:
     param_colors (dict[str, str] | None): A dictionary mapping language names to colors. If None, returns GitHub language colors.
-    github_languages (list[GithubLanguageItem]): A list of GitHubLanguageItem objects containing language names and colors.
+    github_colors (dict[str, str]): A dictionary mapping case-folded language names to colors from the language color index.
 
     Returns:
     dict[str, str] | None: A merged dictionary mapping language names to colors, giving priority to parameter colors.
-                           Returns GitHub language colors if param_colors is None.
+                           Returns a copy of GitHub language colors if param_colors is None.
 
     Notes:
     - This function merges GitHub language colors with parameter colors, giving priority to parameter colors if both dictionaries contain the same language names.
-    - If param_colors is None, returns GitHub language colors directly.
+    - Parameter color names are case-folded so they override GitHub language colors case-insensitively.
+    - GitHub language colors are never modified, a new dictionary is always returned.
     """
-    github_colors: dict[str, str] = {
-        github_language.name: github_language.color
-        for github_language in github_languages
-    }
-
-    if param_colors is None:
-        return github_colors
-
     merged_colors = github_colors.copy()
 
-    for github_color_name in github_colors:
-        for color_name in param_colors:
-            color = param_colors[color_name]
-
-            if github_color_name.lower() == color_name.lower():
-                merged_colors[github_color_name] = color
-                continue
+    if param_colors is None:
+        return merged_colors
 
-            merged_colors[color_name] = color
+    for color_name, color in param_colors.items():
+        merged_colors[color_name.casefold()] = color
 
     return merged_colors
 
@@ -196,13 +355,12 @@ def _hide(data: list[WakatimeItem], hide: set[str] | None) -> list[WakatimeItem]
     list[WakatimeItem]: A filtered list of WakatimeItem objects excluding those in the hide set.
 
     Notes:
-    - This function filters out WakatimeItem objects from the data based on the hide set.
-    - If hide is None, returns the original data list unchanged.
+    - This function is a shortcut for _group_and_hide() without groups.
     """
     if hide is None:
         return data
 
-    return _filter(data, hide)
+    return _group_and_hide(data, _get_matcher(hide, None))
 
 
 def _group(
@@ -220,161 +378,123 @@ def _group(
     list[WakatimeItem]: A list of grouped WakatimeItem objects sorted by total seconds in descending order.
 
     Notes:
-    - This function groups WakatimeItem objects based on the provided groups dictionary.
-    - It first creates grouped items for each group by combining items using _combine_items().
-    - Non-grouped items are filtered based on already grouped item names.
-    - Finally, it sorts the grouped data by total seconds in descending order.
+    - This function is a shortcut for _group_and_hide() without hidden items.
     """
     if groups is None:
         return data
 
-    grouped_items: list[WakatimeItem] = list()
+    return _group_and_hide(data, _get_matcher(None, groups))
 
-    for group_name, group_item_names in groups.items():
-        non_grouped_items = _filter(data, group_item_names)
-        group_items = list(filter(lambda x: x not in non_grouped_items, data))
 
-        if len(group_items) == 0:
-            continue
+def _group_and_hide(
+    data: list[WakatimeItem], matcher: ItemMatcher
+) -> list[WakatimeItem]:
+    """
+    Groups and hides WakatimeItem objects in a single pass over the data.
 
-        grouped_item = reduce(_combine_items, group_items)
-        grouped_item.name = group_name
-        grouped_items.append(grouped_item)
+    Parameters:
+    data (list[WakatimeItem]): A list of WakatimeItem objects to group and filter.
+    matcher (ItemMatcher): Compiled hide and group specs, see _get_matcher().
 
-    grouped_items_names = reduce(lambda acc, x: acc | x, groups.values(), set[str]())
-    non_grouped_items = _filter(data, grouped_items_names)
+    Returns:
+    list[WakatimeItem]: Grouped items and items that are neither grouped nor hidden.
+                        If there are groups, the list is sorted by total seconds in descending order.
 
-    grouped_data = grouped_items + non_grouped_items
+    Notes:
+    - An item matching several groups is combined into each of them.
+    - Grouped items are never hidden by their own names, but a group is hidden if its name is hidden.
+    - Items in data are never modified, grouped items are always new objects.
+    """
+    group_items: list[list[WakatimeItem]] = [[] for _ in matcher.group_names]
+    visible_items: list[WakatimeItem] = list()
 
-    grouped_data.sort(key=lambda x: x.total_seconds, reverse=True)
+    for item in data:
+        name = item.name.lower()
+        group_indexes = matcher.find_groups(name)
 
-    return grouped_data
+        for index in group_indexes:
+            group_items[index].append(item)
 
+        if len(group_indexes) == 0 and not matcher.is_hidden(name):
+            visible_items.append(item)
 
-def _filter(items: list[WakatimeItem], item_names: set[str]) -> list[WakatimeItem]:
-    """
-    Filters a list of WakatimeItem objects based on both wildcard patterns and exclusion criteria.
+    if len(matcher.group_names) == 0:
+        return visible_items
 
-    Parameters:
-    items (list[WakatimeItem]): A list of WakatimeItem objects to filter.
-    item_names (set[str]): A set of item names containing both wildcard patterns and specific names to exclude.
+    grouped_items: list[WakatimeItem] = list()
 
-    Returns:
-    list[WakatimeItem]: A filtered list of WakatimeItem objects that do not match any wildcard patterns or exclusion criteria.
+    for group_name, items in zip(matcher.group_names, group_items):
+        if len(items) == 0 or matcher.is_hidden(group_name.lower()):
+            continue
 
-    Notes:
-    - This function first filters items based on wildcard patterns ('**' suffixes and prefixes) in item_names.
-    - Then, it filters the resulting items based on exclusion criteria in item_names.
-    - The function utilizes _filter_wildcard_items() and _filter_items() internally to perform the filtering.
-    """
-    filtered_wildcards = _filter_wildcard_items(items, item_names)
-    return _filter_items(filtered_wildcards, item_names)
+        grouped_items.append(_sum_items(group_name, items))
 
+    grouped_data = grouped_items + visible_items
 
-def _filter_items(
-    items: list[WakatimeItem], item_names: set[str]
-) -> list[WakatimeItem]:
-    """
-    Filters a list of WakatimeItem objects based on exclusion criteria in item_names.
-    Items whose names (case-insensitive) match any entry in item_names are excluded from the filtered list.
+    grouped_data.sort(key=lambda x: x.total_seconds, reverse=True)
 
-    Parameters:
-    items (list[WakatimeItem]): A list of WakatimeItem objects to filter.
-    item_names (set[str]): A set of item names to exclude from the filtered list.
+    return grouped_data
 
-    Returns:
-    list[WakatimeItem]: A filtered list of WakatimeItem objects excluding those with names in item_names.
-    """
-    return list(filter(lambda x: x.name.lower() not in item_names, items))
 
+@lru_cache(maxsize=MATCHER_CACHE_SIZE)
+def _compile_matcher(
+    hide: frozenset[str] | None,
+    groups: tuple[tuple[str, frozenset[str]], ...] | None,
+) -> ItemMatcher:
+    return ItemMatcher(hide, groups)
 
-def _filter_wildcard_items(
-    items: list[WakatimeItem], item_names: set[str]
-) -> list[WakatimeItem]:
+
+def _get_matcher(
+    hide: set[str] | None, groups: dict[str, set[str]] | None
+) -> ItemMatcher:
     """
-    Filters a list of WakatimeItem objects based on wildcard patterns in item_names.
+    Returns hide and group specs compiled into an ItemMatcher.
 
     Parameters:
-    items (list[WakatimeItem]): A list of WakatimeItem objects to filter.
-    item_names (set[str]): A set of item names containing wildcard patterns ('**' suffixes and prefixes).
+    hide (set[str] | None): A set of item names to hide, may contain wildcards.
+    groups (dict[str, set[str]] | None): A dictionary from group names to sets of item names, may contain wildcards.
 
     Returns:
-    list[WakatimeItem]: A filtered list of WakatimeItem objects that do not match any wildcard patterns.
+    ItemMatcher: The compiled matcher.
 
     Notes:
-    - Wildcard patterns in item_names are interpreted as follows:
-      - "**-C" matches any item name ending with "-C".
-      - "Project-**" matches any item name starting with "Project-".
-    - Matching is case-insensitive; item names are converted to lowercase for comparison.
+    - Compiled matchers are memoized by spec, so repeated requests reuse them.
     """
-    filtered_items: list[WakatimeItem] = list()
-
-    suffixes = list(
-        map(lambda x: x[2:], filter(lambda x: x.startswith("**"), item_names))
-    )
-    prefixes = list(
-        map(lambda x: x[:-2], filter(lambda x: x.endswith("**"), item_names))
+    return _compile_matcher(
+        None if hide is None else frozenset(hide),
+        None
+        if groups is None
+        else tuple((name, frozenset(names)) for name, names in groups.items()),
     )
 
-    for item in items:
-        filtered_out = False
-
-        for prefix in prefixes:
-            if item.name.lower().startswith(prefix):
-                filtered_out = True
-                break
-
-        for suffix in suffixes:
-            if item.name.lower().endswith(suffix):
-                filtered_out = True
-                break
-
-        if not filtered_out:
-            filtered_items.append(item)
 
-    return filtered_items
-
-
-def _combine_items(item_one: WakatimeItem, item_two: WakatimeItem) -> WakatimeItem:
+def _sum_items(name: str, items: list[WakatimeItem]) -> WakatimeItem:
     """
-    Combines two WakatimeItem objects into a single WakatimeItem, aggregating their metrics.
+    Sums WakatimeItem objects into a single WakatimeItem, aggregating their metrics.
 
     Parameters:
-    item_one (WakatimeItem): The first WakatimeItem to combine.
-    item_two (WakatimeItem): The second WakatimeItem to combine.
+    name (str): Name of the resulting item.
+    items (list[WakatimeItem]): A non-empty list of WakatimeItem objects to sum.
 
     Returns:
-    WakatimeItem: A new WakatimeItem object representing the combined metrics of item_one and item_two.
+    WakatimeItem: A new WakatimeItem object representing the summed metrics of items.
 
     Notes:
-    - This function calculates the combined total seconds, percentage, hours, and minutes from item_one and item_two.
-    - If combined_minutes exceed 59, they are converted into additional hours.
+    - Each metric is summed in one pass instead of once per pair of combined items.
+    - Minutes exceeding 59 are converted into additional hours.
     """
-    combined_total_seconds: float = item_one.total_seconds + item_two.total_seconds
-    combined_percent: float = item_one.percent + item_two.percent
-    combined_hours: int = item_one.hours + item_two.hours
-    combined_minutes: int = item_one.minutes + item_two.minutes
-
-    if combined_minutes >= 60:
-        hours = combined_minutes // 60
-        minutes = combined_minutes % 60
-
-        combined_hours += hours
-        combined_minutes = minutes
-
-    combined_digital = f"{combined_hours}:{combined_minutes}"
-    combined_decimal = f"{combined_hours}.{combined_minutes // 0.6}"
-    combined_text = f"{f"{combined_hours} hrs" if combined_hours != 0 else ""} {combined_minutes} mins"
+    total_seconds: float = math.fsum(item.total_seconds for item in items)
+    # Wakatime reports percents with two decimals
+    percent: float = round(math.fsum(item.percent for item in items), 2)
+    total_minutes: int = sum(item.hours * 60 + item.minutes for item in items)
+    hours, minutes = divmod(total_minutes, 60)
 
     return WakatimeItem(
-        total_seconds=combined_total_seconds,
-        name=item_one.name,
-        percent=combined_percent,
-        digital=combined_digital,
-        decimal=combined_decimal,
-        text=combined_text,
-        hours=combined_hours,
-        minutes=combined_minutes,
+        total_seconds=total_seconds,
+        name=name,
+        percent=percent,
+        hours=hours,
+        minutes=minutes,
     )
 
 
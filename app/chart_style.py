@@ -0,0 +1,18 @@
+GITHUB_BG_COLOR: str = "#0D1117"
+GITHUB_FG_COLOR: str = "#C3D1D9"
+
+PIE_CHART_ITEMS: int = 5
+
+# matplotlib "tab10" colormap, used for items without a color
+DEFAULT_COLORS: list[str] = [
+    "#1F77B4",
+    "#FF7F0E",
+    "#2CA02C",
+    "#D62728",
+    "#9467BD",
+    "#8C564B",
+    "#E377C2",
+    "#7F7F7F",
+    "#BCBD22",
+    "#17BECF",
+]
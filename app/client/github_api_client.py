@@ -1,33 +1,40 @@
-# pyright: reportUnknownMemberType=false, reportUnknownVariableType=false, reportUnknownArgumentType=false, reportUnknownParameterType=false
 import logging
-from typing import Any
-import requests
 from dotenv import load_dotenv
-from ruamel.yaml import YAML
 
-from ..model.github_language_item import GithubLanguageItem
+from . import http_client
 
 log = logging.getLogger(__name__)
 
 _ = load_dotenv()
 
+LANGUAGES_YML_URL: str = "https://raw.githubusercontent.com/github-linguist/linguist/master/lib/linguist/languages.yml"
 
-def get_github_languages() -> list[GithubLanguageItem]:
-    url = "https://raw.githubusercontent.com/github-linguist/linguist/master/lib/linguist/languages.yml"
+
+async def get_github_languages_yml(etag: str | None = None) -> tuple[str | None, str | None]:
+    """
+    Downloads languages.yml from the github-linguist repository.
+
+    Parameters:
+    etag (str | None): ETag of the previously downloaded languages.yml, sent as If-None-Match.
+
+    Returns:
+    tuple[str | None, str | None]: The languages.yml content and its ETag.
+                                   The content is None if the file hasn't changed since etag.
+    """
+    headers: dict[str, str] = {}
+
+    if etag is not None:
+        headers["If-None-Match"] = etag
 
     log.info("Requesting languages.yml from the github-linguist")
 
-    response = requests.get(url)
+    response = await http_client.get("github", LANGUAGES_YML_URL, headers=headers)
 
     log.debug(f"Response status code: {response.status_code}")
 
-    yaml = YAML()
-    languages_yaml: dict[str, Any] = yaml.load(response.text)
-
-    languages: list[GithubLanguageItem] = []
+    if response.status_code == 304:
+        return (None, etag)
 
-    for key in languages_yaml.keys():
-        language = {"name": key, **languages_yaml.get(key)}  # type: ignore[all]
-        languages.append(GithubLanguageItem(language))
+    response.raise_for_status()
 
-    return languages
+    return (response.text, response.headers.get("ETag"))
@@ -0,0 +1,85 @@
+import importlib.util
+import logging
+import os
+import time
+import httpx
+from dotenv import load_dotenv
+
+from .. import metrics
+
+log = logging.getLogger(__name__)
+
+_ = load_dotenv()
+
+TIMEOUT_SECONDS: float = float(os.getenv("UPSTREAM_TIMEOUT_SECONDS", "10"))
+MAX_CONNECTIONS: int = int(os.getenv("UPSTREAM_MAX_CONNECTIONS", "100"))
+MAX_KEEPALIVE_CONNECTIONS: int = int(os.getenv("UPSTREAM_MAX_KEEPALIVE_CONNECTIONS", "20"))
+
+# HTTP/2 requires the optional h2 package
+HTTP2_AVAILABLE: bool = importlib.util.find_spec("h2") is not None
+
+_client: httpx.AsyncClient | None = None
+
+
+def get_client() -> httpx.AsyncClient:
+    """
+    Returns the AsyncClient shared by all upstream API clients, creating it on the first call.
+
+    Returns:
+    httpx.AsyncClient: A client with a shared connection pool, keep-alive, timeouts and HTTP/2 if h2 is installed.
+    """
+    global _client
+
+    if _client is None or _client.is_closed:
+        log.debug(f"Creating upstream http client, http2 = {HTTP2_AVAILABLE}")
+
+        _client = httpx.AsyncClient(
+            http2=HTTP2_AVAILABLE,
+            timeout=httpx.Timeout(TIMEOUT_SECONDS),
+            limits=httpx.Limits(
+                max_connections=MAX_CONNECTIONS,
+                max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+            ),
+        )
+
+    return _client
+
+
+async def get(
+    client_name: str, url: str, headers: dict[str, str] | None = None
+) -> httpx.Response:
+    """
+    Sends a GET request with the shared client, recording its status and latency in metrics.
+
+    Parameters:
+    client_name (str): Name of the upstream API client the request is sent for, e.g. "wakatime".
+    url (str): The requested URL.
+    headers (dict[str, str] | None): Request headers.
+
+    Returns:
+    httpx.Response: The response.
+
+    Raises:
+    httpx.HTTPError: If the request fails without a response, counted with the "error" status.
+    """
+    start = time.perf_counter()
+
+    try:
+        response = await get_client().get(url, headers=headers)
+    except httpx.HTTPError:
+        metrics.observe_upstream(client_name, "error", time.perf_counter() - start)
+        raise
+
+    metrics.observe_upstream(
+        client_name, str(response.status_code), time.perf_counter() - start
+    )
+
+    return response
+
+
+async def close() -> None:
+    global _client
+
+    if _client is not None:
+        await _client.aclose()
+        _client = None
@@ -0,0 +1,161 @@
+import time
+from email.utils import parsedate_to_datetime
+
+
+class TokenBucket:
+    """
+    Limits the rate of upstream calls to rate per second on average, allowing bursts of up to capacity calls.
+
+    Notes:
+    - A rate of 0 or less disables the limit.
+    - Not thread-safe, meant to be used from the event loop only.
+    """
+
+    rate: float
+    capacity: float
+    tokens: float
+    updated_at: float
+    # no calls are allowed before this time, e.g. while the upstream asked to retry later
+    paused_until: float
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self.paused_until = 0.0
+
+    def reserve(self, max_wait: float) -> float | None:
+        """
+        Takes a token for a call, if one is available within max_wait seconds.
+
+        Returns:
+        float | None: Seconds to wait before making the call, or None if no token was taken.
+        """
+        if self.rate <= 0:
+            return 0.0
+
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+        wait = max(self.paused_until - now, 0.0, (1 - self.tokens) / self.rate)
+
+        if wait > max_wait:
+            return None
+
+        # the token is taken right away, so concurrent callers queue up behind each other
+        self.tokens -= 1
+
+        return wait
+
+    def pause(self, seconds: float) -> None:
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def retry_after(self) -> float:
+        """
+        Returns the seconds until a token is available to a caller that doesn't queue.
+        """
+        if self.rate <= 0:
+            return 0.0
+
+        return max(self.paused_until - time.monotonic(), (1 - self.tokens) / self.rate, 0.0)
+
+    def reset(self) -> None:
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.paused_until = 0.0
+
+
+class CircuitBreaker:
+    """
+    Stops upstream calls for reset_seconds after failure_threshold consecutive failures.
+
+    Notes:
+    - Once reset_seconds have passed a single trial call is allowed (half-open state),
+      its success closes the breaker and its failure opens it again.
+    - A failure_threshold of 0 or less disables the breaker.
+    """
+
+    failure_threshold: int
+    reset_seconds: float
+    failures: int
+    opened_at: float | None
+    trial_in_flight: bool
+
+    def __init__(self, failure_threshold: int, reset_seconds: float) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+
+    def allow(self) -> bool:
+        """
+        Checks if a call may be made, the caller must report its result with record_success() or record_failure().
+        """
+        if self.opened_at is None:
+            return True
+
+        if self.trial_in_flight or time.monotonic() - self.opened_at < self.reset_seconds:
+            return False
+
+        self.trial_in_flight = True
+
+        return True
+
+    def is_open(self) -> bool:
+        return self.opened_at is not None
+
+    def retry_after(self) -> float:
+        """
+        Returns the seconds until the breaker allows a trial call, 0 if it's closed.
+        """
+        if self.opened_at is None:
+            return 0.0
+
+        return max(self.reset_seconds - (time.monotonic() - self.opened_at), 0.0)
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self.trial_in_flight = False
+
+        if self.failure_threshold > 0 and (
+            self.opened_at is not None or self.failures >= self.failure_threshold
+        ):
+            self.opened_at = time.monotonic()
+
+    def release(self) -> None:
+        """
+        Gives up a call allowed by allow() without a result, e.g. a cancelled call, so another trial call may be made.
+        """
+        self.trial_in_flight = False
+
+    def reset(self) -> None:
+        self.record_success()
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """
+    Parses a Retry-After header, either delay seconds or an HTTP date.
+
+    Returns:
+    float | None: Seconds to wait, or None if the header is missing or invalid.
+    """
+    if value is None:
+        return None
+
+    value = value.strip()
+
+    if value.isdigit():
+        return float(value)
+
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
@@ -1,11 +1,23 @@
+import asyncio
 import logging
-import requests
+import random
+import time
 from base64 import b64encode
+from datetime import date
 import os
+import httpx
 from dotenv import load_dotenv
-from dacite import from_dict
 
+from . import http_client
+from . import wakatime_response_decoder
+from .resilience import CircuitBreaker, TokenBucket, parse_retry_after
+from .. import metrics
 from ..exception.WakatimeCredentialsMissingError import WakatimeCredentialsMissingError
+from ..exception.WakatimeRequestRejectedError import WakatimeRequestRejectedError
+from ..exception.WakatimeUnavailableError import WakatimeUnavailableError
+from ..exception.WakatimeUserNotFoundError import WakatimeUserNotFoundError
+from ..model.wakatime.stats_range import StatsRange
+from ..model.wakatime.wakatime_daily_summary import WakatimeDailySummary
 from ..model.wakatime.wakatime_response import WakatimeResponse
 
 log = logging.getLogger(__name__)
@@ -13,8 +25,124 @@ log.setLevel(logging.DEBUG)
 
 _ = load_dotenv()
 
+# Wakatime allows about 10 requests per second on average, 0 disables the limit
+RATE_LIMIT_PER_SECOND: float = float(os.getenv("WAKATIME_RATE_LIMIT_PER_SECOND", "8"))
+RATE_LIMIT_BURST: float = float(os.getenv("WAKATIME_RATE_LIMIT_BURST", "20"))
+# calls that would wait longer than this for the rate limit are rejected instead of queued
+RATE_LIMIT_MAX_WAIT_SECONDS: float = float(os.getenv("WAKATIME_RATE_LIMIT_MAX_WAIT_SECONDS", "1"))
 
-def get_last_7_days(username: str) -> WakatimeResponse:
+# all attempts of a call, including backoff, fit into the deadline
+DEADLINE_SECONDS: float = float(os.getenv("WAKATIME_DEADLINE_SECONDS", "8"))
+MAX_RETRIES: int = int(os.getenv("WAKATIME_MAX_RETRIES", "2"))
+BACKOFF_BASE_SECONDS: float = 0.25
+BACKOFF_MAX_SECONDS: float = 2
+
+BREAKER_FAILURE_THRESHOLD: int = int(os.getenv("WAKATIME_BREAKER_FAILURE_THRESHOLD", "5"))
+BREAKER_RESET_SECONDS: float = float(os.getenv("WAKATIME_BREAKER_RESET_SECONDS", "30"))
+
+RETRYABLE_STATUS_CODES: frozenset[int] = frozenset({429, 500, 502, 503, 504})
+
+rate_limiter = TokenBucket(RATE_LIMIT_PER_SECOND, RATE_LIMIT_BURST)
+circuit_breaker = CircuitBreaker(BREAKER_FAILURE_THRESHOLD, BREAKER_RESET_SECONDS)
+
+
+async def get_stats(
+    username: str, stats_range: StatsRange = StatsRange.LAST_7_DAYS
+) -> WakatimeResponse:
+    """
+    Fetches the stats of the user over the range from Wakatime.
+
+    Parameters:
+    username (str): Wakatime username.
+    stats_range (StatsRange): Range of the stats, the last 7 days by default.
+
+    Returns:
+    WakatimeResponse: The decoded stats.
+
+    Raises:
+    WakatimeCredentialsMissingError: If WAKATIME_API_KEY or WAKATIME_BASE_URL isn't set.
+    WakatimeUserNotFoundError: If Wakatime doesn't know the user.
+    WakatimeRequestRejectedError: If Wakatime rejects the request for good, e.g. the API key is invalid (401)
+                                  or the profile is private (403).
+    WakatimeUnavailableError: If the circuit breaker is open, the rate limit is exhausted,
+                              Wakatime keeps failing until the retries or the deadline run out,
+                              or Wakatime hasn't computed the stats of the range yet.
+    WakatimeResponseMalformedError: If Wakatime answers with malformed stats.
+
+    Notes:
+    - Calls are limited by a token bucket of RATE_LIMIT_PER_SECOND calls per second.
+    - Network errors, 429 and 5xx responses are retried up to MAX_RETRIES times with jittered
+      exponential backoff, honoring Retry-After. A 429 also pauses all calls for its Retry-After.
+    - Failed calls count towards the circuit breaker, which rejects calls without contacting Wakatime while it's open.
+    - The whole call, including retries, takes at most DEADLINE_SECONDS.
+    """
+    log.info(f"Requesting {stats_range.value} data from Wakatime")
+
+    response = await _get_user_resource(username, f"stats/{stats_range.value}")
+
+    if response.status_code == 202:
+        # long ranges are computed in the background on the first request
+        raise WakatimeUnavailableError(
+            f"Wakatime is still computing the {stats_range.value} stats of {username}",
+            parse_retry_after(response.headers.get("Retry-After")),
+        )
+
+    if response.status_code != 200:
+        raise WakatimeUnavailableError(
+            f"Wakatime answered {response.status_code} for the stats of {username}"
+        )
+
+    with metrics.time_stage("parse"):
+        return wakatime_response_decoder.decode(response.content)
+
+
+async def get_summaries(username: str, start: date, end: date) -> list[WakatimeDailySummary]:
+    """
+    Fetches the daily summaries of the user from start to end, both inclusive, from Wakatime.
+
+    Parameters:
+    username (str): Wakatime username.
+    start (date): First day of the summaries.
+    end (date): Last day of the summaries.
+
+    Returns:
+    list[WakatimeDailySummary]: The decoded summary of each day.
+
+    Raises:
+    WakatimeCredentialsMissingError: If WAKATIME_API_KEY or WAKATIME_BASE_URL isn't set.
+    WakatimeUserNotFoundError: If Wakatime doesn't know the user.
+    WakatimeRequestRejectedError: If Wakatime rejects the request for good, see get_stats().
+    WakatimeUnavailableError: If the circuit breaker is open, the rate limit is exhausted,
+                              or Wakatime keeps failing until the retries or the deadline run out.
+    WakatimeResponseMalformedError: If Wakatime answers with malformed summaries.
+
+    Notes:
+    - Calls go through the same rate limiter, retries and circuit breaker as get_stats().
+    """
+    log.info(f"Requesting summaries from {start} to {end} from Wakatime")
+
+    response = await _get_user_resource(
+        username, f"summaries?start={start.isoformat()}&end={end.isoformat()}"
+    )
+
+    if response.status_code != 200:
+        raise WakatimeUnavailableError(
+            f"Wakatime answered {response.status_code} for the summaries of {username}"
+        )
+
+    with metrics.time_stage("parse"):
+        return wakatime_response_decoder.decode_summaries(response.content)
+
+
+async def _get_user_resource(username: str, resource: str) -> httpx.Response:
+    """
+    Requests a resource of the user with the API key.
+
+    Raises:
+    WakatimeCredentialsMissingError: If WAKATIME_API_KEY or WAKATIME_BASE_URL isn't set.
+    WakatimeUserNotFoundError: If Wakatime doesn't know the user.
+    WakatimeRequestRejectedError: If Wakatime answers with any other client error, retrying wouldn't help.
+    """
     base_url: str | None = os.getenv("WAKATIME_BASE_URL")
     api_key: str | None = os.getenv("WAKATIME_API_KEY")
 
@@ -34,15 +162,127 @@ def get_last_7_days(username: str) -> WakatimeResponse:
 
     headers = {"Authorization": f"Basic {api_key_encoded.decode()}"}
 
-    log.info("Requesting last 7 days data from Wakatime")
+    response = await _get_with_retries(f"{base_url}/users/{username}/{resource}", headers)
 
-    response = requests.get(
-        f"{base_url}/users/{username}/stats/last_7_days", headers=headers
+    log.debug(f"Response status code: {response.status_code}")
+
+    if response.status_code == 404:
+        raise WakatimeUserNotFoundError(f"Wakatime user {username} wasn't found")
+
+    if response.status_code in (401, 403):
+        raise WakatimeRequestRejectedError(
+            f"Wakatime answered {response.status_code} for {username}, "
+            "either WAKATIME_API_KEY is invalid or the user's stats aren't public",
+            response.status_code,
+        )
+
+    # 429 is retried, so it never gets here
+    if 400 <= response.status_code < 500:
+        raise WakatimeRequestRejectedError(
+            f"Wakatime answered {response.status_code} for {username}", response.status_code
+        )
+
+    return response
+
+
+async def _get_with_retries(url: str, headers: dict[str, str]) -> httpx.Response:
+    """
+    Sends the request through the rate limiter and the circuit breaker, retrying transient failures.
+
+    Returns:
+    httpx.Response: The first response that isn't retried, e.g. 200 or 404.
+    """
+    deadline = time.monotonic() + DEADLINE_SECONDS
+    attempt = 0
+
+    while True:
+        await _acquire(deadline)
+        retry_after: float | None = None
+        remaining = deadline - time.monotonic()
+
+        if remaining <= 0:
+            # nothing was sent, so Wakatime didn't fail
+            circuit_breaker.release()
+            metrics.UPSTREAM_REJECTIONS.labels("wakatime", "deadline_exceeded").inc()
+            raise WakatimeUnavailableError(f"Wakatime deadline passed after {attempt} attempts")
+
+        try:
+            async with asyncio.timeout(remaining):
+                response = await http_client.get("wakatime", url, headers=headers)
+        except (httpx.HTTPError, TimeoutError) as e:
+            circuit_breaker.record_failure()
+            failure = f"{type(e).__name__}: {e}"
+        except BaseException:
+            # e.g. cancelled, the call has no result, but the breaker mustn't keep waiting for it
+            circuit_breaker.release()
+            raise
+        else:
+            if response.status_code not in RETRYABLE_STATUS_CODES:
+                circuit_breaker.record_success()
+                return response
+
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+
+            if response.status_code == 429:
+                # throttling is neither a failure nor a recovery of Wakatime, a trial call is simply given up,
+                # the rate limiter stops calls until it's over
+                circuit_breaker.release()
+                rate_limiter.pause(retry_after if retry_after is not None else BACKOFF_MAX_SECONDS)
+            else:
+                circuit_breaker.record_failure()
+
+            failure = f"status {response.status_code}"
+
+        backoff = random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2**attempt))
+        delay = max(backoff, retry_after or 0.0)
+
+        if attempt >= MAX_RETRIES or time.monotonic() + delay >= deadline:
+            metrics.UPSTREAM_REJECTIONS.labels("wakatime", "retries_exhausted").inc()
+            raise WakatimeUnavailableError(
+                f"Wakatime failed after {attempt + 1} attempts, last with {failure}",
+                retry_after,
+            )
+
+        log.warning(f"Retrying Wakatime request in {delay:.2f}s after {failure}")
+        metrics.UPSTREAM_RETRIES.labels("wakatime").inc()
+        attempt += 1
+
+        await asyncio.sleep(delay)
+
+
+async def _acquire(deadline: float) -> None:
+    """
+    Waits for a rate limit token and checks the circuit breaker before a call.
+
+    Raises:
+    WakatimeUnavailableError: If the breaker is open or no token is available within
+                              RATE_LIMIT_MAX_WAIT_SECONDS and the deadline.
+    """
+    if circuit_breaker.retry_after() > 0:
+        metrics.UPSTREAM_REJECTIONS.labels("wakatime", "circuit_open").inc()
+        raise WakatimeUnavailableError(
+            "Wakatime calls are stopped while it's failing", circuit_breaker.retry_after()
+        )
+
+    wait = rate_limiter.reserve(
+        min(RATE_LIMIT_MAX_WAIT_SECONDS, max(deadline - time.monotonic(), 0))
     )
 
-    log.debug(f"Response status code: {response.status_code}")
+    if wait is None:
+        metrics.UPSTREAM_REJECTIONS.labels("wakatime", "throttled").inc()
+        raise WakatimeUnavailableError(
+            "Wakatime calls are throttled", rate_limiter.retry_after()
+        )
+
+    if wait > 0:
+        await asyncio.sleep(wait)
 
-    return from_dict(data_class=WakatimeResponse, data=response.json())
+    # checked again after waiting, the breaker may allow a single trial call only
+    if not circuit_breaker.allow():
+        metrics.UPSTREAM_REJECTIONS.labels("wakatime", "circuit_open").inc()
+        raise WakatimeUnavailableError(
+            "Wakatime calls are stopped while it's failing", circuit_breaker.retry_after()
+        )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,168 @@
+from datetime import date
+from typing import Any, NoReturn
+
+import orjson
+
+from ..exception.WakatimeResponseMalformedError import WakatimeResponseMalformedError
+from ..model.wakatime.wakatime_daily_summary import WakatimeDailySummary
+from ..model.wakatime.wakatime_data import WakatimeData
+from ..model.wakatime.wakatime_item import WakatimeItem
+from ..model.wakatime.wakatime_response import WakatimeResponse
+
+# only these arrays of the stats are charted, the others (categories, machines, ...) are skipped
+SECTIONS: tuple[str, ...] = ("projects", "languages", "editors")
+
+_NUMBER_TYPES: tuple[type, ...] = (int, float)
+_NUMBER_FIELDS: tuple[str, ...] = ("total_seconds", "percent")
+_INT_FIELDS: tuple[str, ...] = ("hours", "minutes")
+_STR_FIELDS: tuple[str, ...] = ("name",)
+_TYPE_NAMES: dict[type, str] = {dict: "an object", list: "an array", str: "a string"}
+
+
+def decode(content: bytes) -> WakatimeResponse:
+    """
+    Decodes a Wakatime stats response, building only the charted sections.
+
+    Parameters:
+    content (bytes): Body of the response.
+
+    Returns:
+    WakatimeResponse: The projects, languages and editors of the stats.
+
+    Raises:
+    WakatimeResponseMalformedError: If the body isn't JSON or a field is missing or has a wrong type,
+                                    the message names the offending field, e.g. "data.projects[3].hours".
+
+    Notes:
+    - Item fields are checked by their exact type, ints and floats are accepted as numbers but bools aren't.
+    - Unknown fields and sections are ignored, so are the text fields of items, see WakatimeItem.
+    """
+    data = _get(_loads(content), "data", dict, "response")
+
+    return WakatimeResponse(_decode_data(data, "data"))
+
+
+def decode_summaries(content: bytes) -> list[WakatimeDailySummary]:
+    """
+    Decodes a Wakatime summaries response, building only the charted sections of each day.
+
+    Parameters:
+    content (bytes): Body of the response.
+
+    Returns:
+    list[WakatimeDailySummary]: The projects, languages and editors of each day.
+
+    Raises:
+    WakatimeResponseMalformedError: If the body isn't JSON, a field is missing or has a wrong type,
+                                    or a day isn't an ISO date, e.g. "data[2].range.date".
+
+    Notes:
+    - Items are checked the same way decode() checks them.
+    """
+    summaries: list[WakatimeDailySummary] = []
+
+    for i, summary in enumerate(_get(_loads(content), "data", list, "response")):
+        path = f"data[{i}]"
+        raw_day = _get(_get(summary, "range", dict, path), "date", str, f"{path}.range")
+
+        try:
+            day = date.fromisoformat(raw_day)
+        except ValueError:
+            raise WakatimeResponseMalformedError(
+                f"{path}.range.date should be an ISO date, got {raw_day!r}"
+            ) from None
+
+        summaries.append(WakatimeDailySummary(day, _decode_data(summary, path)))
+
+    return summaries
+
+
+def _loads(content: bytes) -> Any:
+    try:
+        return orjson.loads(content)
+    except orjson.JSONDecodeError as e:
+        raise WakatimeResponseMalformedError(f"Response isn't valid JSON: {e}") from None
+
+
+def _decode_data(data: dict[str, Any], path: str) -> WakatimeData:
+    projects, languages, editors = (
+        _decode_items(_get(data, section, list, path), f"{path}.{section}")
+        for section in SECTIONS
+    )
+
+    return WakatimeData(projects, languages, editors)
+
+
+def _decode_items(raw_items: list[Any], path: str) -> list[WakatimeItem]:
+    items: list[WakatimeItem] = []
+
+    for i, raw_item in enumerate(raw_items):
+        if type(raw_item) is not dict:
+            raise WakatimeResponseMalformedError(
+                f"{path}[{i}] should be an object, got {type(raw_item).__name__}"
+            )
+
+        try:
+            total_seconds = raw_item["total_seconds"]
+            name = raw_item["name"]
+            percent = raw_item["percent"]
+            hours = raw_item["hours"]
+            minutes = raw_item["minutes"]
+        except KeyError:
+            _raise_for_item(raw_item, f"{path}[{i}]")
+
+        # exact type checks are much cheaper than isinstance() and reject bools as numbers
+        if (
+            type(total_seconds) not in _NUMBER_TYPES
+            or type(percent) not in _NUMBER_TYPES
+            or type(hours) is not int
+            or type(minutes) is not int
+            or type(name) is not str
+        ):
+            _raise_for_item(raw_item, f"{path}[{i}]")
+
+        items.append(
+            WakatimeItem(float(total_seconds), name, float(percent), hours, minutes)
+        )
+
+    return items
+
+
+def _raise_for_item(raw_item: dict[str, Any], path: str) -> NoReturn:
+    """
+    Raises an error naming the first missing or mistyped field of an item, only called on the slow path.
+    """
+    for fields, types, expected in (
+        (_NUMBER_FIELDS, _NUMBER_TYPES, "a number"),
+        (_INT_FIELDS, (int,), "an integer"),
+        (_STR_FIELDS, (str,), "a string"),
+    ):
+        for field in fields:
+            if field not in raw_item:
+                raise WakatimeResponseMalformedError(f"{path}.{field} is missing")
+
+            if type(raw_item[field]) not in types:
+                raise WakatimeResponseMalformedError(
+                    f"{path}.{field} should be {expected}, got {type(raw_item[field]).__name__}"
+                )
+
+    raise WakatimeResponseMalformedError(f"{path} is malformed")
+
+
+def _get(parent: Any, key: str, expected_type: type, path: str) -> Any:
+    if type(parent) is not dict:
+        raise WakatimeResponseMalformedError(
+            f"{path} should be an object, got {type(parent).__name__}"
+        )
+
+    if key not in parent:
+        raise WakatimeResponseMalformedError(f"{path}.{key} is missing")
+
+    value = parent[key]
+
+    if type(value) is not expected_type:
+        raise WakatimeResponseMalformedError(
+            f"{path}.{key} should be {_TYPE_NAMES[expected_type]}, got {type(value).__name__}"
+        )
+
+    return value
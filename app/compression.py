@@ -0,0 +1,94 @@
+import gzip
+import importlib
+import importlib.util
+import logging
+import os
+from dotenv import load_dotenv
+
+log = logging.getLogger(__name__)
+log.setLevel(logging.DEBUG)
+
+_ = load_dotenv()
+
+# charts are compressed once per render, so the slowest and smallest settings are affordable
+GZIP_LEVEL: int = int(os.getenv("COMPRESSION_GZIP_LEVEL", "9"))
+BROTLI_QUALITY: int = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "11"))
+
+# brotli is optional, charts are only gzipped without it
+BROTLI_AVAILABLE: bool = importlib.util.find_spec("brotli") is not None
+
+# content codings in the order of preference when the client accepts several of them equally
+ENCODINGS: tuple[str, ...] = ("br", "gzip") if BROTLI_AVAILABLE else ("gzip",)
+
+
+def compress(content: bytes) -> dict[str, bytes]:
+    """
+    Compresses content with every available content coding.
+
+    Parameters:
+    content (bytes): The content to compress, e.g. a rendered SVG.
+
+    Returns:
+    dict[str, bytes]: The compressed content by content coding, one entry for each of ENCODINGS.
+
+    Notes:
+    - gzip output doesn't contain a modification time, so the same content is always compressed the same way.
+    """
+    encoded: dict[str, bytes] = {"gzip": gzip.compress(content, GZIP_LEVEL, mtime=0)}
+
+    if BROTLI_AVAILABLE:
+        brotli = importlib.import_module("brotli")
+        encoded["br"] = brotli.compress(content, quality=BROTLI_QUALITY)
+
+    return encoded
+
+
+def negotiate(accept_encoding: str | None, encodings: tuple[str, ...] = ENCODINGS) -> str | None:
+    """
+    Picks the content coding of a response from the Accept-Encoding header, as described in RFC 9110.
+
+    Parameters:
+    accept_encoding (str | None): The Accept-Encoding header of the request.
+    encodings (tuple[str, ...]): Available content codings in the order of preference.
+
+    Returns:
+    str | None: The accepted coding with the highest quality, ties are broken by the order of encodings.
+                None if the response should be sent uncompressed.
+
+    Notes:
+    - A coding listed explicitly takes precedence over "*", e.g. "*, gzip;q=0" accepts every coding but gzip.
+    """
+    if accept_encoding is None:
+        return None
+
+    qualities: dict[str, float] = {}
+    wildcard_quality: float | None = None
+
+    for coding in accept_encoding.split(","):
+        name, *parameters = [part.strip().lower() for part in coding.split(";")]
+        quality = 1.0
+
+        for parameter in parameters:
+            key, _, value = parameter.partition("=")
+
+            if key.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+
+        if name == "*":
+            wildcard_quality = quality
+        elif name != "":
+            qualities[name] = quality
+
+    best_encoding: str | None = None
+    best_quality = 0.0
+
+    for encoding in encodings:
+        quality = qualities.get(encoding, wildcard_quality or 0.0)
+
+        if quality > best_quality:
+            best_encoding, best_quality = encoding, quality
+
+    return best_encoding
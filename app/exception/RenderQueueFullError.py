@@ -0,0 +1,2 @@
+class RenderQueueFullError(Exception):
+    pass
@@ -0,0 +1,7 @@
+class WakatimeRequestRejectedError(Exception):
+    # status code of the Wakatime response, e.g. 401 for a bad API key or 403 for a private profile
+    status_code: int
+
+    def __init__(self, message: str, status_code: int) -> None:
+        super().__init__(message)
+        self.status_code = status_code
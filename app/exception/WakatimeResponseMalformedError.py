@@ -0,0 +1,2 @@
+class WakatimeResponseMalformedError(Exception):
+    pass
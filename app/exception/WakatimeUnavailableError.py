@@ -0,0 +1,7 @@
+class WakatimeUnavailableError(Exception):
+    # seconds after which Wakatime may be called again, if known
+    retry_after: float | None
+
+    def __init__(self, message: str, retry_after: float | None = None) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
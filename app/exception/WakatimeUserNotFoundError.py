@@ -0,0 +1,2 @@
+class WakatimeUserNotFoundError(Exception):
+    pass
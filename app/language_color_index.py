@@ -0,0 +1,222 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Any
+from dotenv import load_dotenv
+
+from .client import github_api_client
+from .client import http_client
+
+log = logging.getLogger(__name__)
+log.setLevel(logging.DEBUG)
+
+_ = load_dotenv()
+
+SNAPSHOT_PATH: str = os.path.join(
+    os.path.dirname(__file__), "resources", "language_colors.json"
+)
+CACHE_PATH: str = os.getenv("LANGUAGE_COLORS_CACHE_PATH", "cache/language_colors.json")
+TTL_SECONDS: int = int(os.getenv("LANGUAGE_COLORS_TTL_SECONDS", "86400"))
+RETRY_SECONDS: int = 300
+
+_colors: dict[str, str] = {}
+_etag: str | None = None
+_fetched_at: float = 0.0
+# set once load() ran, so a missing index isn't read from disk again on every call
+_loaded: bool = False
+
+_refresh_lock = asyncio.Lock()
+_refresh_task: asyncio.Task[None] | None = None
+
+
+async def get_colors() -> dict[str, str]:
+    """
+    Returns the language color index.
+
+    Returns:
+    dict[str, str]: A dictionary mapping case-folded language names to HEX colors.
+
+    Notes:
+    - The returned dictionary is shared and must not be modified by the caller.
+    - Never touches the network, the index is loaded by load() and kept fresh by the background refresh.
+    - If the index isn't loaded yet, it is read from disk in a worker thread once.
+    """
+    if not _loaded:
+        await asyncio.to_thread(load)
+
+    return _colors
+
+
+def load() -> None:
+    """
+    Loads the language color index from the on-disk cache, or from the bundled snapshot if there is no cache.
+    """
+    global _loaded
+
+    _loaded = True
+
+    for path in (CACHE_PATH, SNAPSHOT_PATH):
+        index = _read_index(path)
+
+        if index is not None:
+            _set_index(index)
+            log.info(f"Loaded {len(_colors)} language colors from {path}")
+            return
+
+    log.error("Couldn't load language colors neither from the cache nor from the snapshot")
+
+
+async def refresh() -> None:
+    """
+    Refreshes the language color index from the github-linguist using a conditional GET.
+
+    Notes:
+    - If languages.yml hasn't changed since the last download only the fetch time is updated.
+    - Parsing and writing the index run in a worker thread to keep the event loop responsive.
+    - The refreshed index is written to CACHE_PATH so it survives restarts.
+    """
+    global _fetched_at
+
+    async with _refresh_lock:
+        text, etag = await github_api_client.get_github_languages_yml(_etag)
+
+        if text is None:
+            log.debug("languages.yml is not modified")
+            _fetched_at = time.time()
+            index = _to_index(_colors, _etag, _fetched_at)
+        else:
+            colors = await asyncio.to_thread(build_index, text)
+            index = _to_index(colors, etag, time.time())
+            _set_index(index)
+            log.info(f"Refreshed {len(_colors)} language colors")
+
+        await asyncio.to_thread(_write_index, CACHE_PATH, index)
+
+
+def start_background_refresh() -> None:
+    """
+    Starts a task refreshing the language color index every TTL_SECONDS on the running event loop.
+    """
+    global _refresh_task
+
+    if _refresh_task is not None and not _refresh_task.done():
+        return
+
+    _refresh_task = asyncio.create_task(_refresh_loop(), name="language-colors-refresh")
+
+
+def stop_background_refresh() -> None:
+    global _refresh_task
+
+    if _refresh_task is not None:
+        _ = _refresh_task.cancel()
+        _refresh_task = None
+
+
+def build_index(languages_yml: str) -> dict[str, str]:
+    """
+    Parses languages.yml into a compact language color index.
+
+    Parameters:
+    languages_yml (str): The content of the github-linguist languages.yml.
+
+    Returns:
+    dict[str, str]: A dictionary mapping case-folded language names to HEX colors.
+
+    Notes:
+    - Languages without a color are skipped.
+    """
+    from ruamel.yaml import YAML
+
+    yaml = YAML(typ="safe", pure=False)
+    languages_yaml: dict[str, dict[str, Any]] = yaml.load(languages_yml)
+
+    return {
+        str(name).casefold(): str(language["color"])
+        for name, language in languages_yaml.items()
+        if isinstance(language, dict) and language.get("color") is not None
+    }
+
+
+async def _refresh_loop() -> None:
+    while True:
+        delay = max(TTL_SECONDS - (time.time() - _fetched_at), 0)
+        await asyncio.sleep(delay)
+
+        try:
+            await refresh()
+        except Exception as e:
+            log.warning(f"Couldn't refresh language colors: {e}")
+            await asyncio.sleep(RETRY_SECONDS)
+
+
+def _set_index(index: dict[str, Any]) -> None:
+    global _colors, _etag, _fetched_at
+
+    _colors = {str(name): str(color) for name, color in index["colors"].items()}
+    _etag = index.get("etag")
+    _fetched_at = float(index.get("fetched_at", 0.0))
+
+
+def _to_index(
+    colors: dict[str, str], etag: str | None, fetched_at: float
+) -> dict[str, Any]:
+    return {"etag": etag, "fetched_at": fetched_at, "colors": colors}
+
+
+def _read_index(path: str) -> dict[str, Any] | None:
+    if not os.path.exists(path):
+        return None
+
+    try:
+        with open(path, encoding="utf-8") as file:
+            index: dict[str, Any] = json.load(file)
+    except (OSError, ValueError) as e:
+        log.warning(f"Couldn't read language colors from {path}: {e}")
+        return None
+
+    if not isinstance(index.get("colors"), dict):
+        return None
+
+    return index
+
+
+def _write_index(path: str, index: dict[str, Any]) -> None:
+    directory = os.path.dirname(path)
+
+    if directory != "" and not os.path.exists(directory):
+        os.makedirs(directory)
+
+    temp_path = f"{path}.tmp"
+
+    with open(temp_path, "w", encoding="utf-8") as file:
+        json.dump(index, file, separators=(",", ":"))
+
+    os.replace(temp_path, path)
+
+
+async def update_snapshot() -> None:
+    """
+    Downloads languages.yml and replaces the bundled snapshot with the full color table, run on image builds.
+    """
+    text, etag = await github_api_client.get_github_languages_yml()
+    assert text is not None
+
+    colors = await asyncio.to_thread(build_index, text)
+    await asyncio.to_thread(_write_index, SNAPSHOT_PATH, _to_index(colors, etag, time.time()))
+    log.info(f"Wrote {len(colors)} language colors to {SNAPSHOT_PATH}")
+
+
+if __name__ == "__main__":
+    # python -m app.language_color_index
+    logging.basicConfig()
+
+    async def _main() -> None:
+        try:
+            await update_snapshot()
+        finally:
+            await http_client.close()
+
+    asyncio.run(_main())
@@ -1,29 +1,164 @@
+import asyncio
+import hashlib
+import json
 import logging
-from typing import Annotated
+import math
+import os
+from contextlib import asynccontextmanager
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Annotated, AsyncIterator
+from dotenv import load_dotenv
 from fastapi import FastAPI, HTTPException, Query, Request
-from fastapi.datastructures import QueryParams
-from fastapi.responses import FileResponse
+from fastapi.datastructures import URL, QueryParams
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
 
+from . import bundle_builder
+from . import chart_manager
 from . import chart_service
+from . import compression
+from . import language_color_index
+from . import metrics
+from . import prewarm_scheduler
+from . import profiler
+from . import render_cache
+from . import render_pool
+from . import stats_cache
+from . import stats_snapshot_store
+from . import summary_store
+from .client import http_client
+from .exception.RenderQueueFullError import RenderQueueFullError
+from .exception.WakatimeRequestRejectedError import WakatimeRequestRejectedError
+from .exception.WakatimeResponseMalformedError import WakatimeResponseMalformedError
+from .exception.WakatimeUnavailableError import WakatimeUnavailableError
+from .exception.WakatimeUserNotFoundError import WakatimeUserNotFoundError
+from .model.chart.bundle_layout import BundleLayout
+from .model.chart.cached_render import CachedRender
 from .model.chart.chart import Chart
 from .model.chart.chart_data_type import ChartDataType
+from .model.chart.chart_format import ChartFormat
 from .model.chart.chart_type import ChartType
 from .model.chart.chart_request import ChartRequest
+from .model.chart.prepared_chart import PreparedChart
+from .model.wakatime.stats_range import StatsRange
 
 
 log = logging.getLogger(__name__)
 
-app = FastAPI()
+_ = load_dotenv()
+
+SVG_MEDIA_TYPE: str = "image/svg+xml"
+
+# in the order of preference when the Accept header accepts several formats equally
+MEDIA_TYPES: dict[ChartFormat, str] = {
+    ChartFormat.SVG: SVG_MEDIA_TYPE,
+    ChartFormat.WEBP: "image/webp",
+    ChartFormat.PNG: "image/png",
+}
+
+# chart size, format and range parameters, never parsed as colors
+SIZE_PARAMS: tuple[str, ...] = ("width", "height")
+FORMAT_PARAM: str = "format"
+RANGE_PARAM: str = "range"
+
+CACHE_MAX_AGE_SECONDS: int = int(os.getenv("CHART_CACHE_MAX_AGE_SECONDS", "300"))
+CACHE_STALE_WHILE_REVALIDATE_SECONDS: int = int(
+    os.getenv("CHART_CACHE_STALE_WHILE_REVALIDATE_SECONDS", "3600")
+)
+CACHE_CONTROL: str = (
+    f"public, max-age={CACHE_MAX_AGE_SECONDS}, "
+    f"stale-while-revalidate={CACHE_STALE_WHILE_REVALIDATE_SECONDS}"
+)
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI) -> AsyncIterator[None]:
+    language_color_index.load()
+    language_color_index.start_background_refresh()
+    await render_pool.start()
+
+    chart_store_janitor: asyncio.Task[None] | None = None
+
+    if chart_manager.PERSIST_CHARTS:
+        chart_store_janitor = asyncio.create_task(chart_manager.run_janitor())
+
+    _ = await stats_cache.load_snapshots()
+
+    if prewarm_scheduler.CONFIG_PATH is not None:
+        prewarm_scheduler.pin(_read_prewarm_config(prewarm_scheduler.CONFIG_PATH))
+
+    prewarm_scheduler.start()
+
+    yield
+
+    prewarm_scheduler.stop()
+
+    if chart_store_janitor is not None:
+        _ = chart_store_janitor.cancel()
+
+    language_color_index.stop_background_refresh()
+    render_pool.shutdown()
+    summary_store.close()
+    await stats_cache.wait_for_snapshots()
+    stats_snapshot_store.close()
+    await http_client.close()
+
+
+app = FastAPI(lifespan=lifespan)
+
+
+@app.exception_handler(RenderQueueFullError)
+async def render_queue_full(_: Request, e: RenderQueueFullError) -> Response:
+    log.warning(f"Rejecting chart request: {e}")
+    return PlainTextResponse(
+        "Too many charts are being rendered, try again later",
+        status_code=503,
+        headers={"Retry-After": "1"},
+    )
+
+
+@app.exception_handler(WakatimeRequestRejectedError)
+async def wakatime_request_rejected(_: Request, e: WakatimeRequestRejectedError) -> Response:
+    log.error(f"Wakatime rejected a request: {e}")
+    # retrying wouldn't help, so unlike unavailability there's no Retry-After
+    return PlainTextResponse(f"Wakatime rejected the request with {e.status_code}", status_code=502)
+
+
+@app.exception_handler(WakatimeResponseMalformedError)
+async def wakatime_response_malformed(_: Request, e: WakatimeResponseMalformedError) -> Response:
+    log.error(f"Wakatime sent malformed stats: {e}")
+    return PlainTextResponse("Wakatime sent malformed stats", status_code=502)
+
+
+@app.exception_handler(WakatimeUnavailableError)
+async def wakatime_unavailable(_: Request, e: WakatimeUnavailableError) -> Response:
+    log.warning(f"Wakatime is unavailable: {e}")
+    return PlainTextResponse(
+        "Wakatime is unavailable, try again later",
+        status_code=503,
+        headers={"Retry-After": str(max(math.ceil(e.retry_after or 0), 1))},
+    )
+
+
+@app.exception_handler(WakatimeUserNotFoundError)
+async def wakatime_user_not_found(_: Request, e: WakatimeUserNotFoundError) -> Response:
+    return PlainTextResponse(str(e), status_code=404)
+
+
+@app.get("/metrics")
+async def metrics_endpoint() -> Response:
+    return Response(content=metrics.export(), media_type=metrics.CONTENT_TYPE)
 
 
 @app.get("/api/{username}/pie/languages")
-def languages(
+async def languages(
     username: str,
     request: Request,
     hide: str | None = None,
     width: int | None = None,
     height: int | None = None,
-) -> FileResponse:
+    output_format: Annotated[ChartFormat | None, Query(alias=FORMAT_PARAM)] = None,
+    stats_range: Annotated[StatsRange, Query(alias=RANGE_PARAM)] = StatsRange.LAST_7_DAYS,
+) -> Response:
     languages_to_hide: set[str] | None = _parse_hide(hide)
     language_colors: dict[str, str] | None = _parse_colors(request.query_params)
 
@@ -38,27 +173,24 @@ def languages(
         colors=language_colors,
         width=width,
         height=height,
+        output_format=_negotiate_format(request.headers.get("Accept"), output_format),
+        stats_range=stats_range,
     )
 
-    chart: Chart | None = chart_service.create_chart(chart_request)
-
-    if chart is None:
-        raise HTTPException(
-            status_code=500, detail="Couldn't create a pie chart for some reason"
-        )
-
-    return FileResponse(chart.path)
+    return await _chart_response(request, chart_request)
 
 
 @app.get("/api/{username}/pie/projects")
-def projects(
+async def projects(
     username: str,
     request: Request,
     hide: Annotated[list[str] | None, Query()] = None,
     group: Annotated[list[str] | None, Query()] = None,
     width: int | None = None,
     height: int | None = None,
-):
+    output_format: Annotated[ChartFormat | None, Query(alias=FORMAT_PARAM)] = None,
+    stats_range: Annotated[StatsRange, Query(alias=RANGE_PARAM)] = StatsRange.LAST_7_DAYS,
+) -> Response:
     elements_to_hide: set[str] | None = _parse_hide_list(hide)
     project_colors: dict[str, str] | None = None
 
@@ -84,26 +216,23 @@ def projects(
         group_colors=group_colors,
         width=width,
         height=height,
+        output_format=_negotiate_format(request.headers.get("Accept"), output_format),
+        stats_range=stats_range,
     )
 
-    chart: Chart | None = chart_service.create_chart(chart_request)
-
-    if chart is None:
-        raise HTTPException(
-            status_code=500, detail="Couldn't create a pie chart for some reason"
-        )
-
-    return FileResponse(chart.path)
+    return await _chart_response(request, chart_request)
 
 
 @app.get("/api/{username}/pie/editors")
-def editors(
+async def editors(
     username: str,
     request: Request,
     hide: str | None = None,
     width: int | None = None,
     height: int | None = None,
-):
+    output_format: Annotated[ChartFormat | None, Query(alias=FORMAT_PARAM)] = None,
+    stats_range: Annotated[StatsRange, Query(alias=RANGE_PARAM)] = StatsRange.LAST_7_DAYS,
+) -> Response:
     editors_to_hide: set[str] | None = _parse_hide(hide)
     editor_colors: dict[str, str] | None = _parse_colors(request.query_params)
 
@@ -115,16 +244,534 @@ def editors(
         colors=editor_colors,
         width=width,
         height=height,
+        output_format=_negotiate_format(request.headers.get("Accept"), output_format),
+        stats_range=stats_range,
+    )
+
+    return await _chart_response(request, chart_request)
+
+
+@app.get("/api/{username}/pie/bundle")
+async def bundle(
+    username: str,
+    request: Request,
+    sections: str = "languages,projects,editors",
+    layout: BundleLayout = BundleLayout.VERTICAL,
+    output_format: Annotated[str, Query(alias="format", pattern="^(svg|json)$")] = "svg",
+    width: int | None = None,
+    height: int | None = None,
+    stats_range: Annotated[StatsRange, Query(alias=RANGE_PARAM)] = StatsRange.LAST_7_DAYS,
+) -> Response:
+    """
+    Renders several charts of the user from a single Wakatime fetch.
+
+    Notes:
+    - sections is a comma-separated list of languages, projects and editors.
+    - Parameters of each section are the parameters of its own endpoint prefixed with the section name and a dot,
+      e.g. languages.hide=java**, projects.group=work, projects.work=curo** or editors.vscode=007ACC.
+    - width, height and range apply to every chart.
+    - The svg format stacks the charts into one image, the json format maps section names to separate SVGs.
+    """
+    chart_requests: list[ChartRequest] = [
+        _parse_section(username, section.strip(), request.query_params, width, height, stats_range)
+        for section in sections.split(",")
+        if section.strip() != ""
+    ]
+
+    if len(chart_requests) == 0:
+        raise HTTPException(status_code=400, detail="No sections to render")
+
+    return await _bundle_response(request, chart_requests, layout, output_format)
+
+
+async def _chart_response(request: Request, chart_request: ChartRequest) -> Response:
+    """
+    Creates a chart response with HTTP validators, answering conditional requests without rendering.
+
+    Parameters:
+    request (Request): The incoming request, checked for If-None-Match and If-Modified-Since.
+    chart_request (ChartRequest): The chart to respond with.
+
+    Returns:
+    Response: 304 Not Modified if the client already has the chart, otherwise the chart itself.
+              Both carry ETag, Last-Modified, Cache-Control, Vary and Server-Timing headers.
+
+    Notes:
+    - The ETag is the render key of the chart, derived from the chart's input data, style parameters and format.
+    - The format may be negotiated from the Accept header, so responses vary by Accept.
+    - SVG charts are sent compressed if the Accept-Encoding header allows it, with the content coding appended to
+      the ETag. Compressed variants are produced once per render, nothing is compressed per request.
+    - Last-Modified is the time the Wakatime stats were fetched.
+    - Server-Timing holds the wall time of each pipeline stage that ran for this request.
+    - Requests with a valid profiling token are answered by _profiled_chart_response() instead.
+    """
+    profiling_token: str | None = request.headers.get(
+        profiler.TOKEN_HEADER
+    ) or request.query_params.get(profiler.TOKEN_QUERY_PARAM)
+
+    if profiling_token is not None:
+        if profiler.is_authorized(profiling_token):
+            return await _profiled_chart_response(chart_request)
+
+        log.warning("Ignoring a request to profile a chart with an invalid token")
+
+    with metrics.collect_timings() as timings:
+        prepared_chart: PreparedChart = await chart_service.prepare_chart(chart_request)
+        # failed requests, e.g. of unknown users, aren't kept warm
+        prewarm_scheduler.record(chart_request)
+
+        encoding: str | None = compression.negotiate(
+            request.headers.get("Accept-Encoding"),
+            compression.ENCODINGS
+            if chart_request.output_format in chart_service.COMPRESSIBLE_FORMATS
+            else (),
+        )
+
+        # each content coding is a different representation with its own strong ETag
+        etag = (
+            f'"{prepared_chart.render_key}"'
+            if encoding is None
+            else f'"{prepared_chart.render_key}-{encoding}"'
+        )
+        headers = _cache_headers(etag, prepared_chart.fetched_at, chart_request.stats_range)
+        headers["Vary"] = "Accept, Accept-Encoding"
+
+        if _is_not_modified(request, etag, prepared_chart.fetched_at):
+            headers["Server-Timing"] = metrics.server_timing(timings)
+            return Response(status_code=304, headers=headers)
+
+        chart: Chart = await chart_service.render_chart(prepared_chart)
+
+    headers["Server-Timing"] = metrics.server_timing(timings)
+
+    content = chart.content
+
+    if encoding is not None:
+        content = chart.encoded[encoding]
+        headers["Content-Encoding"] = encoding
+
+    return Response(
+        content=content,
+        media_type=MEDIA_TYPES[chart_request.output_format],
+        headers=headers,
     )
 
-    chart: Chart | None = chart_service.create_chart(chart_request)
 
-    if chart is None:
-        raise HTTPException(
-            status_code=500, detail="Couldn't create a pie chart for some reason"
+async def _bundle_response(
+    request: Request,
+    chart_requests: list[ChartRequest],
+    layout: BundleLayout,
+    output_format: str,
+) -> Response:
+    """
+    Creates a response with several charts, answering conditional requests without rendering.
+
+    Parameters:
+    request (Request): The incoming request, checked for If-None-Match and If-Modified-Since.
+    chart_requests (list[ChartRequest]): The charts to respond with.
+    layout (BundleLayout): Layout of the charts in the svg format.
+    output_format (str): "svg" for a single composite image, "json" for a JSON object of SVGs by section.
+
+    Returns:
+    Response: 304 Not Modified if the client already has the charts, otherwise the charts.
+
+    Notes:
+    - Charts are prepared concurrently, stats_cache collapses their stats fetches into one upstream call.
+    - The ETag is derived from the render keys of all charts, the layout and the format.
+    - Composite SVGs are cached in render_cache along with their compressed variants and sent compressed
+      if the Accept-Encoding header allows it, with the content coding appended to the ETag.
+    """
+    with metrics.collect_timings() as timings:
+        prepared_charts: list[PreparedChart] = list(
+            await asyncio.gather(
+                *(chart_service.prepare_chart(chart_request) for chart_request in chart_requests)
+            )
         )
 
-    return FileResponse(chart.path)
+        for chart_request in chart_requests:
+            prewarm_scheduler.record(chart_request)
+
+        digest = hashlib.blake2b(digest_size=20)
+
+        for prepared_chart in prepared_charts:
+            digest.update(prepared_chart.render_key.encode())
+
+        digest.update(f"{layout.value}:{output_format}".encode())
+
+        bundle_key = f"bundle-{digest.hexdigest()}"
+        encoding: str | None = compression.negotiate(
+            request.headers.get("Accept-Encoding"),
+            compression.ENCODINGS if output_format == "svg" else (),
+        )
+        etag = f'"{bundle_key}"' if encoding is None else f'"{bundle_key}-{encoding}"'
+        fetched_at = max(prepared_chart.fetched_at for prepared_chart in prepared_charts)
+        headers = _cache_headers(etag, fetched_at, chart_requests[0].stats_range)
+        headers["Vary"] = "Accept-Encoding"
+
+        if _is_not_modified(request, etag, fetched_at):
+            headers["Server-Timing"] = metrics.server_timing(timings)
+            return Response(status_code=304, headers=headers)
+
+        # composite SVGs are cached like charts, so they're composed and compressed once
+        cached_bundle = render_cache.get_render(bundle_key) if output_format == "svg" else None
+        charts: list[Chart] = []
+
+        if cached_bundle is None:
+            charts = list(
+                await asyncio.gather(
+                    *(chart_service.render_chart(prepared_chart) for prepared_chart in prepared_charts)
+                )
+            )
+
+    headers["Server-Timing"] = metrics.server_timing(timings)
+
+    if output_format == "json":
+        return JSONResponse(
+            {
+                chart_request.chart_data.name.lower(): chart.content.decode()
+                for chart_request, chart in zip(chart_requests, charts)
+            },
+            headers=headers,
+        )
+
+    if cached_bundle is None:
+        content = bundle_builder.compose_svg(
+            [
+                (chart.content, chart_request.height, chart_request.width)
+                for chart_request, chart in zip(chart_requests, charts)
+            ],
+            layout,
+        )
+        cached_bundle = CachedRender(content, compression.compress(content))
+        render_cache.put(bundle_key, cached_bundle.content, cached_bundle.encoded)
+
+    content = cached_bundle.content
+
+    if encoding is not None:
+        content = cached_bundle.encoded[encoding]
+        headers["Content-Encoding"] = encoding
+
+    return Response(content=content, media_type=SVG_MEDIA_TYPE, headers=headers)
+
+
+def _cache_headers(
+    etag: str, last_modified: float, stats_range: StatsRange = StatsRange.LAST_7_DAYS
+) -> dict[str, str]:
+    return {
+        "ETag": etag,
+        "Last-Modified": formatdate(last_modified, usegmt=True),
+        "Cache-Control": _cache_control(stats_range),
+    }
+
+
+def _cache_control(stats_range: StatsRange) -> str:
+    """
+    Returns the Cache-Control header of charts of the range.
+
+    Notes:
+    - CACHE_CONTROL applies to the last 7 days, the max-age and stale-while-revalidate of longer ranges
+      are scaled by their stats TTL relative to the last 7 days TTL, so caches keep them as long as stats_cache does.
+    """
+    range_ttl = stats_cache.RANGE_TTL_SECONDS.get(stats_range)
+
+    if range_ttl is None or stats_cache.TTL_SECONDS <= 0:
+        return CACHE_CONTROL
+
+    scale = range_ttl / stats_cache.TTL_SECONDS
+
+    return (
+        f"public, max-age={int(CACHE_MAX_AGE_SECONDS * scale)}, "
+        f"stale-while-revalidate={int(CACHE_STALE_WHILE_REVALIDATE_SECONDS * scale)}"
+    )
+
+
+async def _profiled_chart_response(chart_request: ChartRequest) -> Response:
+    """
+    Creates the chart under the sampling profiler and responds with the profile instead of the chart.
+
+    Parameters:
+    chart_request (ChartRequest): The chart to profile.
+
+    Returns:
+    Response: The profile in the collapsed stack format with the Server-Timing header.
+
+    Notes:
+    - The chart is always rendered, bypassing conditional requests and the render cache.
+    - The chart is rendered on the event loop thread instead of the render pool, so the sampler sees the renderer.
+    - The profile is also stored in profiler.PROFILES_DIRECTORY if it's set.
+    """
+    log.info(f"Profiling chart {chart_request.uuid}")
+
+    with metrics.collect_timings() as timings, profiler.profile() as stacks:
+        prepared_chart = await chart_service.prepare_chart(chart_request)
+        _ = await chart_service.render_chart(prepared_chart, use_cache=False, inline=True)
+
+    collapsed_profile = profiler.to_collapsed(stacks)
+    _ = await asyncio.to_thread(profiler.save, chart_request.uuid, collapsed_profile)
+
+    return PlainTextResponse(
+        collapsed_profile,
+        headers={
+            "Server-Timing": metrics.server_timing(timings),
+            "Cache-Control": "no-store",
+        },
+    )
+
+
+def _negotiate_format(accept: str | None, output_format: ChartFormat | None) -> ChartFormat:
+    """
+    Picks the format of a chart, the format parameter takes precedence over the Accept header.
+
+    Parameters:
+    accept (str | None): The Accept header of the request.
+    output_format (ChartFormat | None): The format parameter of the request.
+
+    Returns:
+    ChartFormat: The acceptable format with the highest quality, ties are broken by the order of MEDIA_TYPES.
+                 SVG if there is no Accept header or none of the formats is acceptable.
+
+    Notes:
+    - As described in RFC 9110, the most specific media range matching a format sets its quality,
+      e.g. "image/*, image/png;q=0" accepts every format but PNG.
+    """
+    if output_format is not None:
+        return output_format
+
+    if accept is None:
+        return ChartFormat.SVG
+
+    # quality of each format along with the specificity of the media range it was set by
+    qualities: dict[ChartFormat, tuple[int, float]] = {}
+
+    for media_range in accept.split(","):
+        media_type, *parameters = [part.strip().lower() for part in media_range.split(";")]
+        quality = 1.0
+
+        for parameter in parameters:
+            name, _, value = parameter.partition("=")
+
+            if name.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+
+        for chart_format, format_media_type in MEDIA_TYPES.items():
+            specificity = _match_media_range(media_type, format_media_type)
+
+            if specificity > qualities.get(chart_format, (-1, 0.0))[0]:
+                qualities[chart_format] = (specificity, quality)
+
+    best_format: ChartFormat = ChartFormat.SVG
+    best_quality = 0.0
+
+    for chart_format in MEDIA_TYPES:
+        _, quality = qualities.get(chart_format, (-1, 0.0))
+
+        if quality > best_quality:
+            best_format, best_quality = chart_format, quality
+
+    return best_format
+
+
+def _match_media_range(media_range: str, media_type: str) -> int:
+    """
+    Returns how specifically the media range matches the media type: 2 exactly, 1 by type/*, 0 by */*, -1 not at all.
+    """
+    if media_range == media_type:
+        return 2
+
+    if media_range == f"{media_type.split('/')[0]}/*":
+        return 1
+
+    return 0 if media_range == "*/*" else -1
+
+
+def _is_not_modified(request: Request, etag: str, last_modified: float) -> bool:
+    """
+    Evaluates If-None-Match, or If-Modified-Since when there is no If-None-Match, as described in RFC 9110.
+
+    Parameters:
+    request (Request): The incoming request.
+    etag (str): The current strong ETag of the chart.
+    last_modified (float): The current modification time of the chart as a timestamp.
+
+    Returns:
+    bool: True if the client's copy of the chart is up to date.
+    """
+    if_none_match: str | None = request.headers.get("If-None-Match")
+
+    if if_none_match is not None:
+        client_etags = [tag.strip() for tag in if_none_match.split(",")]
+
+        # If-None-Match uses the weak comparison
+        return "*" in client_etags or any(
+            tag.removeprefix("W/") == etag for tag in client_etags
+        )
+
+    if_modified_since: str | None = request.headers.get("If-Modified-Since")
+
+    if if_modified_since is None:
+        return False
+
+    try:
+        client_time = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+
+    return int(last_modified) <= int(client_time.timestamp())
+
+
+def _parse_section(
+    username: str,
+    section: str,
+    query: QueryParams,
+    width: int | None,
+    height: int | None,
+    stats_range: StatsRange = StatsRange.LAST_7_DAYS,
+) -> ChartRequest:
+    """
+    Parses the parameters of a bundle section into a chart request.
+
+    Parameters:
+    username (str): Wakatime username.
+    section (str): Name of the section, one of languages, projects and editors.
+    query (QueryParams): Query parameters of the bundle request.
+    width (int | None): Width of the chart in pixels.
+    height (int | None): Height of the chart in pixels.
+    stats_range (StatsRange): Range of the stats the chart is rendered from.
+
+    Returns:
+    ChartRequest: A request parsed the same way as the section's own endpoint parses its parameters.
+
+    Raises:
+    HTTPException: If the section is unknown.
+    """
+    try:
+        chart_data = ChartDataType[section.upper()]
+    except KeyError:
+        raise HTTPException(status_code=400, detail=f"Unknown section {section}")
+
+    prefix = f"{section}."
+    section_query = QueryParams(
+        [
+            (key.removeprefix(prefix), value)
+            for key, value in query.multi_items()
+            if key.startswith(prefix)
+        ]
+    )
+
+    return _parse_chart_request(
+        username, chart_data, section_query, width, height, stats_range=stats_range
+    )
+
+
+def _parse_chart_request(
+    username: str,
+    chart_data: ChartDataType,
+    query: QueryParams,
+    width: int | None,
+    height: int | None,
+    output_format: ChartFormat = ChartFormat.SVG,
+    stats_range: StatsRange = StatsRange.LAST_7_DAYS,
+) -> ChartRequest:
+    """
+    Parses query parameters of a chart the same way the endpoint of chart_data parses them.
+    """
+    if chart_data != ChartDataType.PROJECTS:
+        return ChartRequest(
+            ChartType.PIE,
+            chart_data,
+            username,
+            hide=_parse_hide(query.get("hide")),
+            colors=_parse_colors(query),
+            width=width,
+            height=height,
+            output_format=output_format,
+            stats_range=stats_range,
+        )
+
+    groups: dict[str, set[str]] | None = None
+    group_colors: dict[str, str] | None = None
+
+    parse_group_result = _parse_group(query.getlist("group") or None, query)
+
+    if parse_group_result is not None:
+        (groups, group_colors) = parse_group_result
+
+    return ChartRequest(
+        ChartType.PIE,
+        chart_data,
+        username,
+        hide=_parse_hide_list(query.getlist("hide") or None),
+        colors=_parse_project_colors(
+            query, list(groups.keys()) if groups is not None else None
+        ),
+        groups=groups,
+        group_colors=group_colors,
+        width=width,
+        height=height,
+        output_format=output_format,
+        stats_range=stats_range,
+    )
+
+
+def _read_prewarm_config(path: str) -> list[ChartRequest]:
+    """
+    Reads chart URLs to keep warm from a JSON list, e.g. ["/api/{username}/pie/languages?hide=java"].
+
+    Notes:
+    - URLs are parsed the same way the chart endpoints parse them, invalid URLs are skipped with a warning.
+    """
+    try:
+        with open(path, encoding="utf-8") as file:
+            urls: object = json.load(file)
+    except (OSError, ValueError) as e:
+        log.warning(f"Couldn't read the pre-warm config {path}: {e}")
+        return []
+
+    if not isinstance(urls, list):
+        log.warning(f"Couldn't read the pre-warm config {path}: expected a JSON list of chart URLs")
+        return []
+
+    chart_requests: list[ChartRequest] = []
+
+    for url in urls:
+        if not isinstance(url, str):
+            log.warning(f"Skipping pre-warm URL {url!r}, expected a string")
+            continue
+
+        parsed_url = URL(url)
+        parts = parsed_url.path.strip("/").split("/")
+
+        if len(parts) != 4 or parts[0] != "api" or parts[2] != "pie" or parts[3].upper() not in ChartDataType.__members__:
+            log.warning(f"Skipping pre-warm URL {url}, expected /api/{{username}}/pie/{{languages|projects|editors}}")
+            continue
+
+        query = QueryParams(parsed_url.query)
+        width = query.get("width")
+        height = query.get("height")
+        output_format = query.get(FORMAT_PARAM)
+        stats_range = query.get(RANGE_PARAM)
+
+        try:
+            chart_requests.append(
+                _parse_chart_request(
+                    parts[1],
+                    ChartDataType[parts[3].upper()],
+                    query,
+                    int(width) if width is not None else None,
+                    int(height) if height is not None else None,
+                    ChartFormat(output_format) if output_format is not None else ChartFormat.SVG,
+                    StatsRange(stats_range) if stats_range is not None else StatsRange.LAST_7_DAYS,
+                )
+            )
+        except ValueError as e:
+            log.warning(f"Skipping pre-warm URL {url}: {e}")
+
+    log.info(f"Read {len(chart_requests)} charts to pre-warm from {path}")
+
+    return chart_requests
 
 
 def _parse_hide_list(hide_query: list[str] | None) -> set[str] | None:
@@ -228,6 +875,10 @@ def _parse_project_colors(
             continue
         if key == "group":
             continue
+        if key == profiler.TOKEN_QUERY_PARAM:
+            continue
+        if key in SIZE_PARAMS or key in (FORMAT_PARAM, RANGE_PARAM):
+            continue
         if key.endswith("_color"):
             continue
         if groups is not None and key in groups:
@@ -267,6 +918,12 @@ def _parse_colors(query: QueryParams | None) -> dict[str, str] | None:
         if key == "hide":
             continue
 
+        if key == profiler.TOKEN_QUERY_PARAM:
+            continue
+
+        if key in SIZE_PARAMS or key in (FORMAT_PARAM, RANGE_PARAM):
+            continue
+
         if colors is None:
             colors = dict()
 
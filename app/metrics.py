@@ -0,0 +1,211 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Histogram, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from prometheus_client.registry import REGISTRY, Collector
+
+from .model.chart.chart_data_type import ChartDataType
+
+CONTENT_TYPE: str = CONTENT_TYPE_LATEST
+
+# render buckets go up to the worst matplotlib renders under load
+STAGE_BUCKETS: tuple[float, ...] = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10,
+)
+UPSTREAM_BUCKETS: tuple[float, ...] = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+STAGE_SECONDS = Histogram(
+    "chart_stage_seconds",
+    "Time spent in each stage of the chart pipeline",
+    ["stage", "chart_data"],
+    buckets=STAGE_BUCKETS,
+)
+
+UPSTREAM_REQUESTS = Counter(
+    "upstream_requests",
+    "Requests to upstream APIs by client and response status",
+    ["client", "status"],
+)
+
+UPSTREAM_RETRIES = Counter(
+    "upstream_retries",
+    "Retried upstream requests by client",
+    ["client"],
+)
+
+UPSTREAM_REJECTIONS = Counter(
+    "upstream_rejections",
+    "Upstream calls given up by client and reason: circuit_open, throttled, retries_exhausted or deadline_exceeded",
+    ["client", "reason"],
+)
+
+SUMMARY_DAYS = Counter(
+    "summary_store_days",
+    "Days summed up by the summary store by source: stored or fetched from Wakatime",
+    ["source"],
+)
+
+PREWARM_REFRESHES = Counter(
+    "prewarm_refreshes",
+    "Charts refreshed by the pre-warm scheduler by result",
+    ["result"],
+)
+
+UPSTREAM_SECONDS = Histogram(
+    "upstream_request_seconds",
+    "Latency of requests to upstream APIs by client",
+    ["client"],
+    buckets=UPSTREAM_BUCKETS,
+)
+
+# stage timings of the current request, tasks started by the request inherit and fill the same dictionary
+_timings: ContextVar[dict[str, float] | None] = ContextVar("timings", default=None)
+
+
+@contextmanager
+def time_stage(stage: str, chart_data: ChartDataType | None = None) -> Iterator[None]:
+    """
+    Observes the wall time of the block in the chart_stage_seconds histogram and in the request timings.
+
+    Parameters:
+    stage (str): Name of the pipeline stage, e.g. "fetch" or "render".
+    chart_data (ChartDataType | None): Data type of the chart the stage runs for.
+                                       None for stages shared by all chart data types, labeled "all".
+    """
+    start = time.perf_counter()
+
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.labels(
+            stage, "all" if chart_data is None else chart_data.name.lower()
+        ).observe(elapsed)
+
+        timings = _timings.get()
+
+        if timings is not None:
+            timings[stage] = timings.get(stage, 0.0) + elapsed
+
+
+@contextmanager
+def collect_timings() -> Iterator[dict[str, float]]:
+    """
+    Collects the wall time of stages timed by time_stage() within the block, see server_timing().
+
+    Returns:
+    Iterator[dict[str, float]]: A dictionary from stage names to seconds, filled as the stages finish.
+    """
+    timings: dict[str, float] = {}
+    token = _timings.set(timings)
+
+    try:
+        yield timings
+    finally:
+        _timings.reset(token)
+
+
+def server_timing(timings: dict[str, float]) -> str:
+    """
+    Formats stage timings as a Server-Timing header value with durations in milliseconds.
+    """
+    return ", ".join(
+        f"{stage};dur={seconds * 1000:.2f}" for stage, seconds in timings.items()
+    )
+
+
+def observe_upstream(client: str, status: str, seconds: float) -> None:
+    """
+    Counts an upstream request and observes its latency.
+
+    Parameters:
+    client (str): Name of the upstream API client, e.g. "wakatime".
+    status (str): HTTP status code of the response, or "error" if there is no response.
+    seconds (float): Latency of the request.
+    """
+    UPSTREAM_REQUESTS.labels(client, status).inc()
+    UPSTREAM_SECONDS.labels(client).observe(seconds)
+
+
+def export() -> bytes:
+    """
+    Returns all metrics in the Prometheus text exposition format.
+    """
+    return generate_latest(REGISTRY)
+
+
+class _StatsCollector(Collector):
+    """
+    Exposes counters kept by the caches, the render pool and the chart store, read at scrape time.
+    """
+
+    def describe(self) -> Iterator[CounterMetricFamily | GaugeMetricFamily]:
+        # collected metrics don't have to be known upfront
+        return iter(())
+
+    def collect(self) -> Iterator[CounterMetricFamily | GaugeMetricFamily]:
+        # imported here, because upstream clients report to this module and the caches import the clients
+        from . import chart_manager, render_cache, render_pool, stats_cache
+        from .client import wakatime_api_client
+
+        render_cache_stats = render_cache.stats()
+        stats_cache_stats = stats_cache.stats()
+
+        cache_requests = CounterMetricFamily(
+            "cache_requests",
+            "Cache lookups by cache and result, the hit ratio is hits / (hits + misses)",
+            labels=["cache", "result"],
+        )
+        cache_requests.add_metric(["render", "hit"], render_cache_stats["hits"])
+        cache_requests.add_metric(["render", "miss"], render_cache_stats["misses"])
+        cache_requests.add_metric(["stats", "hit"], stats_cache_stats["hits"])
+        cache_requests.add_metric(["stats", "stale_hit"], stats_cache_stats["stale_hits"])
+        cache_requests.add_metric(["stats", "miss"], stats_cache_stats["misses"])
+        yield cache_requests
+
+        cache_entries = GaugeMetricFamily(
+            "cache_entries", "Entries currently held by each cache", labels=["cache"]
+        )
+        cache_entries.add_metric(["render"], render_cache_stats["entries"])
+        cache_entries.add_metric(["stats"], stats_cache_stats["entries"])
+        yield cache_entries
+
+        yield CounterMetricFamily(
+            "stats_snapshots_loaded",
+            "Stats cache entries loaded from snapshots persisted before the last shutdown",
+            value=stats_cache_stats["snapshots_loaded"],
+        )
+
+        circuit_open = GaugeMetricFamily(
+            "upstream_circuit_open",
+            "1 while the circuit breaker of the upstream client stops its calls",
+            labels=["client"],
+        )
+        circuit_open.add_metric(["wakatime"], int(wakatime_api_client.circuit_breaker.is_open()))
+        yield circuit_open
+
+        yield GaugeMetricFamily(
+            "render_queue_depth",
+            "Charts queued or being rendered",
+            value=render_pool.queue_depth(),
+        )
+
+        if chart_manager.PERSIST_CHARTS:
+            chart_store_stats = chart_manager.stats()
+
+            yield GaugeMetricFamily(
+                "chart_store_files",
+                "Charts stored in the plots directory",
+                value=chart_store_stats["files"],
+            )
+            yield GaugeMetricFamily(
+                "chart_store_bytes",
+                "Size of the charts stored in the plots directory",
+                value=chart_store_stats["bytes"],
+            )
+
+
+REGISTRY.register(_StatsCollector())
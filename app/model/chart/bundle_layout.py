@@ -0,0 +1,6 @@
+from enum import Enum
+
+
+class BundleLayout(Enum):
+    VERTICAL = "vertical"
+    HORIZONTAL = "horizontal"
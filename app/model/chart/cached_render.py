@@ -0,0 +1,7 @@
+class CachedRender:
+    content: bytes
+    encoded: dict[str, bytes]
+
+    def __init__(self, content: bytes, encoded: dict[str, bytes]) -> None:
+        self.content = content
+        self.encoded = encoded
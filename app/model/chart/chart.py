@@ -3,8 +3,11 @@ from uuid import UUID
 
 class Chart:
     uuid: UUID
-    path: str
+    content: bytes
+    # compressed content by content coding, empty for formats that are compressed already
+    encoded: dict[str, bytes]
 
-    def __init__(self, uuid: UUID, path: str):
+    def __init__(self, uuid: UUID, content: bytes, encoded: dict[str, bytes] | None = None):
         self.uuid = uuid
-        self.path = path
+        self.content = content
+        self.encoded = {} if encoded is None else encoded
@@ -0,0 +1,7 @@
+from enum import Enum
+
+
+class ChartFormat(Enum):
+    SVG = "svg"
+    PNG = "png"
+    WEBP = "webp"
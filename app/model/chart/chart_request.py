@@ -1,7 +1,9 @@
 from uuid import UUID, uuid4
 
+from .chart_format import ChartFormat
 from .chart_type import ChartType
 from .chart_data_type import ChartDataType
+from ..wakatime.stats_range import StatsRange
 
 
 class ChartRequest:
@@ -15,6 +17,8 @@ class ChartRequest:
     group_colors: dict[str, str] | None
     width: int | None = None
     height: int | None = None
+    output_format: ChartFormat = ChartFormat.SVG
+    stats_range: StatsRange = StatsRange.LAST_7_DAYS
 
     def __init__(
         self,
@@ -27,6 +31,8 @@ class ChartRequest:
         group_colors: dict[str, str] | None = None,
         width: int | None = None,
         height: int | None = None,
+        output_format: ChartFormat = ChartFormat.SVG,
+        stats_range: StatsRange = StatsRange.LAST_7_DAYS,
     ) -> None:
         self.uuid = uuid4()
         self.chart_type = chart_type
@@ -38,3 +44,35 @@ class ChartRequest:
         self.group_colors = group_colors
         self.width = width
         self.height = height
+        self.output_format = output_format
+        self.stats_range = stats_range
+
+    def fingerprint(self) -> str:
+        """
+        Returns a canonical representation of the request, independent of the uuid and of the ordering of sets and dicts.
+        """
+        return repr(
+            (
+                self.chart_type.name,
+                self.chart_data.name,
+                self.username,
+                _sorted_set(self.hide),
+                _sorted_dict(self.colors),
+                None
+                if self.groups is None
+                else sorted((k, _sorted_set(v)) for k, v in self.groups.items()),
+                _sorted_dict(self.group_colors),
+                self.width,
+                self.height,
+                self.output_format.value,
+                self.stats_range.value,
+            )
+        )
+
+
+def _sorted_set(values: set[str] | None) -> list[str] | None:
+    return None if values is None else sorted(values)
+
+
+def _sorted_dict(values: dict[str, str] | None) -> list[tuple[str, str]] | None:
+    return None if values is None else sorted(values.items())
@@ -0,0 +1,82 @@
+WILDCARD: str = "**"
+
+
+class ItemMatcher:
+    """
+    Hide and group specs compiled into exact names, prefixes and suffixes.
+
+    Names are matched case-insensitively: specs are lowercased when compiled and items are matched by lowercase names.
+    """
+
+    group_names: tuple[str, ...]
+    hide_names: frozenset[str]
+    hide_prefixes: tuple[str, ...]
+    hide_suffixes: tuple[str, ...]
+    group_indexes: dict[str, tuple[int, ...]]
+    group_prefixes: tuple[tuple[str, ...], ...]
+    group_suffixes: tuple[tuple[str, ...], ...]
+    has_group_wildcards: bool
+
+    def __init__(
+        self,
+        hide: frozenset[str] | None = None,
+        groups: tuple[tuple[str, frozenset[str]], ...] | None = None,
+    ) -> None:
+        hide_names = frozenset(map(str.lower, hide)) if hide is not None else frozenset()
+        groups = tuple(
+            (group_name, frozenset(map(str.lower, item_names)))
+            for group_name, item_names in (groups if groups is not None else ())
+        )
+
+        self.group_names = tuple(group_name for group_name, _ in groups)
+        self.hide_names = hide_names
+        self.hide_prefixes = _prefixes(hide_names)
+        self.hide_suffixes = _suffixes(hide_names)
+
+        group_indexes: dict[str, list[int]] = dict()
+
+        for index, (_, item_names) in enumerate(groups):
+            for item_name in item_names:
+                group_indexes.setdefault(item_name, []).append(index)
+
+        self.group_indexes = {
+            name: tuple(indexes) for name, indexes in group_indexes.items()
+        }
+        self.group_prefixes = tuple(_prefixes(item_names) for _, item_names in groups)
+        self.group_suffixes = tuple(_suffixes(item_names) for _, item_names in groups)
+        self.has_group_wildcards = any(self.group_prefixes) or any(self.group_suffixes)
+
+    def is_hidden(self, name: str) -> bool:
+        """
+        Checks if an item with the given lowercase name is hidden.
+        """
+        return (
+            name in self.hide_names
+            or name.startswith(self.hide_prefixes)
+            or name.endswith(self.hide_suffixes)
+        )
+
+    def find_groups(self, name: str) -> tuple[int, ...]:
+        """
+        Returns indexes of the groups (in group_names) an item with the given lowercase name belongs to.
+        """
+        exact = self.group_indexes.get(name, ())
+
+        if not self.has_group_wildcards:
+            return exact
+
+        return tuple(
+            index
+            for index in range(len(self.group_names))
+            if index in exact
+            or name.startswith(self.group_prefixes[index])
+            or name.endswith(self.group_suffixes[index])
+        )
+
+
+def _prefixes(item_names: frozenset[str]) -> tuple[str, ...]:
+    return tuple(sorted(name[:-2] for name in item_names if name.endswith(WILDCARD)))
+
+
+def _suffixes(item_names: frozenset[str]) -> tuple[str, ...]:
+    return tuple(sorted(name[2:] for name in item_names if name.startswith(WILDCARD)))
@@ -0,0 +1,24 @@
+from .chart_request import ChartRequest
+from ..wakatime.wakatime_item import WakatimeItem
+
+
+class PreparedChart:
+    request: ChartRequest
+    data: list[WakatimeItem]
+    colors: dict[str, str] | None
+    render_key: str
+    fetched_at: float
+
+    def __init__(
+        self,
+        request: ChartRequest,
+        data: list[WakatimeItem],
+        colors: dict[str, str] | None,
+        render_key: str,
+        fetched_at: float,
+    ) -> None:
+        self.request = request
+        self.data = data
+        self.colors = colors
+        self.render_key = render_key
+        self.fetched_at = fetched_at
@@ -0,0 +1,10 @@
+from .wakatime_response import WakatimeResponse
+
+
+class CachedWakatimeResponse:
+    response: WakatimeResponse
+    fetched_at: float
+
+    def __init__(self, response: WakatimeResponse, fetched_at: float) -> None:
+        self.response = response
+        self.fetched_at = fetched_at
@@ -0,0 +1,9 @@
+from enum import Enum
+
+
+class StatsRange(Enum):
+    LAST_7_DAYS = "last_7_days"
+    LAST_30_DAYS = "last_30_days"
+    LAST_6_MONTHS = "last_6_months"
+    LAST_YEAR = "last_year"
+    ALL_TIME = "all_time"
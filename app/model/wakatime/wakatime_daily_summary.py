@@ -0,0 +1,10 @@
+from dataclasses import dataclass
+from datetime import date
+
+from .wakatime_data import WakatimeData
+
+
+@dataclass
+class WakatimeDailySummary:
+    day: date
+    data: WakatimeData
@@ -1,13 +1,30 @@
 from dataclasses import dataclass
 
 
-@dataclass
+@dataclass(slots=True)
 class WakatimeItem:
+    """
+    Time spent on a project, language or editor.
+
+    Notes:
+    - The text fields of Wakatime items aren't charted, so they aren't stored but formatted from hours and
+      minutes when they're read, which keeps items of large stats small.
+    """
+
     total_seconds: float
     name: str
     percent: float
-    digital: str
-    decimal: str
-    text: str
     hours: int
     minutes: int
+
+    @property
+    def digital(self) -> str:
+        return f"{self.hours}:{self.minutes:02d}"
+
+    @property
+    def decimal(self) -> str:
+        return f"{self.hours + self.minutes / 60:.2f}"
+
+    @property
+    def text(self) -> str:
+        return f"{self.hours} hrs {self.minutes} mins" if self.hours != 0 else f"{self.minutes} mins"
@@ -0,0 +1,275 @@
+import asyncio
+import logging
+import os
+import random
+import time
+from dotenv import load_dotenv
+
+from . import chart_service
+from . import metrics
+from . import stats_cache
+from .exception.RenderQueueFullError import RenderQueueFullError
+from .model.chart.chart_request import ChartRequest
+from .model.wakatime.stats_range import StatsRange
+
+log = logging.getLogger(__name__)
+log.setLevel(logging.DEBUG)
+
+_ = load_dotenv()
+
+PREWARM_ENABLED: bool = os.getenv("PREWARM_ENABLED", "true").lower() in ("1", "true", "yes")
+# JSON list of chart URLs that are always kept warm, e.g. ["/api/{username}/pie/languages?hide=java"]
+CONFIG_PATH: str | None = os.getenv("PREWARM_CONFIG_PATH") or None
+
+# the most requested last 7 days charts are refreshed a bit before their stats become stale,
+# charts of longer ranges as much less often as their stats are cached longer
+MIN_INTERVAL_SECONDS: float = float(
+    os.getenv("PREWARM_MIN_INTERVAL_SECONDS", str(stats_cache.TTL_SECONDS * 0.8))
+)
+MAX_INTERVAL_SECONDS: float = float(os.getenv("PREWARM_MAX_INTERVAL_SECONDS", "3600"))
+CONCURRENCY: int = int(os.getenv("PREWARM_CONCURRENCY", "4"))
+MAX_ENTRIES: int = int(os.getenv("PREWARM_MAX_ENTRIES", "1000"))
+JITTER: float = 0.1
+
+# request rates are counted in requests per half-life, older requests count less and less
+RATE_HALF_LIFE_SECONDS: float = 24 * 3600
+# charts requested this often are refreshed every MIN_INTERVAL_SECONDS
+HOT_RATE: float = 100
+# charts requested less often than this are forgotten, unless they're pinned by the config
+FORGET_RATE: float = 0.5
+
+MAX_SLEEP_SECONDS: float = 60
+
+
+class _Entry:
+    request: ChartRequest
+    pinned: bool
+    rate: float
+    rated_at: float
+    refresh_at: float
+
+    def __init__(self, request: ChartRequest, pinned: bool, now: float) -> None:
+        self.request = request
+        self.pinned = pinned
+        self.rate = 0.0
+        self.rated_at = now
+        self.refresh_at = now
+
+
+_entries: dict[str, _Entry] = {}
+_task: asyncio.Task[None] | None = None
+
+
+def record(chart_request: ChartRequest) -> None:
+    """
+    Records a request of a chart, so the chart is kept warm as long as it's requested.
+
+    Parameters:
+    chart_request (ChartRequest): The requested chart.
+
+    Notes:
+    - Charts are identified by ChartRequest.fingerprint(), so equal requests share one entry.
+    - Above MAX_ENTRIES the least requested unpinned chart is forgotten.
+    """
+    if not PREWARM_ENABLED:
+        return
+
+    now = time.time()
+    key = chart_request.fingerprint()
+    entry = _entries.get(key)
+
+    if entry is None:
+        if len(_entries) >= MAX_ENTRIES and not _forget_least_requested(now):
+            return
+
+        entry = _Entry(chart_request, False, now)
+        # the chart was just rendered for this request
+        entry.refresh_at = now + MIN_INTERVAL_SECONDS * _range_scale(chart_request.stats_range)
+        _entries[key] = entry
+
+    entry.rate = _decayed_rate(entry, now) + 1
+    entry.rated_at = now
+
+
+def pin(chart_requests: list[ChartRequest]) -> None:
+    """
+    Keeps the charts warm regardless of how often they are requested.
+    """
+    now = time.time()
+
+    for chart_request in chart_requests:
+        key = chart_request.fingerprint()
+
+        if key in _entries:
+            _entries[key].pinned = True
+        else:
+            _entries[key] = _Entry(chart_request, True, now)
+
+
+def refresh_interval(rate: float, stats_range: StatsRange = StatsRange.LAST_7_DAYS) -> float:
+    """
+    Returns how often a chart requested at the rate is refreshed.
+
+    Parameters:
+    rate (float): Requests of the chart per RATE_HALF_LIFE_SECONDS.
+    stats_range (StatsRange): Range of the chart's stats.
+
+    Returns:
+    float: MIN_INTERVAL_SECONDS for last 7 days charts requested at least HOT_RATE times,
+           growing inversely to the rate up to MAX_INTERVAL_SECONDS.
+           Both bounds are scaled by the TTL of the range relative to the last 7 days TTL,
+           e.g. all time charts are refreshed 288 times less often with the default TTLs.
+    """
+    scale = _range_scale(stats_range)
+
+    if rate <= 0:
+        return MAX_INTERVAL_SECONDS * scale
+
+    return min(max(MIN_INTERVAL_SECONDS * HOT_RATE / rate, MIN_INTERVAL_SECONDS), MAX_INTERVAL_SECONDS) * scale
+
+
+async def refresh_due(now: float | None = None) -> int:
+    """
+    Refreshes the stats and re-renders the charts that are due.
+
+    Parameters:
+    now (float | None): Current time, defaults to time.time().
+
+    Returns:
+    int: Number of refreshed charts.
+
+    Notes:
+    - Only pinned charts and charts requested often enough to be refreshed at least once per stats TTL are refreshed.
+    - Stats of each user and range are fetched once for all of their due charts,
+      unless the cached stats stay fresh until the next refresh of these charts.
+    - At most CONCURRENCY users are refreshed at the same time.
+    - Unchanged charts are served from the render cache instead of being rendered again.
+    """
+    now = time.time() if now is None else now
+    due: dict[tuple[str, StatsRange], list[_Entry]] = {}
+
+    for key, entry in list(_entries.items()):
+        rate = _decayed_rate(entry, now)
+
+        if not entry.pinned and rate < FORGET_RATE:
+            log.debug(f"Forgetting chart {key}")
+            del _entries[key]
+            continue
+
+        if entry.refresh_at <= now:
+            interval = refresh_interval(HOT_RATE if entry.pinned else rate, entry.request.stats_range)
+            entry.refresh_at = now + interval * random.uniform(1 - JITTER, 1 + JITTER)
+
+            # a chart requested less often than its stats expire would be fetched for nobody,
+            # its next request fetches the stats anyway
+            if not entry.pinned and interval > stats_cache.ttl(entry.request.username, entry.request.stats_range):
+                continue
+
+            due.setdefault(
+                (entry.request.username.lower(), entry.request.stats_range), []
+            ).append(entry)
+
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+    refreshed = await asyncio.gather(
+        *(_refresh_user(semaphore, entries) for entries in due.values())
+    )
+
+    return sum(refreshed)
+
+
+def start() -> None:
+    """
+    Starts the scheduler on the running event loop.
+    """
+    global _task
+
+    if not PREWARM_ENABLED or (_task is not None and not _task.done()):
+        return
+
+    _task = asyncio.create_task(_run(), name="prewarm-scheduler")
+
+
+def stop() -> None:
+    global _task
+
+    if _task is not None:
+        _ = _task.cancel()
+        _task = None
+
+
+def clear() -> None:
+    _entries.clear()
+
+
+async def _run() -> None:
+    while True:
+        now = time.time()
+        next_refresh_at = min((entry.refresh_at for entry in _entries.values()), default=now + MAX_SLEEP_SECONDS)
+        await asyncio.sleep(min(max(next_refresh_at - now, 0), MAX_SLEEP_SECONDS))
+
+        try:
+            refreshed = await refresh_due()
+
+            if refreshed != 0:
+                log.debug(f"Pre-warmed {refreshed} charts")
+        except Exception as e:
+            log.warning(f"Couldn't pre-warm charts: {e}")
+
+
+async def _refresh_user(semaphore: asyncio.Semaphore, entries: list[_Entry]) -> int:
+    async with semaphore:
+        username = entries[0].request.username
+        stats_range = entries[0].request.stats_range
+
+        # e.g. stats just fetched for a request, the charts are rendered from them without fetching again
+        if stats_cache.fresh_until(username, stats_range) < min(entry.refresh_at for entry in entries):
+            try:
+                _ = await stats_cache.refresh(username, stats_range)
+            except Exception as e:
+                log.warning(f"Couldn't pre-warm stats of {username}: {e}")
+                metrics.PREWARM_REFRESHES.labels("error").inc(len(entries))
+                return 0
+
+        refreshed = 0
+
+        for entry in entries:
+            try:
+                # background traffic stays out of the cache hit rates of user requests
+                prepared_chart = await chart_service.prepare_chart(entry.request, record_stats=False)
+                _ = await chart_service.render_chart(prepared_chart, record_stats=False)
+            except RenderQueueFullError:
+                # user requests come first, the chart is retried on its next refresh
+                metrics.PREWARM_REFRESHES.labels("skipped").inc()
+                continue
+            except Exception as e:
+                log.warning(f"Couldn't pre-warm chart of {username}: {e}")
+                metrics.PREWARM_REFRESHES.labels("error").inc()
+                continue
+
+            metrics.PREWARM_REFRESHES.labels("ok").inc()
+            refreshed += 1
+
+        return refreshed
+
+
+def _range_scale(stats_range: StatsRange) -> float:
+    if stats_cache.TTL_SECONDS <= 0:
+        return 1.0
+
+    return stats_cache.RANGE_TTL_SECONDS.get(stats_range, stats_cache.TTL_SECONDS) / stats_cache.TTL_SECONDS
+
+
+def _decayed_rate(entry: _Entry, now: float) -> float:
+    return entry.rate * 0.5 ** ((now - entry.rated_at) / RATE_HALF_LIFE_SECONDS)
+
+
+def _forget_least_requested(now: float) -> bool:
+    unpinned = [(key, entry) for key, entry in _entries.items() if not entry.pinned]
+
+    if len(unpinned) == 0:
+        return False
+
+    key, _ = min(unpinned, key=lambda item: _decayed_rate(item[1], now))
+    del _entries[key]
+
+    return True
@@ -0,0 +1,135 @@
+import hmac
+import logging
+import os
+import sys
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from types import FrameType
+from typing import Iterator
+from uuid import UUID
+from dotenv import load_dotenv
+
+log = logging.getLogger(__name__)
+log.setLevel(logging.DEBUG)
+
+_ = load_dotenv()
+
+# profiling is disabled unless the token is set
+PROFILING_TOKEN: str | None = os.getenv("PROFILING_TOKEN") or None
+PROFILING_INTERVAL_SECONDS: float = float(os.getenv("PROFILING_INTERVAL_SECONDS", "0.001"))
+# profiles are only returned in the response unless the directory is set
+PROFILES_DIRECTORY: str | None = os.getenv("PROFILES_DIRECTORY") or None
+
+TOKEN_HEADER: str = "X-Profiling-Token"
+TOKEN_QUERY_PARAM: str = "profiling_token"
+
+MAX_STACK_DEPTH: int = 128
+
+
+def is_authorized(token: str | None) -> bool:
+    """
+    Checks if a request presenting the token may be profiled.
+
+    Parameters:
+    token (str | None): The token sent with the request.
+
+    Returns:
+    bool: True if profiling is enabled and the token matches PROFILING_TOKEN.
+    """
+    if PROFILING_TOKEN is None or token is None:
+        return False
+
+    return hmac.compare_digest(token.encode(), PROFILING_TOKEN.encode())
+
+
+@contextmanager
+def profile() -> Iterator[Counter[str]]:
+    """
+    Samples the stack of the current thread every PROFILING_INTERVAL_SECONDS while the block runs.
+
+    Returns:
+    Iterator[Counter[str]]: Number of samples of each stack, see to_collapsed().
+
+    Notes:
+    - Sampling is done by a separate thread, so the profiled code runs unmodified and at almost full speed.
+    - On the event loop thread samples include everything the loop runs meanwhile, e.g. other requests.
+    - Other threads and processes aren't sampled, e.g. render pool workers.
+    """
+    sampler = _Sampler(threading.get_ident(), PROFILING_INTERVAL_SECONDS)
+    sampler.start()
+
+    try:
+        yield sampler.stacks
+    finally:
+        sampler.stop()
+
+
+def to_collapsed(stacks: Counter[str]) -> str:
+    """
+    Formats sampled stacks in the collapsed format read by flamegraph.pl and speedscope.
+
+    Returns:
+    str: One "outermost;...;innermost count" line per stack, most sampled first.
+    """
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+def save(uuid: UUID, collapsed_profile: str) -> str | None:
+    """
+    Stores a collapsed profile in PROFILES_DIRECTORY.
+
+    Returns:
+    str | None: Path of the stored profile, or None if PROFILES_DIRECTORY isn't set.
+    """
+    if PROFILES_DIRECTORY is None:
+        return None
+
+    if not os.path.exists(PROFILES_DIRECTORY):
+        os.makedirs(PROFILES_DIRECTORY)
+
+    path = os.path.join(PROFILES_DIRECTORY, f"{uuid}.txt")
+
+    with open(path, "w", encoding="utf-8") as file:
+        _ = file.write(collapsed_profile)
+
+    log.info(f"Stored profile {path}")
+
+    return path
+
+
+class _Sampler(threading.Thread):
+    thread_id: int
+    interval: float
+    stacks: Counter[str]
+
+    def __init__(self, thread_id: int, interval: float) -> None:
+        super().__init__(name="profiler", daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stopped = threading.Event()
+
+    def run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+
+            if frame is not None:
+                self.stacks[_collapse(frame)] += 1
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self.join()
+
+
+def _collapse(frame: FrameType | None) -> str:
+    names: list[str] = []
+
+    while frame is not None and len(names) < MAX_STACK_DEPTH:
+        code = frame.f_code
+        names.append(
+            f"{code.co_qualname} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+        )
+        frame = frame.f_back
+
+    return ";".join(reversed(names))
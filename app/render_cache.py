@@ -0,0 +1,101 @@
+import logging
+import os
+import threading
+from collections import OrderedDict
+from dotenv import load_dotenv
+
+from .model.chart.cached_render import CachedRender
+
+log = logging.getLogger(__name__)
+log.setLevel(logging.DEBUG)
+
+_ = load_dotenv()
+
+MAX_ENTRIES: int = int(os.getenv("RENDER_CACHE_MAX_ENTRIES", "1024"))
+
+_entries: OrderedDict[str, CachedRender] = OrderedDict()
+_lock = threading.Lock()
+
+_hits: int = 0
+_misses: int = 0
+
+
+def get(key: str) -> bytes | None:
+    """
+    Returns the rendered chart stored under the key and marks it as the most recently used.
+
+    Parameters:
+    key (str): A render key, see chart_service._render_key().
+
+    Returns:
+    bytes | None: The rendered chart, or None if the key is not cached.
+    """
+    cached_render = get_render(key)
+
+    return None if cached_render is None else cached_render.content
+
+
+def get_render(key: str, record_stats: bool = True) -> CachedRender | None:
+    """
+    Returns the rendered chart stored under the key along with its compressed variants, see get().
+    The lookup counts as a hit or miss unless record_stats is False, e.g. for background refreshes.
+    """
+    global _hits, _misses
+
+    with _lock:
+        cached_render = _entries.get(key)
+
+        if cached_render is None:
+            if record_stats:
+                _misses += 1
+
+            return None
+
+        if record_stats:
+            _hits += 1
+
+        _entries.move_to_end(key)
+
+        return cached_render
+
+
+def put(key: str, content: bytes, encoded: dict[str, bytes] | None = None) -> None:
+    """
+    Stores the rendered chart under the key, evicting the least recently used charts above MAX_ENTRIES.
+
+    Parameters:
+    key (str): A render key, see chart_service._render_key().
+    content (bytes): The rendered chart.
+    encoded (dict[str, bytes] | None): Compressed variants of the chart by content coding,
+                                       stored next to it so they're never compressed again.
+    """
+    if MAX_ENTRIES <= 0:
+        return
+
+    with _lock:
+        _entries[key] = CachedRender(content, {} if encoded is None else encoded)
+        _entries.move_to_end(key)
+
+        while len(_entries) > MAX_ENTRIES:
+            evicted_key, _ = _entries.popitem(last=False)
+            log.debug(f"Evicted rendered chart {evicted_key}")
+
+
+def stats() -> dict[str, int]:
+    """
+    Returns the render cache counters.
+
+    Returns:
+    dict[str, int]: Number of hits, misses and currently cached charts.
+    """
+    with _lock:
+        return {"hits": _hits, "misses": _misses, "entries": len(_entries)}
+
+
+def clear() -> None:
+    global _hits, _misses
+
+    with _lock:
+        _entries.clear()
+        _hits = 0
+        _misses = 0
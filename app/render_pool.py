@@ -0,0 +1,234 @@
+import asyncio
+import importlib
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from types import ModuleType
+from dotenv import load_dotenv
+
+from .exception.RenderQueueFullError import RenderQueueFullError
+from .model.chart.chart_format import ChartFormat
+from .model.chart.chart_type import ChartType
+from .model.wakatime.wakatime_item import WakatimeItem
+
+log = logging.getLogger(__name__)
+log.setLevel(logging.DEBUG)
+
+_ = load_dotenv()
+
+# "matplotlib" is the reference renderer, "svg" writes SVG directly without importing matplotlib,
+# raster formats are always rendered by matplotlib
+CHART_RENDERER: str = os.getenv("CHART_RENDERER", "matplotlib")
+
+CHART_BUILDERS: dict[str, str] = {
+    "matplotlib": ".chart_builder",
+    "svg": ".svg_chart_builder",
+}
+
+# 0 renders matplotlib charts in a thread of the API process instead of worker processes
+RENDER_WORKERS: int = int(os.getenv("RENDER_WORKERS", str(os.cpu_count() or 1)))
+RENDER_QUEUE_SIZE: int = int(
+    os.getenv("RENDER_QUEUE_SIZE", str(max(RENDER_WORKERS, 1) * 4))
+)
+
+# legend labels make the builder load the font and its glyphs
+WARM_UP_DATA: list[WakatimeItem] = [
+    WakatimeItem(
+        total_seconds=60,
+        name="Warm-up",
+        percent=100,
+        hours=0,
+        minutes=1,
+    )
+]
+
+_executor: ProcessPoolExecutor | None = None
+_pending: int = 0
+
+
+async def render(
+    chart_type: ChartType,
+    data: list[WakatimeItem],
+    colors: dict[str, str] | None,
+    height: int | None,
+    width: int | None,
+    output_format: ChartFormat = ChartFormat.SVG,
+    inline: bool = False,
+) -> bytes:
+    """
+    Renders a chart with the chart builder selected by CHART_RENDERER.
+
+    Parameters:
+    chart_type (ChartType): Type of the chart to render.
+    data (list[WakatimeItem]): Grouped and filtered items to render.
+    colors (dict[str, str] | None): Normalized colors to render with.
+    height (int | None): Height of the chart in pixels.
+    width (int | None): Width of the chart in pixels.
+    output_format (ChartFormat): Format of the rendered chart.
+    inline (bool): Whether to render on the calling thread, blocking the event loop, e.g. so it can be profiled.
+
+    Returns:
+    bytes: The rendered chart.
+
+    Raises:
+    RenderQueueFullError: If RENDER_QUEUE_SIZE renders are already queued or running.
+
+    Notes:
+    - matplotlib charts are rendered by a pool of RENDER_WORKERS pre-warmed worker processes.
+    - svg charts are cheap enough to be rendered right away on the event loop.
+    - If a worker process dies, the broken pool is replaced and the chart is rendered once more on the new pool.
+    """
+    global _pending
+
+    if inline or (CHART_RENDERER == "svg" and output_format == ChartFormat.SVG):
+        return _render(chart_type, data, colors, height, width, output_format)
+
+    if _pending >= RENDER_QUEUE_SIZE:
+        raise RenderQueueFullError(
+            f"{_pending} charts are already waiting to be rendered"
+        )
+
+    _pending += 1
+
+    try:
+        if RENDER_WORKERS <= 0:
+            return await asyncio.to_thread(
+                _render, chart_type, data, colors, height, width, output_format
+            )
+
+        loop = asyncio.get_running_loop()
+        executor = _get_executor()
+
+        try:
+            return await loop.run_in_executor(
+                executor, _render, chart_type, data, colors, height, width, output_format
+            )
+        except BrokenProcessPool:
+            log.warning("A render worker died, restarting the render workers")
+            _reset_executor(executor)
+
+        return await loop.run_in_executor(
+            _get_executor(), _render, chart_type, data, colors, height, width, output_format
+        )
+    finally:
+        _pending -= 1
+
+
+def queue_depth() -> int:
+    """
+    Returns the number of charts queued or being rendered.
+    """
+    return _pending
+
+
+async def start() -> None:
+    """
+    Warms up the chart builder before the first request, meant to be awaited before the app reports ready.
+
+    Notes:
+    - Worker processes are started and each of them imports the chart builder and renders a dummy chart.
+    - Without worker processes the dummy chart is rendered in a thread of the API process.
+    """
+    if CHART_RENDERER == "svg" or RENDER_WORKERS <= 0:
+        await asyncio.to_thread(_warm_up)
+        log.info(f"Warmed up the {CHART_RENDERER} chart builder")
+        return
+
+    executor = _get_executor()
+    loop = asyncio.get_running_loop()
+
+    _ = await asyncio.gather(
+        *(loop.run_in_executor(executor, os.getpid) for _ in range(RENDER_WORKERS))
+    )
+
+    log.info(f"Started {RENDER_WORKERS} render workers")
+
+
+def shutdown() -> None:
+    global _executor
+
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def get_chart_builder(output_format: ChartFormat = ChartFormat.SVG) -> ModuleType:
+    """
+    Imports the chart builder rendering the format, so matplotlib is imported only when it's used.
+
+    Returns:
+    ModuleType: The builder selected by CHART_RENDERER for SVG, the matplotlib builder for raster formats.
+
+    Raises:
+    ValueError: If CHART_RENDERER is not one of CHART_BUILDERS.
+    """
+    if CHART_RENDERER not in CHART_BUILDERS:
+        raise ValueError(
+            f"Unknown CHART_RENDERER {CHART_RENDERER}, expected one of {list(CHART_BUILDERS)}"
+        )
+
+    renderer = CHART_RENDERER if output_format == ChartFormat.SVG else "matplotlib"
+
+    return importlib.import_module(CHART_BUILDERS[renderer], __package__)
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+
+    if _executor is None:
+        # spawned workers don't inherit the event loop and threads of the API process
+        _executor = ProcessPoolExecutor(
+            max_workers=RENDER_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_warm_up_worker,
+        )
+
+    return _executor
+
+
+def _reset_executor(broken: ProcessPoolExecutor) -> None:
+    """
+    Drops the broken pool, unless a concurrent render already replaced it, so the next render starts a new pool.
+    """
+    global _executor
+
+    if _executor is broken:
+        _executor = None
+
+    broken.shutdown(wait=False, cancel_futures=True)
+
+
+def _warm_up() -> None:
+    """
+    Imports the chart builder and renders a dummy chart, so fonts and glyphs are loaded before the first request.
+    """
+    _ = _render(ChartType.PIE, WARM_UP_DATA, None, None, None, ChartFormat.SVG)
+
+
+def _warm_up_worker() -> None:
+    # workers of the svg renderer only ever render raster formats
+    _ = _render(
+        ChartType.PIE,
+        WARM_UP_DATA,
+        None,
+        None,
+        None,
+        ChartFormat.SVG if CHART_RENDERER == "matplotlib" else ChartFormat.PNG,
+    )
+
+
+def _render(
+    chart_type: ChartType,
+    data: list[WakatimeItem],
+    colors: dict[str, str] | None,
+    height: int | None,
+    width: int | None,
+    output_format: ChartFormat,
+) -> bytes:
+    match chart_type:
+        case ChartType.PIE:
+            return get_chart_builder(output_format).render_pie_chart(
+                data, colors, height, width, output_format
+            )
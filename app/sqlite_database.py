@@ -0,0 +1,59 @@
+import logging
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Iterator
+
+log = logging.getLogger(__name__)
+log.setLevel(logging.DEBUG)
+
+
+class SqliteDatabase:
+    """
+    A SQLite database file kept open by a single connection, which worker threads use one at a time.
+
+    Notes:
+    - The connection is opened and the schema is created on the first use, so disabled stores never touch the disk.
+    - Statements run in autocommit mode, multi-statement transactions are opened explicitly.
+    """
+
+    name: str
+    schema: str
+    _connection: sqlite3.Connection | None
+    _lock: threading.Lock
+
+    def __init__(self, name: str, schema: str) -> None:
+        self.name = name
+        self.schema = schema
+        self._connection = None
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def connect(self, path: str) -> Iterator[sqlite3.Connection]:
+        """
+        Locks the connection for the calling thread, opening the database at path if it isn't open yet.
+
+        Notes:
+        - Blocks on disk I/O, call it from a worker thread.
+        """
+        with self._lock:
+            if self._connection is None:
+                directory = os.path.dirname(path)
+
+                if directory != "" and not os.path.exists(directory):
+                    os.makedirs(directory)
+
+                # used by worker threads one at a time under _lock
+                self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+                _ = self._connection.execute("PRAGMA journal_mode=WAL")
+                _ = self._connection.executescript(self.schema)
+                log.info(f"Opened the {self.name} {path}")
+
+            yield self._connection
+
+    def close(self) -> None:
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
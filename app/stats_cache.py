@@ -0,0 +1,329 @@
+import asyncio
+import logging
+import os
+import sqlite3
+import time
+from collections import OrderedDict
+from dotenv import load_dotenv
+
+from . import stats_snapshot_store
+from . import summary_store
+from .client import wakatime_api_client
+from .model.wakatime.cached_wakatime_response import CachedWakatimeResponse
+from .model.wakatime.stats_range import StatsRange
+
+log = logging.getLogger(__name__)
+log.setLevel(logging.DEBUG)
+
+_ = load_dotenv()
+
+# TTL of the last 7 days stats, longer ranges are cached for RANGE_TTL_SECONDS
+TTL_SECONDS: float = float(os.getenv("WAKATIME_STATS_TTL_SECONDS", "300"))
+# each range of a user is one entry, the least recently used entries are evicted above this
+MAX_ENTRIES: int = int(os.getenv("WAKATIME_STATS_CACHE_MAX_ENTRIES", "10000"))
+
+
+def _parse_ttl_overrides(overrides: str | None) -> dict[str, float]:
+    """
+    Parses TTL overrides in the "name=seconds,name=seconds" format, names are lowercased.
+    """
+    if overrides is None or overrides.strip() == "":
+        return {}
+
+    ttls: dict[str, float] = {}
+
+    for override in overrides.split(","):
+        name, _, seconds = override.partition("=")
+        ttls[name.strip().lower()] = float(seconds)
+
+    return ttls
+
+
+TTL_OVERRIDES: dict[str, float] = _parse_ttl_overrides(
+    os.getenv("WAKATIME_STATS_TTL_OVERRIDES")
+)
+
+# longer ranges barely change within their TTL and Wakatime computes them slowly
+DEFAULT_RANGE_TTL_SECONDS: dict[StatsRange, float] = {
+    StatsRange.LAST_30_DAYS: 3600,
+    StatsRange.LAST_6_MONTHS: 6 * 3600,
+    StatsRange.LAST_YEAR: 12 * 3600,
+    StatsRange.ALL_TIME: 24 * 3600,
+}
+
+# ranges missing here, e.g. the last 7 days, use TTL_SECONDS
+RANGE_TTL_SECONDS: dict[StatsRange, float] = {
+    **DEFAULT_RANGE_TTL_SECONDS,
+    **{
+        StatsRange(stats_range): seconds
+        for stats_range, seconds in _parse_ttl_overrides(
+            os.getenv("WAKATIME_STATS_RANGE_TTLS")
+        ).items()
+    },
+}
+
+
+_entries: OrderedDict[tuple[str, StatsRange], CachedWakatimeResponse] = OrderedDict()
+_in_flight: dict[tuple[str, StatsRange], asyncio.Task[CachedWakatimeResponse]] = {}
+# references to pending snapshot writes, so they aren't garbage collected before they finish
+_snapshot_saves: set[asyncio.Task[None]] = set()
+
+_hits: int = 0
+_stale_hits: int = 0
+_misses: int = 0
+_snapshots_loaded: int = 0
+
+
+async def get_stats(
+    username: str, stats_range: StatsRange = StatsRange.LAST_7_DAYS, record_stats: bool = True
+) -> CachedWakatimeResponse:
+    """
+    Returns the stats of the user over the range, fetching them from Wakatime only when needed.
+
+    Parameters:
+    username (str): Wakatime username.
+    stats_range (StatsRange): Range of the stats, the last 7 days by default.
+    record_stats (bool): Whether the lookup counts as a hit or miss, e.g. False for background refreshes.
+
+    Returns:
+    CachedWakatimeResponse: Cached or freshly fetched stats of the user along with their fetch time.
+
+    Notes:
+    - Each range of a user is cached separately and stays fresh for ttl() seconds.
+    - Fresh entries are returned without any upstream call.
+    - Stale entries are returned immediately while a single background task fetches new stats.
+    - Concurrent misses for the same user await one upstream call (single-flight).
+    - A failed refresh keeps the stale entry, so the last known good stats are served
+      while Wakatime is failing or throttling us, only misses fail.
+    - At most MAX_ENTRIES users and ranges are cached, the least recently used ones are evicted.
+    """
+    global _hits, _stale_hits, _misses
+
+    key = (username.lower(), stats_range)
+    entry = _entries.get(key)
+    in_flight = _in_flight.get(key)
+
+    if entry is not None:
+        _entries.move_to_end(key)
+
+        if _is_stale(key, entry):
+            if record_stats:
+                _stale_hits += 1
+
+            if in_flight is None:
+                log.debug(f"Serving stale {stats_range.value} stats of {username} while refreshing")
+                _ = _start_fetch(key, username)
+        elif record_stats:
+            _hits += 1
+
+        return entry
+
+    if record_stats:
+        _misses += 1
+
+    if in_flight is None:
+        in_flight = _start_fetch(key, username)
+    else:
+        log.debug(f"Waiting for in-flight stats fetch of {username}")
+
+    # shielded, so a cancelled request doesn't cancel the fetch other requests are waiting on
+    return await asyncio.shield(in_flight)
+
+
+async def refresh(
+    username: str, stats_range: StatsRange = StatsRange.LAST_7_DAYS
+) -> CachedWakatimeResponse:
+    """
+    Fetches the stats of the user over the range from Wakatime regardless of the cached entry.
+
+    Parameters:
+    username (str): Wakatime username.
+    stats_range (StatsRange): Range of the stats, the last 7 days by default.
+
+    Returns:
+    CachedWakatimeResponse: The freshly fetched stats, also stored in the cache.
+
+    Notes:
+    - Joins the in-flight fetch of the user and range if there is one.
+    """
+    key = (username.lower(), stats_range)
+    in_flight = _in_flight.get(key)
+
+    if in_flight is None:
+        in_flight = _start_fetch(key, username)
+
+    return await asyncio.shield(in_flight)
+
+
+async def load_snapshots() -> int:
+    """
+    Fills the cache with the stats persisted by stats_snapshot_store before the last shutdown.
+
+    Returns:
+    int: Number of loaded entries.
+
+    Notes:
+    - Does nothing unless stats_snapshot_store.ENABLED is set.
+    - Entries keep their original fetch time, so stale ones are served right away and refreshed in the background
+      on their first request, instead of every user missing the cache after a restart or deploy.
+    - Entries fetched since the start aren't replaced.
+    - Snapshots that can't be read are logged and skipped, the cache then starts empty.
+    """
+    global _snapshots_loaded
+
+    if not stats_snapshot_store.ENABLED:
+        return 0
+
+    try:
+        snapshots = await asyncio.to_thread(stats_snapshot_store.load_all)
+    except (sqlite3.Error, OSError) as e:
+        log.warning(f"Couldn't load stats snapshots: {e}")
+        return 0
+
+    loaded = 0
+
+    for username, stats_range, entry in snapshots:
+        key = (username, stats_range)
+
+        if key not in _entries:
+            _put(key, entry)
+            loaded += 1
+
+    _snapshots_loaded += loaded
+    log.info(f"Loaded {loaded} stats snapshots")
+
+    return loaded
+
+
+async def wait_for_snapshots() -> None:
+    """
+    Waits until the snapshots of all fetched stats are written, meant to be awaited before the store is closed.
+    """
+    _ = await asyncio.gather(*_snapshot_saves, return_exceptions=True)
+
+
+def ttl(username: str, stats_range: StatsRange = StatsRange.LAST_7_DAYS) -> float:
+    """
+    Returns how long the stats of the user over the range are served without refetching.
+
+    Notes:
+    - TTL_OVERRIDES of a user scale the TTLs of all of their ranges, e.g. a user with a TTL of twice TTL_SECONDS
+      gets twice the RANGE_TTL_SECONDS of every range.
+    """
+    override = TTL_OVERRIDES.get(username.lower())
+    scale = 1.0 if override is None or TTL_SECONDS <= 0 else override / TTL_SECONDS
+
+    return RANGE_TTL_SECONDS.get(stats_range, TTL_SECONDS) * scale
+
+
+def fresh_until(username: str, stats_range: StatsRange = StatsRange.LAST_7_DAYS) -> float:
+    """
+    Returns the time the cached stats of the user over the range become stale, 0 if they aren't cached.
+    """
+    entry = _entries.get((username.lower(), stats_range))
+
+    if entry is None:
+        return 0.0
+
+    return entry.fetched_at + ttl(username, stats_range)
+
+
+def stats() -> dict[str, int]:
+    """
+    Returns the stats cache counters.
+
+    Returns:
+    dict[str, int]: Number of fresh hits, stale hits, misses, entries loaded from snapshots
+                    and currently cached users and ranges.
+    """
+    return {
+        "hits": _hits,
+        "stale_hits": _stale_hits,
+        "misses": _misses,
+        "snapshots_loaded": _snapshots_loaded,
+        "entries": len(_entries),
+    }
+
+
+def clear() -> None:
+    global _hits, _stale_hits, _misses, _snapshots_loaded
+
+    _entries.clear()
+
+    # a fetch started before clearing mustn't fill the cache again
+    for task in _in_flight.values():
+        _ = task.cancel()
+
+    _in_flight.clear()
+    _hits = 0
+    _stale_hits = 0
+    _misses = 0
+    _snapshots_loaded = 0
+
+
+def _start_fetch(
+    key: tuple[str, StatsRange], username: str
+) -> asyncio.Task[CachedWakatimeResponse]:
+    task = asyncio.create_task(
+        _fetch(key, username), name=f"stats-fetch-{key[0]}-{key[1].value}"
+    )
+    _in_flight[key] = task
+    task.add_done_callback(lambda t: _on_fetch_done(key, t))
+
+    return task
+
+
+async def _fetch(key: tuple[str, StatsRange], username: str) -> CachedWakatimeResponse:
+    # ranges of whole days are summed up from the daily summaries, so only the last days are fetched
+    if summary_store.supports(key[1]):
+        response = await summary_store.get_stats(username, key[1])
+    else:
+        response = await wakatime_api_client.get_stats(username, key[1])
+
+    entry = CachedWakatimeResponse(response, time.time())
+    _put(key, entry)
+
+    # snapshots only matter after a restart, requests don't wait for them to be written
+    if stats_snapshot_store.ENABLED:
+        task = asyncio.create_task(
+            asyncio.to_thread(stats_snapshot_store.save, key[0], key[1], entry),
+            name=f"stats-snapshot-{key[0]}-{key[1].value}",
+        )
+        _snapshot_saves.add(task)
+        task.add_done_callback(lambda t: _on_snapshot_saved(key, t))
+
+    return entry
+
+
+def _put(key: tuple[str, StatsRange], entry: CachedWakatimeResponse) -> None:
+    if MAX_ENTRIES <= 0:
+        return
+
+    _entries[key] = entry
+    _entries.move_to_end(key)
+
+    while len(_entries) > MAX_ENTRIES:
+        evicted_key, _ = _entries.popitem(last=False)
+        log.debug(f"Evicted {evicted_key[1].value} stats of {evicted_key[0]}")
+
+
+def _on_fetch_done(
+    key: tuple[str, StatsRange], task: asyncio.Task[CachedWakatimeResponse]
+) -> None:
+    if _in_flight.get(key) is task:
+        del _in_flight[key]
+
+    if not task.cancelled() and task.exception() is not None:
+        log.warning(f"Couldn't fetch {key[1].value} stats of {key[0]}: {task.exception()}")
+
+
+def _on_snapshot_saved(key: tuple[str, StatsRange], task: asyncio.Task[None]) -> None:
+    _snapshot_saves.discard(task)
+
+    if not task.cancelled() and task.exception() is not None:
+        # the stats are still served from memory, they're just lost on restart
+        log.warning(f"Couldn't save the {key[1].value} stats snapshot of {key[0]}: {task.exception()}")
+
+
+def _is_stale(key: tuple[str, StatsRange], entry: CachedWakatimeResponse) -> bool:
+    return time.time() - entry.fetched_at >= ttl(key[0], key[1])
@@ -0,0 +1,135 @@
+import logging
+import os
+import time
+import zlib
+from dotenv import load_dotenv
+
+import orjson
+
+from .client.wakatime_response_decoder import SECTIONS
+from .sqlite_database import SqliteDatabase
+from .model.wakatime.cached_wakatime_response import CachedWakatimeResponse
+from .model.wakatime.stats_range import StatsRange
+from .model.wakatime.wakatime_data import WakatimeData
+from .model.wakatime.wakatime_item import WakatimeItem
+from .model.wakatime.wakatime_response import WakatimeResponse
+
+log = logging.getLogger(__name__)
+log.setLevel(logging.DEBUG)
+
+_ = load_dotenv()
+
+# stats are only kept in memory unless snapshots are enabled, e.g. on a volume that survives deploys
+ENABLED: bool = os.getenv("WAKATIME_STATS_SNAPSHOTS_ENABLED", "false").lower() in ("1", "true", "yes")
+PATH: str = os.getenv("WAKATIME_STATS_SNAPSHOTS_PATH", "cache/stats.sqlite3")
+# older snapshots aren't worth serving even while Wakatime is unavailable
+MAX_AGE_SECONDS: float = float(os.getenv("WAKATIME_STATS_SNAPSHOTS_MAX_AGE_SECONDS", str(7 * 24 * 3600)))
+COMPRESSION_LEVEL: int = 6
+
+# snapshots written in another format are skipped when they're loaded
+FORMAT_VERSION: int = 2
+
+_SCHEMA: str = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    username TEXT NOT NULL,
+    stats_range TEXT NOT NULL,
+    fetched_at REAL NOT NULL,
+    format_version INTEGER NOT NULL,
+    payload BLOB NOT NULL,
+    PRIMARY KEY (username, stats_range)
+) WITHOUT ROWID;
+"""
+
+_database = SqliteDatabase("stats snapshot store", _SCHEMA)
+
+
+def save(username: str, stats_range: StatsRange, entry: CachedWakatimeResponse) -> None:
+    """
+    Stores the stats of the user over the range, replacing the previous snapshot.
+
+    Parameters:
+    username (str): Lowercase Wakatime username.
+    stats_range (StatsRange): Range of the stats.
+    entry (CachedWakatimeResponse): The stats along with their fetch time.
+
+    Notes:
+    - The charted sections are stored as zlib-compressed JSON arrays of item fields, without field names.
+    - Blocks on disk I/O, call it from a worker thread.
+    """
+    payload = _encode(entry.response.data)
+
+    with _database.connect(PATH) as connection:
+        _ = connection.execute(
+            "INSERT OR REPLACE INTO snapshots (username, stats_range, fetched_at, format_version, payload)"
+            " VALUES (?, ?, ?, ?, ?)",
+            (username, stats_range.value, entry.fetched_at, FORMAT_VERSION, payload),
+        )
+
+
+def load_all(now: float | None = None) -> list[tuple[str, StatsRange, CachedWakatimeResponse]]:
+    """
+    Reads every snapshot that isn't older than MAX_AGE_SECONDS, deleting the older ones.
+
+    Parameters:
+    now (float | None): Current time, defaults to time.time().
+
+    Returns:
+    list[tuple[str, StatsRange, CachedWakatimeResponse]]: Lowercase username, range and stats of each snapshot.
+
+    Notes:
+    - Snapshots of unknown ranges, of another FORMAT_VERSION or that can't be decoded are skipped.
+    - Blocks on disk I/O, call it from a worker thread.
+    """
+    expired = (time.time() if now is None else now) - MAX_AGE_SECONDS
+
+    with _database.connect(PATH) as connection:
+        _ = connection.execute("DELETE FROM snapshots WHERE fetched_at < ?", (expired,))
+        rows: list[tuple[str, str, float, bytes]] = connection.execute(
+            "SELECT username, stats_range, fetched_at, payload FROM snapshots WHERE format_version = ?",
+            (FORMAT_VERSION,),
+        ).fetchall()
+
+    snapshots: list[tuple[str, StatsRange, CachedWakatimeResponse]] = []
+
+    for username, stats_range, fetched_at, payload in rows:
+        try:
+            response = WakatimeResponse(_decode(payload))
+            snapshots.append((username, StatsRange(stats_range), CachedWakatimeResponse(response, fetched_at)))
+        except (ValueError, TypeError, zlib.error) as e:
+            log.warning(f"Skipping the {stats_range} stats snapshot of {username}: {e}")
+
+    return snapshots
+
+
+def close() -> None:
+    _database.close()
+
+
+def _encode(data: WakatimeData) -> bytes:
+    return zlib.compress(
+        orjson.dumps(
+            [
+                [
+                    (
+                        item.total_seconds,
+                        item.name,
+                        item.percent,
+                        item.hours,
+                        item.minutes,
+                    )
+                    for item in getattr(data, section)
+                ]
+                for section in SECTIONS
+            ]
+        ),
+        COMPRESSION_LEVEL,
+    )
+
+
+def _decode(payload: bytes) -> WakatimeData:
+    projects, languages, editors = (
+        [WakatimeItem(*fields) for fields in items]
+        for items in orjson.loads(zlib.decompress(payload))
+    )
+
+    return WakatimeData(projects, languages, editors)
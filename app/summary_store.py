@@ -0,0 +1,254 @@
+import asyncio
+import logging
+import math
+import os
+import time
+import weakref
+from datetime import date, datetime, timedelta, timezone
+from dotenv import load_dotenv
+
+from . import metrics
+from .client import wakatime_api_client
+from .client.wakatime_response_decoder import SECTIONS
+from .model.wakatime.stats_range import StatsRange
+from .model.wakatime.wakatime_daily_summary import WakatimeDailySummary
+from .model.wakatime.wakatime_data import WakatimeData
+from .model.wakatime.wakatime_item import WakatimeItem
+from .model.wakatime.wakatime_response import WakatimeResponse
+from .sqlite_database import SqliteDatabase
+
+log = logging.getLogger(__name__)
+log.setLevel(logging.DEBUG)
+
+_ = load_dotenv()
+
+# Wakatime only serves summaries of other users to their teams, so the store is opt-in
+ENABLED: bool = os.getenv("WAKATIME_SUMMARY_STORE_ENABLED", "false").lower() in ("1", "true", "yes")
+PATH: str = os.getenv("WAKATIME_SUMMARY_STORE_PATH", "cache/summaries.sqlite3")
+
+# Wakatime days follow the user's timezone, so yesterday may still change when it's already today in UTC
+MUTABLE_DAYS: int = 2
+# missing days are fetched in spans of at most this many days, so a single response stays small
+MAX_FETCH_DAYS: int = 31
+
+# ranges that can be summed up from days, all time has no known first day
+RANGE_DAYS: dict[StatsRange, int] = {
+    StatsRange.LAST_7_DAYS: 7,
+    StatsRange.LAST_30_DAYS: 30,
+    StatsRange.LAST_6_MONTHS: 183,
+    StatsRange.LAST_YEAR: 365,
+}
+# days no range reaches anymore are deleted
+RETENTION_DAYS: int = max(RANGE_DAYS.values())
+
+_SCHEMA: str = """
+CREATE TABLE IF NOT EXISTS days (
+    username TEXT NOT NULL,
+    day TEXT NOT NULL,
+    fetched_at REAL NOT NULL,
+    PRIMARY KEY (username, day)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS items (
+    username TEXT NOT NULL,
+    day TEXT NOT NULL,
+    section TEXT NOT NULL,
+    name TEXT NOT NULL,
+    total_seconds REAL NOT NULL,
+    PRIMARY KEY (username, day, section, name)
+) WITHOUT ROWID;
+"""
+
+_database = SqliteDatabase("summary store", _SCHEMA)
+
+# one refresh per user at a time, so ranges of the same user don't fetch the same days twice,
+# a lock is dropped as soon as no refresh of the user holds or waits for it
+_user_locks: weakref.WeakValueDictionary[str, asyncio.Lock] = weakref.WeakValueDictionary()
+
+
+def supports(stats_range: StatsRange) -> bool:
+    """
+    Returns whether stats of the range are computed by the store instead of fetched from Wakatime.
+    """
+    return ENABLED and stats_range in RANGE_DAYS
+
+
+async def get_stats(
+    username: str, stats_range: StatsRange, today: date | None = None
+) -> WakatimeResponse:
+    """
+    Returns the stats of the user over the range, summed up from the stored days.
+
+    Parameters:
+    username (str): Wakatime username.
+    stats_range (StatsRange): Range of the stats, one of RANGE_DAYS.
+    today (date | None): Last day of the range, defaults to the current UTC date.
+
+    Returns:
+    WakatimeResponse: The stats in the shape of a Wakatime stats response.
+
+    Raises:
+    WakatimeUserNotFoundError: If Wakatime doesn't know the user.
+    WakatimeUnavailableError: If missing days can't be fetched, see wakatime_api_client.get_summaries().
+    WakatimeResponseMalformedError: If Wakatime answers with malformed summaries.
+
+    Notes:
+    - Only days that aren't stored yet and the last MUTABLE_DAYS days are fetched from Wakatime,
+      older days never change once they're stored.
+    - Percents, hours and minutes are computed from the summed seconds like Wakatime computes them.
+    - Database calls run in a worker thread.
+    """
+    today = datetime.now(timezone.utc).date() if today is None else today
+    start = today - timedelta(days=RANGE_DAYS[stats_range] - 1)
+    key = username.lower()
+
+    user_lock = _user_locks.setdefault(key, asyncio.Lock())
+
+    async with user_lock:
+        missing = await asyncio.to_thread(_missing_days, key, start, today)
+        metrics.SUMMARY_DAYS.labels("stored").inc(RANGE_DAYS[stats_range] - len(missing))
+        metrics.SUMMARY_DAYS.labels("fetched").inc(len(missing))
+
+        for span_start, span_end in _spans(missing):
+            summaries = await wakatime_api_client.get_summaries(username, span_start, span_end)
+            await asyncio.to_thread(_store, key, span_start, span_end, summaries, today)
+
+    return await asyncio.to_thread(_sum, key, start, today)
+
+
+def close() -> None:
+    _database.close()
+
+
+def _missing_days(key: str, start: date, end: date) -> list[date]:
+    """
+    Returns the days from start to end that have to be fetched, either not stored or within the last MUTABLE_DAYS.
+    """
+    mutable_from = end - timedelta(days=MUTABLE_DAYS - 1)
+
+    with _database.connect(PATH) as connection:
+        stored = {
+            day
+            for (day,) in connection.execute(
+                "SELECT day FROM days WHERE username = ? AND day BETWEEN ? AND ?",
+                (key, start.isoformat(), end.isoformat()),
+            )
+        }
+
+    return [
+        day
+        for day in (start + timedelta(days=i) for i in range((end - start).days + 1))
+        if day >= mutable_from or day.isoformat() not in stored
+    ]
+
+
+def _spans(days: list[date]) -> list[tuple[date, date]]:
+    """
+    Splits ascending days into spans of consecutive days of at most MAX_FETCH_DAYS days.
+    """
+    spans: list[tuple[date, date]] = []
+
+    for day in days:
+        if (
+            len(spans) != 0
+            and spans[-1][1] + timedelta(days=1) == day
+            and (day - spans[-1][0]).days < MAX_FETCH_DAYS
+        ):
+            spans[-1] = (spans[-1][0], day)
+        else:
+            spans.append((day, day))
+
+    return spans
+
+
+def _store(
+    key: str,
+    start: date,
+    end: date,
+    summaries: list[WakatimeDailySummary],
+    today: date,
+) -> None:
+    """
+    Replaces the stored days from start to end with the summaries and deletes days older than RETENTION_DAYS.
+
+    Notes:
+    - Days without a summary are stored empty, so they aren't fetched again.
+    - Items of the same name within a day are summed.
+    """
+    fetched_at = time.time()
+    days = [(start + timedelta(days=i)).isoformat() for i in range((end - start).days + 1)]
+    items: dict[tuple[str, str, str], float] = {}
+
+    for summary in summaries:
+        if not start <= summary.day <= end:
+            continue
+
+        for section in SECTIONS:
+            for item in getattr(summary.data, section):
+                item_key = (summary.day.isoformat(), section, item.name)
+                items[item_key] = items.get(item_key, 0.0) + item.total_seconds
+
+    expired = (today - timedelta(days=RETENTION_DAYS)).isoformat()
+
+    with _database.connect(PATH) as connection:
+        with connection:
+            _ = connection.execute("BEGIN")
+            _ = connection.executemany(
+                "DELETE FROM items WHERE username = ? AND day = ?", ((key, day) for day in days)
+            )
+            _ = connection.executemany(
+                "INSERT OR REPLACE INTO days (username, day, fetched_at) VALUES (?, ?, ?)",
+                ((key, day, fetched_at) for day in days),
+            )
+            _ = connection.executemany(
+                "INSERT INTO items (username, day, section, name, total_seconds) VALUES (?, ?, ?, ?, ?)",
+                ((key, *item_key, total_seconds) for item_key, total_seconds in items.items()),
+            )
+            _ = connection.execute("DELETE FROM items WHERE username = ? AND day < ?", (key, expired))
+            _ = connection.execute("DELETE FROM days WHERE username = ? AND day < ?", (key, expired))
+
+
+def _sum(key: str, start: date, end: date) -> WakatimeResponse:
+    """
+    Sums up the stored items of the user from start to end into stats, items of each section by descending time.
+    """
+    with _database.connect(PATH) as connection:
+        rows: list[tuple[str, str, float]] = connection.execute(
+            "SELECT section, name, SUM(total_seconds) AS seconds FROM items"
+            " WHERE username = ? AND day BETWEEN ? AND ?"
+            " GROUP BY section, name HAVING seconds > 0 ORDER BY seconds DESC, name",
+            (key, start.isoformat(), end.isoformat()),
+        ).fetchall()
+
+    seconds_by_section: dict[str, list[tuple[str, float]]] = {section: [] for section in SECTIONS}
+
+    for section, name, seconds in rows:
+        seconds_by_section[section].append((name, seconds))
+
+    projects, languages, editors = (
+        _to_items(seconds_by_section[section]) for section in SECTIONS
+    )
+
+    return WakatimeResponse(WakatimeData(projects, languages, editors))
+
+
+def _to_items(seconds_by_name: list[tuple[str, float]]) -> list[WakatimeItem]:
+    total = math.fsum(seconds for _, seconds in seconds_by_name)
+    items: list[WakatimeItem] = []
+
+    for name, seconds in seconds_by_name:
+        total_minutes = int(seconds // 60)
+        hours, minutes = divmod(total_minutes, 60)
+
+        items.append(
+            WakatimeItem(
+                total_seconds=seconds,
+                name=name,
+                # Wakatime reports percents with two decimals
+                percent=round(seconds / total * 100, 2),
+                hours=hours,
+                minutes=minutes,
+            )
+        )
+
+    return items
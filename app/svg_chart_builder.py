@@ -0,0 +1,251 @@
+import logging
+import math
+from xml.sax.saxutils import escape, quoteattr
+
+from .chart_style import (
+    DEFAULT_COLORS,
+    GITHUB_BG_COLOR,
+    GITHUB_FG_COLOR,
+    PIE_CHART_ITEMS,
+)
+from .model.chart.chart_format import ChartFormat
+from .model.wakatime.wakatime_item import WakatimeItem
+
+# Layout mirrors chart_builder: matplotlib defaults plus its subplots_adjust() call
+DEFAULT_WIDTH: int = 640
+DEFAULT_HEIGHT: int = 480
+SUBPLOTS_LEFT: float = 0.1
+SUBPLOTS_RIGHT: float = 0.95
+SUBPLOTS_BOTTOM: float = 0.11
+SUBPLOTS_TOP: float = 0.88
+SUBPLOTS_WSPACE: float = 0.2
+
+PIE_LIMIT: float = 1.25
+PIE_RADIUS: float = 1.2
+PIE_WEDGE_WIDTH: float = 0.22
+
+# matplotlib renders 10pt legend text at 100 dpi
+FONT_SIZE: float = 10 * 100 / 72
+FONT_FAMILY: str = "'Segoe UI', 'DejaVu Sans', Helvetica, Arial, sans-serif"
+AVERAGE_CHAR_WIDTH: float = 0.6
+LABEL_SPACING: float = 0.5
+HANDLE_LENGTH: float = 2.0
+HANDLE_HEIGHT: float = 0.7
+HANDLE_TEXT_PAD: float = 0.8
+
+# matplotlib writes SVG sizes in points at 72 dpi while sizing the figure at 100 dpi
+PX_TO_PT: float = 0.72
+
+log = logging.getLogger(__name__)
+log.setLevel(logging.DEBUG)
+
+
+def render_pie_chart(
+    data_list: list[WakatimeItem],
+    colors_data: dict[str, str] | None,
+    height: int | None,
+    width: int | None,
+    output_format: ChartFormat = ChartFormat.SVG,
+) -> bytes:
+    """
+    Renders a donut chart with a legend into an SVG document, without matplotlib.
+
+    Parameters:
+    data_list (list[WakatimeItem]): A list of WakatimeItem objects containing data for the pie chart.
+    colors_data (dict[str, str] | None): A dictionary mapping item names to colors. If None, default colors are used.
+    height (int | None): Height of the chart in pixels. If None, uses default size.
+    width (int | None): Width of the chart in pixels. If None, uses default size.
+    output_format (ChartFormat): Must be ChartFormat.SVG, raster formats are rendered by chart_builder.
+
+    Returns:
+    bytes: The rendered SVG document.
+
+    Raises:
+    ValueError: If output_format isn't ChartFormat.SVG.
+
+    Notes:
+    - The layout matches chart_builder.render_pie_chart(), which is kept as the reference renderer.
+    """
+    if output_format != ChartFormat.SVG:
+        raise ValueError(f"Can't render {output_format.value} charts without matplotlib")
+
+    if height is None or width is None:
+        width, height = DEFAULT_WIDTH, DEFAULT_HEIGHT
+
+    items = data_list[:PIE_CHART_ITEMS]
+    colors = _map_colors(colors_data, items)
+
+    axes_width = (
+        (SUBPLOTS_RIGHT - SUBPLOTS_LEFT) * width / (2 + SUBPLOTS_WSPACE)
+    )
+    axes_height = (SUBPLOTS_TOP - SUBPLOTS_BOTTOM) * height
+    axes_center_y = (1 - SUBPLOTS_TOP) * height + axes_height / 2
+    legend_center_x = SUBPLOTS_LEFT * width + axes_width / 2
+    pie_center_x = legend_center_x + axes_width * (1 + SUBPLOTS_WSPACE)
+
+    scale = min(axes_width, axes_height) / (2 * PIE_LIMIT)
+
+    elements: list[str] = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" '
+        f'width="{_num(width * PX_TO_PT)}pt" height="{_num(height * PX_TO_PT)}pt" '
+        f'viewBox="0 0 {width} {height}">',
+        f'<rect width="100%" height="100%" fill="{GITHUB_BG_COLOR}"/>',
+    ]
+
+    elements.extend(
+        _render_wedges(
+            [item.percent for item in items],
+            colors,
+            pie_center_x,
+            axes_center_y,
+            PIE_RADIUS * scale,
+            (PIE_RADIUS - PIE_WEDGE_WIDTH) * scale,
+        )
+    )
+
+    labels = [f"{item.name} - {item.hours}h {item.minutes}m" for item in items]
+    elements.extend(_render_legend(labels, colors, legend_center_x, axes_center_y))
+
+    elements.append("</svg>")
+
+    return "".join(elements).encode()
+
+
+def _render_wedges(
+    percents: list[float],
+    colors: list[str],
+    center_x: float,
+    center_y: float,
+    outer_radius: float,
+    inner_radius: float,
+) -> list[str]:
+    """
+    Renders donut wedges clockwise from 12 o'clock, normalizing percents the same way matplotlib pie() does.
+    """
+    total = sum(percents)
+
+    if total <= 0:
+        return []
+
+    fractions = [percent / total for percent in percents] if total > 1 else percents
+
+    wedges: list[str] = []
+    start = 0.0
+
+    for fraction, color in zip(fractions, colors):
+        end = start + fraction
+
+        if fraction >= 1:
+            # a full ring can't be drawn with a single arc
+            radius = (outer_radius + inner_radius) / 2
+            wedges.append(
+                f'<circle cx="{_num(center_x)}" cy="{_num(center_y)}" r="{_num(radius)}" '
+                f'fill="none" stroke={quoteattr(color)} '
+                f'stroke-width="{_num(outer_radius - inner_radius)}"/>'
+            )
+        elif fraction > 0:
+            wedges.append(
+                f'<path d="{_wedge_path(start, end, center_x, center_y, outer_radius, inner_radius)}" '
+                f"fill={quoteattr(color)}/>"
+            )
+
+        start = end
+
+    return wedges
+
+
+def _wedge_path(
+    start: float,
+    end: float,
+    center_x: float,
+    center_y: float,
+    outer_radius: float,
+    inner_radius: float,
+) -> str:
+    large_arc = 1 if end - start > 0.5 else 0
+
+    outer_start = _point(start, center_x, center_y, outer_radius)
+    outer_end = _point(end, center_x, center_y, outer_radius)
+    inner_end = _point(end, center_x, center_y, inner_radius)
+    inner_start = _point(start, center_x, center_y, inner_radius)
+
+    return (
+        f"M{outer_start}"
+        f"A{_num(outer_radius)} {_num(outer_radius)} 0 {large_arc} 1 {outer_end}"
+        f"L{inner_end}"
+        f"A{_num(inner_radius)} {_num(inner_radius)} 0 {large_arc} 0 {inner_start}Z"
+    )
+
+
+def _point(fraction: float, center_x: float, center_y: float, radius: float) -> str:
+    angle = 2 * math.pi * fraction
+    x = center_x + radius * math.sin(angle)
+    y = center_y - radius * math.cos(angle)
+
+    return f"{_num(x)} {_num(y)}"
+
+
+def _render_legend(
+    labels: list[str], colors: list[str], center_x: float, center_y: float
+) -> list[str]:
+    """
+    Renders legend rows (a color swatch followed by the label) centered around the given point.
+    """
+    if len(labels) == 0:
+        return []
+
+    longest_label = max(len(label) for label in labels)
+    legend_width = FONT_SIZE * (
+        HANDLE_LENGTH + HANDLE_TEXT_PAD + longest_label * AVERAGE_CHAR_WIDTH
+    )
+    row_pitch = FONT_SIZE * (1 + LABEL_SPACING)
+    legend_height = FONT_SIZE * len(labels) + FONT_SIZE * LABEL_SPACING * (
+        len(labels) - 1
+    )
+
+    left = center_x - legend_width / 2
+    top = center_y - legend_height / 2
+    text_x = left + FONT_SIZE * (HANDLE_LENGTH + HANDLE_TEXT_PAD)
+
+    rows: list[str] = [
+        f'<g font-family="{FONT_FAMILY}" font-size="{_num(FONT_SIZE)}" fill="{GITHUB_FG_COLOR}">'
+    ]
+
+    for index, (label, color) in enumerate(zip(labels, colors)):
+        row_center = top + index * row_pitch + FONT_SIZE / 2
+
+        rows.append(
+            f'<rect x="{_num(left)}" y="{_num(row_center - FONT_SIZE * HANDLE_HEIGHT / 2)}" '
+            f'width="{_num(FONT_SIZE * HANDLE_LENGTH)}" height="{_num(FONT_SIZE * HANDLE_HEIGHT)}" '
+            f"fill={quoteattr(color)}/>"
+        )
+        rows.append(
+            f'<text x="{_num(text_x)}" y="{_num(row_center)}" dominant-baseline="central">'
+            f"{escape(label)}</text>"
+        )
+
+    rows.append("</g>")
+
+    return rows
+
+
+def _map_colors(
+    item_colors: dict[str, str] | None, items: list[WakatimeItem]
+) -> list[str]:
+    """
+    Maps colors to items case-insensitively, falling back to DEFAULT_COLORS by item position.
+    """
+    folded_colors: dict[str, str] = (
+        {}
+        if item_colors is None
+        else {name.lower(): color for name, color in item_colors.items()}
+    )
+
+    return [
+        folded_colors.get(item.name.lower(), DEFAULT_COLORS[index % len(DEFAULT_COLORS)])
+        for index, item in enumerate(items)
+    ]
+
+
+def _num(value: float) -> str:
+    return f"{value:.2f}".rstrip("0").rstrip(".")
@@ -0,0 +1,572 @@
+"""
+Benchmarks of the fetch -> process -> render pipeline.
+
+Every stage is measured on synthetic Wakatime datasets of several sizes and with several hide/group specs.
+Results are written as JSON, so runs of different commits can be compared with --baseline.
+
+Usage:
+python -m benchmarks.pipeline [--sizes 10,1000,100000] [--stages decode,group] [--output PATH] [--baseline PATH]
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+from contextlib import AbstractContextManager, contextmanager, nullcontext
+from typing import Any, Callable, Iterator
+from unittest.mock import patch
+from uuid import UUID, uuid4
+
+import httpx
+from fastapi.testclient import TestClient
+
+from app import chart_builder
+from app import chart_manager
+from app import chart_service
+from app import language_color_index
+from app import main
+from app import render_cache
+from app import render_pool
+from app import stats_cache
+from app import svg_chart_builder
+from app.chart_style import PIE_CHART_ITEMS
+from app.client import http_client
+from app.client import wakatime_api_client
+from app.client import wakatime_response_decoder
+from app.model.wakatime.wakatime_item import WakatimeItem
+
+SIZES: list[int] = [10, 1_000, 100_000]
+REPEAT: int = 5
+MIN_TIME_SECONDS: float = 0.2
+MAX_REGRESSION: float = 1.25
+
+# chart_manager writes a file per chart, bigger stores only measure the file system
+MAX_STORED_CHARTS: int = 1_000
+
+RESULTS_DIRECTORY: str = os.path.join(os.path.dirname(__file__), "results")
+
+NAME_PREFIXES: list[str] = ["project", "tmp", "lib", "service", "work"]
+NAME_SUFFIXES: list[str] = ["", "-old", "-legacy", "-api"]
+
+SPECS: dict[str, tuple[set[str] | None, dict[str, set[str]] | None]] = {
+    "none": (None, None),
+    "exact": (
+        {f"tmp-{i}" for i in range(10)},
+        {"Work": {f"work-{i}" for i in range(10)}},
+    ),
+    "wildcards": (
+        {"tmp-**", "**-old"},
+        {"Work": {"work-**"}, "Legacy": {"**-legacy"}},
+    ),
+    "many-groups": (
+        {f"lib-{i}" for i in range(100)} | {"tmp-**", "**-old"},
+        {f"Group {i}": {f"service-{i}**", f"**-{i}-api", f"work-{i}"} for i in range(20)},
+    ),
+}
+
+
+def run(
+    sizes: list[int] = SIZES,
+    stages: list[str] | None = None,
+    min_time: float = MIN_TIME_SECONDS,
+    repeat: int = REPEAT,
+) -> dict[str, Any]:
+    """
+    Runs the benchmarks.
+
+    Parameters:
+    sizes (list[int]): Numbers of items in the synthetic datasets.
+    stages (list[str] | None): Names of the stages to run, see STAGES. If None, all stages are run.
+    min_time (float): Minimum duration of a single measurement in seconds.
+    repeat (int): Number of measurements of each benchmark, the best and the median are reported.
+
+    Returns:
+    dict[str, Any]: Metadata of the run and the list of results.
+    """
+    language_color_index.load()
+
+    results: list[dict[str, Any]] = []
+
+    for stage, benchmark in STAGES.items():
+        if stages is not None and stage not in stages:
+            continue
+
+        for size, spec, function, context in benchmark(sizes):
+            with context:
+                iterations, times = _measure(function, min_time, repeat)
+
+            result = {
+                "stage": stage,
+                "size": size,
+                "spec": spec,
+                "iterations": iterations,
+                "best_seconds": min(times),
+                "median_seconds": statistics.median(times),
+            }
+            results.append(result)
+            print(_format_result(result), flush=True)
+
+    render_pool.shutdown()
+
+    return {
+        "commit": _git_commit(),
+        "created_at": time.time(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "chart_renderer": render_pool.CHART_RENDERER,
+        "results": results,
+    }
+
+
+def compare(
+    baseline: dict[str, Any], current: dict[str, Any], max_regression: float = MAX_REGRESSION
+) -> list[dict[str, Any]]:
+    """
+    Compares the best times of two runs.
+
+    Parameters:
+    baseline (dict[str, Any]): A run returned by run() or read from a results file.
+    current (dict[str, Any]): A run returned by run() or read from a results file.
+    max_regression (float): Ratio of the current to the baseline time above which a benchmark is regressed.
+
+    Returns:
+    list[dict[str, Any]]: Benchmarks present in both runs with their ratios, regressed ones marked with "regressed".
+    """
+    baseline_times = {_key(result): result["best_seconds"] for result in baseline["results"]}
+    comparison: list[dict[str, Any]] = []
+
+    for result in current["results"]:
+        baseline_time = baseline_times.get(_key(result))
+
+        if baseline_time is None or baseline_time <= 0:
+            continue
+
+        ratio = result["best_seconds"] / baseline_time
+        comparison.append(
+            {
+                "stage": result["stage"],
+                "size": result["size"],
+                "spec": result["spec"],
+                "ratio": ratio,
+                "regressed": ratio > max_regression,
+            }
+        )
+
+    return comparison
+
+
+# size, spec, the measured function and the context it's measured in
+Benchmark = tuple[int, str, Callable[[], object], AbstractContextManager[Any]]
+
+
+def _decode(sizes: list[int]) -> list[Benchmark]:
+    benchmarks: list[Benchmark] = []
+
+    for size in sizes:
+        payload = json.dumps(_get_payload(size)).encode()
+        benchmarks.append(
+            (
+                size,
+                "none",
+                lambda payload=payload: wakatime_response_decoder.decode(payload),
+                nullcontext(),
+            )
+        )
+
+    return benchmarks
+
+
+def _group(sizes: list[int]) -> list[Benchmark]:
+    return [
+        (size, spec, lambda data=_get_items(size), groups=groups: chart_service._group(data, groups), nullcontext())  # type: ignore[all]
+        for size in sizes
+        for spec, (_, groups) in SPECS.items()
+        if groups is not None
+    ]
+
+
+def _hide(sizes: list[int]) -> list[Benchmark]:
+    return [
+        (size, spec, lambda data=_get_items(size), hide=hide: chart_service._hide(data, hide), nullcontext())  # type: ignore[all]
+        for size in sizes
+        for spec, (hide, _) in SPECS.items()
+        if hide is not None
+    ]
+
+
+def _group_and_hide(sizes: list[int]) -> list[Benchmark]:
+    return [
+        (
+            size,
+            spec,
+            lambda data=_get_items(size), hide=hide, groups=groups: chart_service._group_and_hide(  # type: ignore[all]
+                data, chart_service._get_matcher(hide, groups)  # type: ignore[all]
+            ),
+            nullcontext(),
+        )
+        for size in sizes
+        for spec, (hide, groups) in SPECS.items()
+    ]
+
+
+def _merge_github_lang_colors(sizes: list[int]) -> list[Benchmark]:
+    return [
+        (
+            size,
+            "none",
+            lambda colors=_get_colors(size): chart_service._merge_github_lang_colors(  # type: ignore[all]
+                colors, language_color_index._colors  # type: ignore[all]
+            ),
+            nullcontext(),
+        )
+        for size in sizes
+    ]
+
+
+def _normalize_colors(sizes: list[int]) -> list[Benchmark]:
+    return [
+        (
+            size,
+            "none",
+            lambda colors=_get_colors(size): chart_service._normalize_colors(colors),  # type: ignore[all]
+            nullcontext(),
+        )
+        for size in sizes
+    ]
+
+
+def _render_matplotlib(_: list[int]) -> list[Benchmark]:
+    data = _get_items(PIE_CHART_ITEMS)
+
+    return [
+        (
+            PIE_CHART_ITEMS,
+            "none",
+            lambda: chart_builder.render_pie_chart(data, None, 215, 420),
+            nullcontext(),
+        )
+    ]
+
+
+def _render_svg(_: list[int]) -> list[Benchmark]:
+    data = _get_items(PIE_CHART_ITEMS)
+
+    return [
+        (
+            PIE_CHART_ITEMS,
+            "none",
+            lambda: svg_chart_builder.render_pie_chart(data, None, 215, 420),
+            nullcontext(),
+        )
+    ]
+
+
+def _save_chart(sizes: list[int]) -> list[Benchmark]:
+    content = svg_chart_builder.render_pie_chart(_get_items(PIE_CHART_ITEMS), None, 215, 420)
+
+    return [
+        (count, "none", lambda: chart_manager.save_chart(content, uuid4()), _chart_store(count, []))
+        for count in _chart_store_sizes(sizes)
+    ]
+
+
+def _find_by_uuid(sizes: list[int]) -> list[Benchmark]:
+    benchmarks: list[Benchmark] = []
+
+    for count in _chart_store_sizes(sizes):
+        uuids: list[UUID] = []
+        benchmarks.append(
+            (
+                count,
+                "none",
+                lambda uuids=uuids: chart_manager.find_by_uuid(uuids[len(uuids) // 2]),
+                _chart_store(count, uuids),
+            )
+        )
+
+    return benchmarks
+
+
+def _end_to_end(sizes: list[int]) -> list[Benchmark]:
+    """
+    Requests charts from the FastAPI app with the Wakatime API stubbed by an httpx mock transport.
+
+    Stats and rendered charts are dropped before every "cold" request,
+    "cached" requests hit both caches and "not-modified" requests are answered with 304.
+    """
+    benchmarks: list[Benchmark] = []
+
+    for size in sizes:
+        client = _get_test_client(size)
+        url = "/api/user/pie/projects?hide=tmp-**,**-old&group=Work&Work=work-**"
+        etag = client.get(url).headers["ETag"]
+
+        benchmarks.append(
+            (size, "cold", lambda client=client: _cold_request(client, url), nullcontext())
+        )
+        benchmarks.append((size, "cached", lambda client=client: client.get(url), nullcontext()))
+        benchmarks.append(
+            (
+                size,
+                "not-modified",
+                lambda client=client: client.get(url, headers={"If-None-Match": etag}),
+                nullcontext(),
+            )
+        )
+
+    return benchmarks
+
+
+def _startup(_: list[int]) -> list[Benchmark]:
+    """
+    Starts fresh interpreters: importing app.main, running the app startup and rendering the first chart.
+
+    The language colors refresh and the pre-warm scheduler are disabled, so nothing touches the network.
+    """
+    env = os.environ | {
+        "PREWARM_ENABLED": "false",
+        "LANGUAGE_COLORS_TTL_SECONDS": str(10**11),
+    }
+
+    return [
+        (
+            1,
+            spec,
+            lambda code=code: subprocess.run([sys.executable, "-c", code], env=env, check=True),
+            nullcontext(),
+        )
+        for spec, code in STARTUP_SCRIPTS.items()
+    ]
+
+
+STARTUP_SCRIPTS: dict[str, str] = {
+    "import": "import app.main",
+    "ready": (
+        "import asyncio\n"
+        "from app import main\n"
+        "async def start():\n"
+        "    async with main.lifespan(main.app):\n"
+        "        pass\n"
+        "if __name__ == '__main__':\n"
+        "    asyncio.run(start())\n"
+    ),
+    "first_chart": (
+        "import asyncio\n"
+        "from app import main, render_pool\n"
+        "from app.model.chart.chart_type import ChartType\n"
+        "async def start():\n"
+        "    async with main.lifespan(main.app):\n"
+        "        await render_pool.render(ChartType.PIE, render_pool.WARM_UP_DATA, None, 215, 420)\n"
+        "if __name__ == '__main__':\n"
+        "    asyncio.run(start())\n"
+    ),
+}
+
+
+STAGES: dict[str, Callable[[list[int]], list[Benchmark]]] = {
+    "decode": _decode,
+    "group": _group,
+    "hide": _hide,
+    "group_and_hide": _group_and_hide,
+    "merge_github_lang_colors": _merge_github_lang_colors,
+    "normalize_colors": _normalize_colors,
+    "render_matplotlib": _render_matplotlib,
+    "render_svg": _render_svg,
+    "save_chart": _save_chart,
+    "find_by_uuid": _find_by_uuid,
+    "end_to_end": _end_to_end,
+    "startup": _startup,
+}
+
+
+def _get_items(size: int) -> list[WakatimeItem]:
+    return [
+        WakatimeItem(item["total_seconds"], item["name"], item["percent"], item["hours"], item["minutes"])
+        for item in _get_raw_items(size)
+    ]
+
+
+def _get_raw_items(size: int) -> list[dict[str, Any]]:
+    items: list[dict[str, Any]] = []
+
+    for i in range(size):
+        total_seconds = float(size - i) * 60
+        hours, minutes = divmod(int(total_seconds // 60), 60)
+        prefix = NAME_PREFIXES[i % len(NAME_PREFIXES)]
+        suffix = NAME_SUFFIXES[i % len(NAME_SUFFIXES)]
+
+        items.append(
+            {
+                "total_seconds": total_seconds,
+                "name": f"{prefix}-{i % 100}{suffix}",
+                "percent": round(100 / size, 2),
+                "digital": f"{hours}:{minutes:02d}",
+                "decimal": f"{hours + minutes / 60:.2f}",
+                "text": f"{hours} hrs {minutes} mins",
+                "hours": hours,
+                "minutes": minutes,
+            }
+        )
+
+    return items
+
+
+def _get_payload(size: int) -> dict[str, Any]:
+    items = _get_raw_items(size)
+    # Wakatime also sends sections that aren't charted
+    return {
+        "data": {
+            section: items
+            for section in ("projects", "languages", "editors", "categories", "operating_systems", "machines", "dependencies")
+        }
+    }
+
+
+def _get_colors(size: int) -> dict[str, str]:
+    return {f"project-{i}": f"{i % 0xFFFFFF:06X}" for i in range(size)}
+
+
+def _chart_store_sizes(sizes: list[int]) -> list[int]:
+    return sorted({min(size, MAX_STORED_CHARTS) for size in sizes})
+
+
+@contextmanager
+def _chart_store(count: int, uuids: list[UUID]) -> Iterator[None]:
+    """
+    Points chart_manager to a temporary chart store filled with count charts, their uuids are added to uuids.
+    """
+    store = tempfile.mkdtemp(prefix="charts-")
+
+    try:
+        with (
+            patch.object(chart_manager, "PLOTS_DIRECTORY", store),
+            patch.object(chart_manager, "MAX_FILES", count),
+            patch.object(chart_manager, "_index", None),
+            patch.object(chart_manager, "_total_bytes", 0),
+        ):
+            for _ in range(count):
+                uuid = uuid4()
+                chart_manager.save_chart(b"<svg/>", uuid)
+                uuids.append(uuid)
+
+            yield
+    finally:
+        shutil.rmtree(store, ignore_errors=True)
+
+
+def _get_test_client(size: int) -> TestClient:
+    payload = json.dumps(_get_payload(size)).encode()
+
+    def handler(_: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, content=payload, headers={"Content-Type": "application/json"})
+
+    os.environ.setdefault("WAKATIME_BASE_URL", "https://wakatime.test/api/v1")
+    os.environ.setdefault("WAKATIME_API_KEY", "benchmark")
+
+    http_client._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))  # type: ignore[all]
+    # cold requests are measured back to back, far above the Wakatime quota
+    wakatime_api_client.rate_limiter.rate = 0
+    stats_cache.clear()
+    render_cache.clear()
+
+    return TestClient(main.app)
+
+
+def _cold_request(client: TestClient, url: str) -> httpx.Response:
+    stats_cache.clear()
+    render_cache.clear()
+    return client.get(url)
+
+
+def _measure(
+    function: Callable[[], object], min_time: float, repeat: int
+) -> tuple[int, list[float]]:
+    """
+    Returns the number of calls per measurement and the time of a single call in each measurement.
+    """
+    function()
+
+    timer = timeit.Timer(function)
+    iterations = 1
+
+    while True:
+        elapsed = timer.timeit(iterations)
+
+        if elapsed >= min_time:
+            break
+
+        iterations *= 10 if elapsed < min_time / 10 else 2
+
+    return (iterations, [t / iterations for t in timer.repeat(repeat, iterations)])
+
+
+def _key(result: dict[str, Any]) -> tuple[str, int, str]:
+    return (result["stage"], result["size"], result["spec"])
+
+
+def _format_result(result: dict[str, Any]) -> str:
+    return (
+        f"{result['stage']:<26} {result['size']:>8} {result['spec']:<14} "
+        f"{result['best_seconds'] * 1e6:>14.1f} us  (median {result['median_seconds'] * 1e6:.1f} us)"
+    )
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmarks of the fetch -> process -> render pipeline")
+    parser.add_argument("--sizes", default=",".join(map(str, SIZES)))
+    parser.add_argument("--stages", default=None, help=f"comma separated, any of {', '.join(STAGES)}")
+    parser.add_argument("--min-time", type=float, default=MIN_TIME_SECONDS)
+    parser.add_argument("--repeat", type=int, default=REPEAT)
+    parser.add_argument("--output", default=None, help="defaults to benchmarks/results/{commit}.json")
+    parser.add_argument("--baseline", default=None, help="results file to compare the run with")
+    parser.add_argument("--max-regression", type=float, default=MAX_REGRESSION)
+    args = parser.parse_args()
+
+    results = run(
+        sizes=[int(size) for size in args.sizes.split(",")],
+        stages=None if args.stages is None else args.stages.split(","),
+        min_time=args.min_time,
+        repeat=args.repeat,
+    )
+
+    output = args.output or os.path.join(RESULTS_DIRECTORY, f"{results['commit'] or 'unknown'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+
+    with open(output, "w", encoding="utf-8") as file:
+        json.dump(results, file, indent=2)
+
+    print(f"Results are written to {output}")
+
+    if args.baseline is None:
+        return 0
+
+    with open(args.baseline, encoding="utf-8") as file:
+        baseline = json.load(file)
+
+    comparison = compare(baseline, results, args.max_regression)
+
+    for result in comparison:
+        marker = "REGRESSED" if result["regressed"] else ""
+        print(f"{result['stage']:<26} {result['size']:>8} {result['spec']:<14} x{result['ratio']:.2f} {marker}")
+
+    return 1 if any(result["regressed"] for result in comparison) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(_main())
@@ -0,0 +1,35 @@
+from unittest import TestCase
+
+from benchmarks import pipeline
+
+
+class BenchmarksTest(TestCase):
+
+    def test_should_run_stages_and_report_results(self):
+        results = pipeline.run(
+            sizes=[10],
+            stages=["decode", "group_and_hide", "render_svg", "find_by_uuid"],
+            min_time=0,
+            repeat=1,
+        )
+
+        self.assertEqual(
+            {"decode", "group_and_hide", "render_svg", "find_by_uuid"},
+            {result["stage"] for result in results["results"]},
+        )
+        self.assertTrue(all(result["best_seconds"] > 0 for result in results["results"]))
+
+    def test_should_mark_regressions_against_baseline(self):
+        baseline = {"results": [_result("decode", 1.0), _result("render_svg", 1.0)]}
+        current = {"results": [_result("decode", 1.1), _result("render_svg", 2.0)]}
+
+        comparison = pipeline.compare(baseline, current, max_regression=1.25)
+
+        self.assertEqual(
+            [("decode", False), ("render_svg", True)],
+            [(result["stage"], result["regressed"]) for result in comparison],
+        )
+
+
+def _result(stage: str, seconds: float) -> dict[str, object]:
+    return {"stage": stage, "size": 10, "spec": "none", "best_seconds": seconds}
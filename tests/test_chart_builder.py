@@ -0,0 +1,155 @@
+import gc
+import resource
+from concurrent.futures import ThreadPoolExecutor
+from unittest import TestCase
+from xml.etree import ElementTree
+
+from matplotlib import _pylab_helpers  # type: ignore[all]
+from matplotlib.figure import Figure
+
+from app import chart_builder
+from app.model.chart.chart_format import ChartFormat
+from app.model.wakatime.wakatime_item import WakatimeItem
+
+RENDERS: int = 2000
+THREADS: int = 4
+MAX_RSS_GROWTH_KB: int = 50 * 1024
+
+SVG_NAMESPACE = "{http://www.w3.org/2000/svg}"
+
+# a five-slice donut at the default size
+BYTE_BUDGETS: dict[ChartFormat, int] = {
+    ChartFormat.SVG: 4 * 1024,
+    ChartFormat.PNG: 32 * 1024,
+    ChartFormat.WEBP: 16 * 1024,
+}
+
+
+class ChartBuilderTest(TestCase):
+
+    def test_should_not_leak_figures_across_thousands_of_renders(self):
+        data = [_item("Java", 40), _item("Python", 20)]
+
+        # warm up font caches, colormaps and the allocator before taking the baseline
+        for _ in range(20):
+            _ = chart_builder.render_pie_chart(data, None, 100, 100)
+
+        gc.collect()
+        baseline_rss = _max_rss_kb()
+
+        with ThreadPoolExecutor(THREADS) as executor:
+            contents = list(
+                executor.map(
+                    lambda _: chart_builder.render_pie_chart(data, None, 100, 100),
+                    range(RENDERS),
+                )
+            )
+
+        gc.collect()
+
+        self.assertEqual(RENDERS, len(contents))
+        self.assertTrue(all(content.startswith(b"<?xml") for content in contents))
+        self.assertEqual(0, _pylab_helpers.Gcf.get_num_fig_managers())
+        self.assertEqual(0, _live_figures())
+        self.assertLess(_max_rss_kb() - baseline_rss, MAX_RSS_GROWTH_KB)
+
+    def test_should_render_same_chart_in_parallel_threads(self):
+        data = [_item("Java", 40), _item("Python", 20), _item("Lua", 10)]
+        expected = _strip_ids(chart_builder.render_pie_chart(data, None, 215, 420))
+
+        with ThreadPoolExecutor(THREADS) as executor:
+            contents = list(
+                executor.map(
+                    lambda _: chart_builder.render_pie_chart(data, None, 215, 420),
+                    range(THREADS * 4),
+                )
+            )
+
+        for content in contents:
+            self.assertEqual(expected, _strip_ids(content))
+
+    def test_should_render_every_format_within_byte_budget(self):
+        data = [_item(f"project-{index}", 50 - index) for index in range(5)]
+
+        for output_format, budget in BYTE_BUDGETS.items():
+            with self.subTest(output_format=output_format):
+                content = chart_builder.render_pie_chart(data, None, None, None, output_format)
+
+                self.assertLess(len(content), budget)
+
+    def test_should_keep_text_of_compact_svg(self):
+        data = [_item("Java", 40), _item("Python <3>", 20)]
+
+        content = chart_builder.render_pie_chart(data, None, 215, 420)
+        root = ElementTree.fromstring(content)
+
+        self.assertEqual(
+            ["Java - 0h 40m", "Python <3> - 0h 20m"],
+            [text.text for text in root.iter(f"{SVG_NAMESPACE}text")],
+        )
+        self.assertNotIn(b"<metadata", content)
+        self.assertNotIn(b"DOCTYPE", content)
+
+    def test_should_keep_referenced_ids_when_compacting(self):
+        content = (
+            b'<?xml version="1.0" encoding="utf-8"?>\n'
+            b'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 10 10">\n'
+            b' <defs><style type="text/css">*{stroke-linecap: butt}</style></defs>\n'
+            b' <g id="figure_1">\n'
+            b'  <g>\n'
+            b'   <path d="M 0.123456 1 \nL 2.5 3.333333 \nz\n" clip-path="url(#clip1)" style="fill: #000000"/>\n'
+            b'  </g>\n'
+            b' </g>\n'
+            b' <defs><clipPath id="clip1"><rect x="0" y="0" width="5.55555" height="5"/></clipPath></defs>\n'
+            b'</svg>\n'
+        )
+
+        compacted = chart_builder._compact_svg(content)
+
+        self.assertIn(b'<path d="M0.12 1L2.5 3.33z" clip-path="url(#clip1)" style="fill:#000000"/>', compacted)
+        self.assertIn(b'<clipPath id="clip1"><rect x="0" y="0" width="5.56" height="5"/></clipPath>', compacted)
+        self.assertIn(b"*{stroke-linecap: butt}text{font-family:", compacted)
+        self.assertNotIn(b"figure_1", compacted)
+        self.assertNotIn(b"<g", compacted)
+
+    def test_should_keep_font_style_and_weight_when_compacting(self):
+        self.assertEqual(
+            "font-style:italic;font-weight:700;font-size:10px;fill:#c3d1d9",
+            chart_builder._compact_style("font: italic 700 10px 'DejaVu Sans'; fill: #c3d1d9"),
+        )
+
+    def test_should_not_register_svg_as_default_namespace(self):
+        content = chart_builder.render_pie_chart([_item("Java", 40)], None, 215, 420)
+        other = ElementTree.tostring(ElementTree.Element(f"{SVG_NAMESPACE}svg"))
+
+        self.assertIn(b'<svg xmlns="http://www.w3.org/2000/svg"', content)
+        self.assertEqual(b'<ns0:svg xmlns:ns0="http://www.w3.org/2000/svg" />', other)
+
+
+def _max_rss_kb() -> int:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def _live_figures() -> int:
+    return sum(1 for obj in gc.get_objects() if isinstance(obj, Figure))
+
+
+def _strip_ids(content: bytes) -> list[bytes]:
+    """
+    Drops lines with the render date and the random clip path ids matplotlib writes into every SVG.
+    """
+    return [
+        line
+        for line in content.splitlines()
+        if b"dc:date" not in line and b"clip" not in line and b'id="' not in line
+    ]
+
+
+def _item(name: str, minutes: int) -> WakatimeItem:
+    return WakatimeItem(
+        total_seconds=minutes * 60,
+        name=name,
+        percent=float(minutes),
+        hours=0,
+        minutes=minutes,
+    )
@@ -0,0 +1,88 @@
+import os
+import tempfile
+from unittest import TestCase
+from unittest.mock import patch
+from uuid import uuid4
+
+from app import chart_manager
+
+
+class ChartManagerTest(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.patches = [
+            patch.object(chart_manager, "PLOTS_DIRECTORY", self.directory.name),
+            patch.object(chart_manager, "_index", None),
+            patch.object(chart_manager, "_total_bytes", 0),
+        ]
+
+        for p in self.patches:
+            _ = p.start()
+
+    def tearDown(self):
+        for p in self.patches:
+            p.stop()
+
+        self.directory.cleanup()
+
+    def test_should_find_saved_chart_without_scanning_directory(self):
+        uuid = uuid4()
+        chart_manager.save_chart(b"<svg/>", uuid)
+
+        with patch.object(os, "listdir", side_effect=AssertionError("scanned")):
+            path = chart_manager.find_by_uuid(uuid)
+
+        assert path is not None
+        with open(path, "rb") as file:
+            self.assertEqual(b"<svg/>", file.read())
+
+    def test_should_index_charts_saved_before_restart(self):
+        uuid = uuid4()
+        chart_manager.save_chart(b"<svg/>", uuid)
+        chart_manager._index = None  # type: ignore[all]
+
+        self.assertIsNotNone(chart_manager.find_by_uuid(uuid))
+        self.assertIsNone(chart_manager.find_by_uuid(uuid4()))
+
+    def test_should_evict_least_recently_used_charts_above_max_files(self):
+        uuids = [uuid4() for _ in range(3)]
+
+        with patch.object(chart_manager, "MAX_FILES", 2):
+            chart_manager.save_chart(b"<svg/>", uuids[0])
+            chart_manager.save_chart(b"<svg/>", uuids[1])
+            _ = chart_manager.find_by_uuid(uuids[0])
+            chart_manager.save_chart(b"<svg/>", uuids[2])
+
+        self.assertIsNotNone(chart_manager.find_by_uuid(uuids[0]))
+        self.assertIsNone(chart_manager.find_by_uuid(uuids[1]))
+        self.assertIsNotNone(chart_manager.find_by_uuid(uuids[2]))
+        self.assertEqual(2, len(os.listdir(self.directory.name)))
+
+    def test_should_evict_charts_above_max_bytes(self):
+        with patch.object(chart_manager, "MAX_BYTES", 10):
+            chart_manager.save_chart(b"12345678", uuid4())
+            chart_manager.save_chart(b"12345678", uuid4())
+
+        self.assertEqual({"files": 1, "bytes": 8}, chart_manager.stats())
+
+    def test_should_evict_expired_charts(self):
+        uuid = uuid4()
+        chart_manager.save_chart(b"<svg/>", uuid)
+
+        with patch.object(chart_manager, "MAX_AGE_SECONDS", 0.001), patch.object(
+            chart_manager.time, "time", return_value=chart_manager.time.time() + 1
+        ):
+            self.assertEqual(1, chart_manager.evict())
+
+        self.assertIsNone(chart_manager.find_by_uuid(uuid))
+        self.assertEqual([], os.listdir(self.directory.name))
+
+    def test_should_remove_partial_writes_on_scan(self):
+        partial = os.path.join(self.directory.name, f"{uuid4()}_24-01-01.svg.tmp")
+
+        with open(partial, "wb") as file:
+            _ = file.write(b"<svg")
+
+        self.assertEqual({"files": 0, "bytes": 0}, chart_manager.stats())
+        self.assertFalse(os.path.exists(partial))
@@ -1,7 +1,18 @@
+import asyncio
+import time
+from typing import Callable
 from unittest import TestCase
+from unittest.mock import patch
 
 from app import chart_service
+from app import render_cache
+from app import stats_cache
+from app.model.chart.chart_data_type import ChartDataType
+from app.model.chart.chart_request import ChartRequest
+from app.model.chart.chart_type import ChartType
+from app.model.wakatime.wakatime_data import WakatimeData
 from app.model.wakatime.wakatime_item import WakatimeItem
+from app.model.wakatime.wakatime_response import WakatimeResponse
 
 
 class ChartServiceTest(TestCase):
@@ -18,9 +29,6 @@ class ChartServiceTest(TestCase):
                 total_seconds=38576.259,
                 name="Java",
                 percent=39.35,
-                digital="10:42",
-                decimal="10.70",
-                text="10 hrs 42 mins",
                 minutes=42,
                 hours=10,
             ),
@@ -28,9 +36,6 @@ class ChartServiceTest(TestCase):
                 total_seconds=17150,
                 name="Python",
                 percent=17.5,
-                digital="4:45",
-                decimal="4.75",
-                text="4 hrs 45 mins",
                 minutes=45,
                 hours=4,
             ),
@@ -38,9 +43,6 @@ class ChartServiceTest(TestCase):
                 total_seconds=16847.673,
                 name="Other",
                 percent=17.24,
-                digital="4:39",
-                decimal="4.65",
-                text="4 hrs 39 mins",
                 minutes=39,
                 hours=4,
             ),
@@ -48,9 +50,6 @@ class ChartServiceTest(TestCase):
                 total_seconds=10638.081,
                 name="Vue.js",
                 percent=10.85,
-                digital="2:57",
-                decimal="2.95",
-                text="2 hrs 57 mins",
                 minutes=57,
                 hours=2,
             ),
@@ -58,9 +57,6 @@ class ChartServiceTest(TestCase):
                 total_seconds=2348,
                 name="Lua",
                 percent=2.4,
-                digital="0:39",
-                decimal="0.65",
-                text="39 mins",
                 minutes=39,
                 hours=0,
             ),
@@ -78,6 +74,94 @@ class ChartServiceTest(TestCase):
 
         self.assertEqual(expected, actual)
 
+    def test_should_group_and_hide_in_one_pass(self):
+        test_data = _get_test_data()
+        matcher = chart_service._get_matcher(  # type: ignore[all]
+            {"lua", "**.js"}, {"Markup": {"yaml", "mark**"}, "Jvm": {"java"}}
+        )
+
+        actual = chart_service._group_and_hide(test_data, matcher)  # type: ignore[all]
+
+        self.assertEqual(
+            ["Jvm", "Python", "Markup", "HTTP Request"],
+            [item.name for item in actual][:4],
+        )
+        self.assertNotIn("Lua", [item.name for item in actual])
+        self.assertNotIn("Vue.js", [item.name for item in actual])
+        self.assertEqual(_get_test_data(), test_data)
+
+    def test_should_hide_group_by_its_name(self):
+        matcher = chart_service._get_matcher(  # type: ignore[all]
+            {"markup"}, {"Markup": {"yaml", "markdown"}}
+        )
+
+        actual = chart_service._group_and_hide(_get_test_data(), matcher)  # type: ignore[all]
+
+        self.assertEqual(
+            [],
+            [item for item in actual if item.name in ("Markup", "YAML", "Markdown")],
+        )
+
+    def test_should_reuse_compiled_matchers(self):
+        first = chart_service._get_matcher({"lua", "java**"}, {"a": {"b**"}})  # type: ignore[all]
+        second = chart_service._get_matcher({"java**", "lua"}, {"a": {"b**"}})  # type: ignore[all]
+
+        self.assertIs(first, second)
+
+    def test_should_group_and_hide_linearly(self):
+        matcher = chart_service._get_matcher(  # type: ignore[all]
+            {f"hidden-{i}" for i in range(100)} | {"tmp-**", "**-old"},
+            {
+                f"group-{i}": {f"project-{i}-**", f"**-{i}-legacy", f"exact-{i}"}
+                for i in range(20)
+            },
+        )
+
+        small_data = _get_items(1_000)
+        large_data = _get_items(10_000)
+
+        small = _measure(lambda: chart_service._group_and_hide(small_data, matcher))  # type: ignore[all]
+        large = _measure(lambda: chart_service._group_and_hide(large_data, matcher))  # type: ignore[all]
+
+        # quadratic grouping would be ~100 times slower on 10 times more items
+        self.assertLess(large / small, 25)
+
+    def test_should_not_render_identical_request_twice(self):
+        render_cache.clear()
+        stats_cache.clear()
+        response = WakatimeResponse(
+            WakatimeData(projects=_get_test_data(), languages=[], editors=[])
+        )
+
+        with patch.object(
+            chart_service.stats_cache.wakatime_api_client,
+            "get_stats",
+            return_value=response,
+        ), patch.object(
+            chart_service,
+            "_render_chart",
+            wraps=chart_service._render_chart,  # type: ignore[all]
+        ) as render_chart:
+            first = asyncio.run(
+                chart_service.create_chart(
+                    ChartRequest(
+                        ChartType.PIE, ChartDataType.PROJECTS, "user", hide={"lua"}
+                    )
+                )
+            )
+            second = asyncio.run(
+                chart_service.create_chart(
+                    ChartRequest(
+                        ChartType.PIE, ChartDataType.PROJECTS, "user", hide={"lua"}
+                    )
+                )
+            )
+
+        assert first is not None and second is not None
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(1, render_chart.call_count)
+        self.assertEqual(1, render_cache.stats()["hits"])
+
 
 def _get_test_data() -> list[WakatimeItem]:
     test_data: list[WakatimeItem] = [
@@ -85,9 +169,6 @@ def _get_test_data() -> list[WakatimeItem]:
             total_seconds=38576.259,
             name="Java",
             percent=39.35,
-            digital="10:42",
-            decimal="10.70",
-            text="10 hrs 42 mins",
             minutes=42,
             hours=10,
         ),
@@ -95,9 +176,6 @@ def _get_test_data() -> list[WakatimeItem]:
             total_seconds=17150,
             name="Python",
             percent=17.5,
-            digital="4:45",
-            decimal="4.75",
-            text="4 hrs 45 mins",
             minutes=45,
             hours=4,
         ),
@@ -105,9 +183,6 @@ def _get_test_data() -> list[WakatimeItem]:
             total_seconds=10638.081,
             name="Vue.js",
             percent=10.85,
-            digital="2:57",
-            decimal="2.95",
-            text="2 hrs 57 mins",
             minutes=57,
             hours=2,
         ),
@@ -115,9 +190,6 @@ def _get_test_data() -> list[WakatimeItem]:
             total_seconds=5746.943,
             name="HTTP Request",
             percent=5.86,
-            digital="1:35",
-            decimal="1.58",
-            text="1 hrs 35 mins",
             minutes=35,
             hours=1,
         ),
@@ -125,9 +197,6 @@ def _get_test_data() -> list[WakatimeItem]:
             total_seconds=4533.516,
             name="YAML",
             percent=4.68,
-            digital="1:15",
-            decimal="1.25",
-            text="1 hrs 15 mins",
             minutes=15,
             hours=1,
         ),
@@ -135,9 +204,6 @@ def _get_test_data() -> list[WakatimeItem]:
             total_seconds=4326.793,
             name="Markdown",
             percent=4.41,
-            digital="1:12",
-            decimal="1.20",
-            text="1 hrs 12 mins",
             minutes=12,
             hours=1,
         ),
@@ -145,9 +211,6 @@ def _get_test_data() -> list[WakatimeItem]:
             total_seconds=2348,
             name="Lua",
             percent=2.4,
-            digital="0:39",
-            decimal="0.65",
-            text="39 mins",
             minutes=39,
             hours=0,
         ),
@@ -155,11 +218,35 @@ def _get_test_data() -> list[WakatimeItem]:
             total_seconds=2240.421,
             name="SQL",
             percent=2.29,
-            digital="0:37",
-            decimal="0.62",
-            text="37 mins",
             minutes=37,
             hours=0,
         ),
     ]
     return test_data
+
+
+def _get_items(count: int) -> list[WakatimeItem]:
+    names = ["project-{}-api", "tmp-{}", "{}-old", "hidden-{}", "exact-{}", "x-{}-legacy", "other-{}"]
+
+    return [
+        WakatimeItem(
+            total_seconds=float(i),
+            name=names[i % len(names)].format(i % 30),
+            percent=0.01,
+            hours=0,
+            minutes=1,
+        )
+        for i in range(count)
+    ]
+
+
+def _measure(function: Callable[[], object]) -> float:
+    function()
+
+    return min(_time(function) for _ in range(5))
+
+
+def _time(function: Callable[[], object]) -> float:
+    start = time.perf_counter()
+    function()
+    return time.perf_counter() - start
@@ -0,0 +1,34 @@
+import gzip
+from unittest import TestCase
+
+from app import compression
+
+
+class CompressionTest(TestCase):
+
+    def test_should_compress_deterministically(self):
+        content = b"<svg>" + b"<path/>" * 100 + b"</svg>"
+
+        encoded = compression.compress(content)
+
+        self.assertEqual(content, gzip.decompress(encoded["gzip"]))
+        self.assertLess(len(encoded["gzip"]), len(content))
+        self.assertEqual(encoded, compression.compress(content))
+        self.assertEqual(set(compression.ENCODINGS), set(encoded))
+
+    def test_should_negotiate_encoding(self):
+        for accept_encoding, expected in (
+            (None, None),
+            ("", None),
+            ("identity", None),
+            ("gzip, deflate, br", "br"),
+            ("gzip;q=1, br;q=0.5", "gzip"),
+            ("*", "br"),
+            ("*, br;q=0", "gzip"),
+            ("gzip;q=0", None),
+            ("deflate", None),
+        ):
+            with self.subTest(accept_encoding=accept_encoding):
+                self.assertEqual(
+                    expected, compression.negotiate(accept_encoding, ("br", "gzip"))
+                )
@@ -0,0 +1,47 @@
+import asyncio
+from unittest import TestCase
+from unittest.mock import patch
+
+from app import language_color_index
+
+
+class LanguageColorIndexTest(TestCase):
+
+    def test_should_build_case_folded_index(self):
+        languages_yml = """
+Python:
+  type: programming
+  color: "#3572A5"
+  language_id: 303
+Text:
+  type: prose
+  language_id: 372
+Vue:
+  type: markup
+  color: "#41b883"
+  language_id: 391
+"""
+        expected = {"python": "#3572A5", "vue": "#41b883"}
+
+        actual = language_color_index.build_index(languages_yml)
+
+        self.assertEqual(expected, actual)
+
+    def test_should_load_bundled_snapshot(self):
+        index = language_color_index._read_index(language_color_index.SNAPSHOT_PATH)  # type: ignore[all]
+
+        assert index is not None
+        self.assertEqual("#3572A5", index["colors"]["python"])
+
+    def test_should_read_missing_index_from_disk_once(self):
+        with patch.object(language_color_index, "_loaded", False), patch.object(
+            language_color_index, "_colors", {}
+        ), patch.object(language_color_index, "CACHE_PATH", "missing.json"), patch.object(
+            language_color_index, "SNAPSHOT_PATH", "missing.json"
+        ), patch.object(
+            language_color_index, "_read_index", return_value=None
+        ) as read_index:
+            for _ in range(3):
+                self.assertEqual({}, asyncio.run(language_color_index.get_colors()))
+
+        self.assertEqual(2, read_index.call_count)
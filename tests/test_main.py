@@ -0,0 +1,385 @@
+import json
+import os
+import tempfile
+from unittest import TestCase
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+
+from app import main
+from app import prewarm_scheduler
+from app import profiler
+from app import render_cache
+from app import stats_cache
+from app.exception.WakatimeRequestRejectedError import WakatimeRequestRejectedError
+from app.exception.WakatimeResponseMalformedError import WakatimeResponseMalformedError
+from app.exception.WakatimeUnavailableError import WakatimeUnavailableError
+from app.exception.WakatimeUserNotFoundError import WakatimeUserNotFoundError
+from app.model.chart.chart_format import ChartFormat
+from app.model.wakatime.stats_range import StatsRange
+from app.model.wakatime.wakatime_data import WakatimeData
+from app.model.wakatime.wakatime_response import WakatimeResponse
+from tests.test_chart_service import _get_test_data
+
+
+class MainTest(TestCase):
+
+    def setUp(self):
+        render_cache.clear()
+        stats_cache.clear()
+
+        response = WakatimeResponse(
+            WakatimeData(
+                projects=_get_test_data(),
+                languages=_get_test_data(),
+                editors=_get_test_data(),
+            )
+        )
+
+        self.patches = [
+            patch.object(
+                stats_cache.wakatime_api_client,
+                "get_stats",
+                return_value=response,
+            ),
+            patch.object(main.chart_service.render_pool, "CHART_RENDERER", "svg"),
+        ]
+
+        for p in self.patches:
+            _ = p.start()
+
+        self.client = TestClient(main.app)
+
+    def tearDown(self):
+        for p in self.patches:
+            p.stop()
+
+    def test_should_return_chart_with_validators(self):
+        response = self.client.get("/api/user/pie/projects?hide=lua")
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual("image/svg+xml", response.headers["Content-Type"])
+        self.assertTrue(response.headers["ETag"].startswith('"'))
+        self.assertIn("Last-Modified", response.headers)
+        self.assertIn("max-age=", response.headers["Cache-Control"])
+
+    def test_should_answer_matching_if_none_match_without_rendering(self):
+        etag = self.client.get("/api/user/pie/editors").headers["ETag"]
+
+        with patch.object(main.chart_service, "render_chart") as render_chart:
+            response = self.client.get(
+                "/api/user/pie/editors", headers={"If-None-Match": f"W/{etag}"}
+            )
+
+        self.assertEqual(304, response.status_code)
+        self.assertEqual(etag, response.headers["ETag"])
+        self.assertEqual(b"", response.content)
+        render_chart.assert_not_called()
+
+    def test_should_change_etag_with_style_parameters(self):
+        first = self.client.get("/api/user/pie/languages?width=420&height=215")
+        second = self.client.get("/api/user/pie/languages?width=640&height=215")
+
+        self.assertNotEqual(first.headers["ETag"], second.headers["ETag"])
+
+        response = self.client.get(
+            "/api/user/pie/languages?width=640&height=215",
+            headers={"If-None-Match": first.headers["ETag"]},
+        )
+
+        self.assertEqual(200, response.status_code)
+
+    def test_should_answer_if_modified_since(self):
+        last_modified = self.client.get("/api/user/pie/editors").headers["Last-Modified"]
+
+        response = self.client.get(
+            "/api/user/pie/editors", headers={"If-Modified-Since": last_modified}
+        )
+
+        self.assertEqual(304, response.status_code)
+
+    def test_should_expose_pipeline_metrics(self):
+        _ = self.client.get("/api/user/pie/projects")
+
+        response = self.client.get("/metrics")
+
+        self.assertEqual(200, response.status_code)
+        self.assertIn(
+            'chart_stage_seconds_count{chart_data="projects",stage="render"}',
+            response.text,
+        )
+        self.assertIn('cache_requests_total{cache="stats",result="miss"}', response.text)
+
+    def test_should_report_stage_timings(self):
+        response = self.client.get("/api/user/pie/languages?hide=java")
+
+        stages = [
+            timing.split(";")[0].strip()
+            for timing in response.headers["Server-Timing"].split(",")
+        ]
+
+        self.assertEqual(["fetch", "colors", "group_hide", "render", "compress"], stages)
+
+    def test_should_respond_with_profile_to_operators(self):
+        with patch.object(profiler, "PROFILING_TOKEN", "secret"):
+            profiled = self.client.get(
+                "/api/user/pie/projects", headers={"X-Profiling-Token": "secret"}
+            )
+            not_profiled = self.client.get(
+                "/api/user/pie/projects?profiling_token=wrong"
+            )
+
+        self.assertEqual(200, profiled.status_code)
+        self.assertTrue(profiled.headers["Content-Type"].startswith("text/plain"))
+        self.assertIn("render", profiled.headers["Server-Timing"])
+        self.assertEqual("image/svg+xml", not_profiled.headers["Content-Type"])
+
+    def test_should_profile_charts_rendered_by_render_workers(self):
+        with patch.object(profiler, "PROFILING_TOKEN", "secret"), patch.object(
+            main.chart_service.render_pool, "CHART_RENDERER", "matplotlib"
+        ), patch.object(main.chart_service.render_pool, "RENDER_WORKERS", 1), patch.object(
+            main.chart_service.render_pool, "_get_executor"
+        ) as get_executor:
+            response = self.client.get(
+                "/api/user/pie/projects", headers={"X-Profiling-Token": "secret"}
+            )
+
+        self.assertEqual(200, response.status_code)
+        self.assertIn("render_pie_chart", response.text)
+        get_executor.assert_not_called()
+
+    def test_should_render_bundle_from_one_wakatime_fetch(self):
+        response = self.client.get(
+            "/api/user/pie/bundle?sections=languages,projects,editors&width=420&height=215"
+        )
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual("image/svg+xml", response.headers["Content-Type"])
+        self.assertEqual(4, response.text.count("<svg "))
+        self.assertNotIn("base64", response.text)
+        self.assertIn('viewBox="0 0 420 645"', response.text)
+        self.assertEqual(
+            1, stats_cache.wakatime_api_client.get_stats.call_count  # type: ignore[all]
+        )
+
+    def test_should_serve_precompressed_bundle(self):
+        url = "/api/user/pie/bundle?sections=languages,editors"
+        plain = self.client.get(url, headers={"Accept-Encoding": "identity"})
+
+        with patch.object(main.bundle_builder, "compose_svg") as compose_svg:
+            compressed = self.client.get(url, headers={"Accept-Encoding": "gzip"})
+
+        compose_svg.assert_not_called()
+        self.assertEqual("gzip", compressed.headers["Content-Encoding"])
+        self.assertEqual("Accept-Encoding", compressed.headers["Vary"])
+        self.assertEqual(plain.headers["ETag"][:-1] + '-gzip"', compressed.headers["ETag"])
+        self.assertEqual(plain.content, compressed.content)
+
+    def test_should_apply_section_parameters_to_bundle(self):
+        response = self.client.get(
+            "/api/user/pie/bundle?sections=languages,projects&format=json"
+            "&projects.hide=java&projects.group=Other&projects.Other=python,vue.js"
+            "&languages.java=ff0000"
+        )
+
+        charts = response.json()
+
+        self.assertEqual(["languages", "projects"], list(charts))
+        self.assertIn("Java - 10h 42m", charts["languages"])
+        self.assertIn("#ff0000", charts["languages"])
+        self.assertNotIn("Java - 10h 42m", charts["projects"])
+        self.assertIn("Other - 7h 42m", charts["projects"])
+
+    def test_should_answer_bundle_if_none_match_without_rendering(self):
+        url = "/api/user/pie/bundle?sections=editors,languages"
+        etag = self.client.get(url).headers["ETag"]
+
+        with patch.object(main.chart_service, "render_chart") as render_chart:
+            response = self.client.get(url, headers={"If-None-Match": etag})
+
+        self.assertEqual(304, response.status_code)
+        render_chart.assert_not_called()
+
+    def test_should_render_requested_range_with_longer_cache_lifetime(self):
+        last_7_days = self.client.get("/api/user/pie/languages")
+        all_time = self.client.get("/api/user/pie/languages?range=all_time")
+
+        self.assertEqual(200, all_time.status_code)
+        self.assertEqual(
+            [StatsRange.LAST_7_DAYS, StatsRange.ALL_TIME],
+            [
+                call.args[1]
+                for call in stats_cache.wakatime_api_client.get_stats.call_args_list  # type: ignore[all]
+            ],
+        )
+        self.assertNotEqual(last_7_days.headers["ETag"], all_time.headers["ETag"])
+        self.assertGreater(
+            _max_age(all_time.headers["Cache-Control"]),
+            _max_age(last_7_days.headers["Cache-Control"]),
+        )
+        self.assertEqual(422, self.client.get("/api/user/pie/languages?range=yesterday").status_code)
+
+    def test_should_apply_range_to_every_bundle_section(self):
+        response = self.client.get("/api/user/pie/bundle?sections=languages,projects&range=last_year")
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(
+            [StatsRange.LAST_YEAR],
+            [
+                call.args[1]
+                for call in stats_cache.wakatime_api_client.get_stats.call_args_list  # type: ignore[all]
+            ],
+        )
+
+    def test_should_reject_unknown_bundle_section(self):
+        response = self.client.get("/api/user/pie/bundle?sections=languages,unknown")
+
+        self.assertEqual(400, response.status_code)
+
+    def test_should_answer_service_unavailable_while_wakatime_is_unavailable(self):
+        with patch.object(
+            stats_cache.wakatime_api_client,
+            "get_stats",
+            side_effect=WakatimeUnavailableError("Wakatime calls are throttled", 12.5),
+        ):
+            response = self.client.get("/api/user/pie/languages")
+
+        self.assertEqual(503, response.status_code)
+        self.assertEqual("13", response.headers["Retry-After"])
+
+    def test_should_answer_bad_gateway_without_retry_to_rejected_request(self):
+        with patch.object(
+            stats_cache.wakatime_api_client,
+            "get_stats",
+            side_effect=WakatimeRequestRejectedError("Wakatime answered 403 for user", 403),
+        ):
+            response = self.client.get("/api/user/pie/languages")
+
+        self.assertEqual(502, response.status_code)
+        self.assertNotIn("Retry-After", response.headers)
+
+    def test_should_answer_not_found_to_unknown_user(self):
+        with patch.object(
+            stats_cache.wakatime_api_client,
+            "get_stats",
+            side_effect=WakatimeUserNotFoundError("Wakatime user user wasn't found"),
+        ):
+            response = self.client.get("/api/user/pie/languages")
+
+        self.assertEqual(404, response.status_code)
+
+    def test_should_render_requested_format(self):
+        with patch.object(main.chart_service.render_pool, "RENDER_WORKERS", 0):
+            svg = self.client.get("/api/user/pie/languages")
+            png = self.client.get("/api/user/pie/languages?format=png")
+
+        self.assertEqual("image/png", png.headers["Content-Type"])
+        self.assertTrue(png.content.startswith(b"\x89PNG"))
+        self.assertEqual("Accept, Accept-Encoding", png.headers["Vary"])
+        self.assertNotIn("Content-Encoding", png.headers)
+        self.assertNotEqual(svg.headers["ETag"], png.headers["ETag"])
+
+    def test_should_serve_precompressed_chart(self):
+        with patch.object(
+            main.chart_service.compression,
+            "compress",
+            wraps=main.chart_service.compression.compress,
+        ) as compress:
+            identity = self.client.get(
+                "/api/user/pie/languages", headers={"Accept-Encoding": "identity"}
+            )
+            gzipped = [
+                self.client.get("/api/user/pie/languages", headers={"Accept-Encoding": "gzip"})
+                for _ in range(3)
+            ]
+
+        self.assertEqual(1, compress.call_count)
+        self.assertNotIn("Content-Encoding", identity.headers)
+
+        for response in gzipped:
+            self.assertEqual("gzip", response.headers["Content-Encoding"])
+            self.assertEqual(identity.content, response.content)
+            self.assertEqual(identity.headers["ETag"][:-1] + '-gzip"', response.headers["ETag"])
+            self.assertIn("Accept-Encoding", response.headers["Vary"])
+
+    def test_should_negotiate_format(self):
+        for accept, expected in (
+            (None, ChartFormat.SVG),
+            ("image/avif,image/webp,image/apng,image/svg+xml,image/*,*/*;q=0.8", ChartFormat.SVG),
+            ("image/webp,image/png;q=0.9", ChartFormat.WEBP),
+            ("image/*, image/svg+xml;q=0", ChartFormat.WEBP),
+            ("image/png", ChartFormat.PNG),
+            ("text/html", ChartFormat.SVG),
+        ):
+            with self.subTest(accept=accept):
+                self.assertEqual(expected, main._negotiate_format(accept, None))
+
+        self.assertEqual(ChartFormat.PNG, main._negotiate_format("image/svg+xml", ChartFormat.PNG))
+
+    def test_should_answer_bad_gateway_to_malformed_stats(self):
+        with patch.object(
+            stats_cache.wakatime_api_client,
+            "get_stats",
+            side_effect=WakatimeResponseMalformedError("response.data is missing"),
+        ):
+            response = self.client.get("/api/user/pie/languages")
+
+        self.assertEqual(502, response.status_code)
+
+    def test_should_pin_configured_charts_as_requested_by_endpoints(self):
+        prewarm_scheduler.clear()
+        url = "/api/user/pie/projects?hide=lua&group=Other&Other=yaml,sql&java=ff0000&width=420&height=215&range=last_30_days"
+
+        with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as config:
+            json.dump(
+                [
+                    url,
+                    "/api/user/pie/unknown",
+                    "/api/user/pie/languages?width=wide",
+                    "/api/user/pie/languages?range=last_century",
+                    42,
+                ],
+                config,
+            )
+
+        try:
+            prewarm_scheduler.pin(main._read_prewarm_config(config.name))  # type: ignore[all]
+        finally:
+            os.remove(config.name)
+
+        _ = self.client.get(url)
+
+        entries = list(prewarm_scheduler._entries.values())  # type: ignore[all]
+
+        self.assertEqual(1, len(entries))
+        self.assertTrue(entries[0].pinned)
+        self.assertGreater(entries[0].rate, 0)
+
+    def test_should_ignore_pre_warm_config_that_is_not_a_list(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as config:
+            json.dump({"urls": ["/api/user/pie/languages"]}, config)
+
+        try:
+            self.assertEqual([], main._read_prewarm_config(config.name))  # type: ignore[all]
+        finally:
+            os.remove(config.name)
+
+    def test_should_not_keep_failed_charts_warm(self):
+        prewarm_scheduler.clear()
+
+        with patch.object(
+            stats_cache.wakatime_api_client,
+            "get_stats",
+            side_effect=WakatimeUserNotFoundError("unknown"),
+        ):
+            response = self.client.get("/api/unknown/pie/languages")
+
+        self.assertEqual(404, response.status_code)
+        self.assertEqual({}, prewarm_scheduler._entries)  # type: ignore[all]
+
+
+def _max_age(cache_control: str) -> int:
+    directives = dict(
+        directive.strip().partition("=")[::2] for directive in cache_control.split(",")
+    )
+    return int(directives["max-age"])
@@ -0,0 +1,43 @@
+import asyncio
+from unittest import TestCase
+from unittest.mock import patch
+
+import httpx
+
+from app import metrics
+from app import render_cache
+from app.client import http_client
+
+
+class MetricsTest(TestCase):
+
+    def test_should_count_upstream_requests_by_client_and_status(self):
+        transport = httpx.MockTransport(lambda _: httpx.Response(404))
+        before = _sample("upstream_requests_total", client="test", status="404")
+
+        with patch.object(http_client, "_client", httpx.AsyncClient(transport=transport)):
+            response = asyncio.run(http_client.get("test", "https://upstream.test/"))
+
+        self.assertEqual(404, response.status_code)
+        self.assertEqual(
+            before + 1, _sample("upstream_requests_total", client="test", status="404")
+        )
+        self.assertLess(0, _sample("upstream_request_seconds_count", client="test"))
+
+    def test_should_export_cache_counters_at_scrape_time(self):
+        render_cache.clear()
+        render_cache.put("key", b"<svg/>")
+        _ = render_cache.get("key")
+        _ = render_cache.get("missing")
+
+        exported = metrics.export().decode()
+
+        self.assertIn('cache_requests_total{cache="render",result="hit"} 1.0', exported)
+        self.assertIn('cache_requests_total{cache="render",result="miss"} 1.0', exported)
+        self.assertIn('cache_entries{cache="render"} 1.0', exported)
+        self.assertIn("render_queue_depth 0.0", exported)
+
+
+def _sample(name: str, **labels: str) -> float:
+    value = metrics.REGISTRY.get_sample_value(name, labels)
+    return 0.0 if value is None else value
@@ -0,0 +1,162 @@
+import time
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import patch
+
+from app import prewarm_scheduler
+from app import render_cache
+from app import render_pool
+from app import stats_cache
+from app.model.chart.chart_data_type import ChartDataType
+from app.model.chart.chart_request import ChartRequest
+from app.model.chart.chart_type import ChartType
+from app.model.wakatime.stats_range import StatsRange
+from app.model.wakatime.wakatime_data import WakatimeData
+from app.model.wakatime.wakatime_response import WakatimeResponse
+from tests.test_chart_service import _get_test_data
+
+
+class PrewarmSchedulerTest(IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        prewarm_scheduler.clear()
+        render_cache.clear()
+        stats_cache.clear()
+
+    def test_should_refresh_popular_charts_more_often(self):
+        hot = prewarm_scheduler.refresh_interval(prewarm_scheduler.HOT_RATE)
+        warm = prewarm_scheduler.refresh_interval(prewarm_scheduler.HOT_RATE / 4)
+        cold = prewarm_scheduler.refresh_interval(1)
+
+        self.assertEqual(prewarm_scheduler.MIN_INTERVAL_SECONDS, hot)
+        self.assertAlmostEqual(hot * 4, warm)
+        self.assertEqual(prewarm_scheduler.MAX_INTERVAL_SECONDS, cold)
+
+    def test_should_refresh_long_ranges_less_often(self):
+        last_7_days = prewarm_scheduler.refresh_interval(prewarm_scheduler.HOT_RATE)
+        all_time = prewarm_scheduler.refresh_interval(prewarm_scheduler.HOT_RATE, StatsRange.ALL_TIME)
+
+        self.assertAlmostEqual(
+            stats_cache.RANGE_TTL_SECONDS[StatsRange.ALL_TIME] / stats_cache.TTL_SECONDS,
+            all_time / last_7_days,
+        )
+
+    def test_should_count_equal_requests_as_one_chart(self):
+        for _ in range(3):
+            prewarm_scheduler.record(_request(ChartDataType.EDITORS, hide={"vim"}))
+
+        prewarm_scheduler.record(_request(ChartDataType.EDITORS))
+
+        rates = sorted(entry.rate for entry in prewarm_scheduler._entries.values())  # type: ignore[all]
+
+        self.assertEqual(2, len(rates))
+        self.assertAlmostEqual(1, rates[0], places=3)
+        self.assertAlmostEqual(3, rates[1], places=3)
+
+    async def test_should_refresh_stats_once_and_render_due_charts(self):
+        _record_hot(_request(ChartDataType.EDITORS))
+        _record_hot(_request(ChartDataType.PROJECTS, hide={"java"}))
+
+        with patch.object(
+            stats_cache.wakatime_api_client, "get_stats", return_value=_response()
+        ) as get_stats, patch.object(render_pool, "CHART_RENDERER", "svg"):
+            refreshed = await prewarm_scheduler.refresh_due(
+                time.time() + prewarm_scheduler.MIN_INTERVAL_SECONDS
+            )
+
+        self.assertEqual(2, refreshed)
+        self.assertEqual(1, get_stats.call_count)
+        self.assertEqual(2, render_cache.stats()["entries"])
+
+    async def test_should_refresh_stats_of_each_range_of_due_charts(self):
+        _record_hot(_request(ChartDataType.EDITORS))
+        _record_hot(_request(ChartDataType.EDITORS, stats_range=StatsRange.ALL_TIME))
+
+        with patch.object(
+            stats_cache.wakatime_api_client, "get_stats", return_value=_response()
+        ) as get_stats, patch.object(render_pool, "CHART_RENDERER", "svg"):
+            refreshed = await prewarm_scheduler.refresh_due(
+                time.time() + prewarm_scheduler.MIN_INTERVAL_SECONDS
+            )
+
+        # the all time chart isn't due before its stats become stale
+        self.assertEqual(1, refreshed)
+        self.assertEqual(StatsRange.LAST_7_DAYS, get_stats.call_args.args[1])
+
+    async def test_should_not_refresh_rarely_requested_charts(self):
+        prewarm_scheduler.record(_request(ChartDataType.EDITORS))
+
+        with patch.object(
+            stats_cache.wakatime_api_client, "get_stats", return_value=_response()
+        ) as get_stats, patch.object(render_pool, "CHART_RENDERER", "svg"):
+            refreshed = await prewarm_scheduler.refresh_due(
+                time.time() + prewarm_scheduler.MAX_INTERVAL_SECONDS
+            )
+
+        self.assertEqual(0, refreshed)
+        self.assertEqual(0, get_stats.call_count)
+
+    async def test_should_render_pinned_charts_from_fresh_stats_without_fetching(self):
+        prewarm_scheduler.pin([_request(ChartDataType.EDITORS)])
+
+        with patch.object(
+            stats_cache.wakatime_api_client, "get_stats", return_value=_response()
+        ) as get_stats, patch.object(render_pool, "CHART_RENDERER", "svg"):
+            _ = await stats_cache.get_stats("user")
+            refreshed = await prewarm_scheduler.refresh_due()
+
+        self.assertEqual(1, refreshed)
+        self.assertEqual(1, get_stats.call_count)
+        self.assertEqual(1, render_cache.stats()["entries"])
+
+    async def test_should_not_count_refreshes_as_cache_hits(self):
+        prewarm_scheduler.pin([_request(ChartDataType.EDITORS)])
+
+        with patch.object(
+            stats_cache.wakatime_api_client, "get_stats", return_value=_response()
+        ), patch.object(render_pool, "CHART_RENDERER", "svg"):
+            _ = await stats_cache.get_stats("user")
+
+            for _ in range(2):
+                _ = await prewarm_scheduler.refresh_due()
+
+        self.assertEqual(0, stats_cache.stats()["hits"])
+        self.assertEqual(1, stats_cache.stats()["misses"])
+        self.assertEqual(0, render_cache.stats()["hits"])
+        self.assertEqual(0, render_cache.stats()["misses"])
+
+    async def test_should_forget_charts_that_are_no_longer_requested(self):
+        prewarm_scheduler.record(_request(ChartDataType.EDITORS))
+        prewarm_scheduler.pin([_request(ChartDataType.LANGUAGES)])
+
+        with patch.object(
+            stats_cache.wakatime_api_client, "get_stats", return_value=_response()
+        ), patch.object(render_pool, "CHART_RENDERER", "svg"):
+            _ = await prewarm_scheduler.refresh_due(
+                time.time() + 2 * prewarm_scheduler.RATE_HALF_LIFE_SECONDS
+            )
+
+        self.assertEqual(
+            [ChartDataType.LANGUAGES],
+            [entry.request.chart_data for entry in prewarm_scheduler._entries.values()],  # type: ignore[all]
+        )
+
+
+def _request(
+    chart_data: ChartDataType,
+    hide: set[str] | None = None,
+    stats_range: StatsRange = StatsRange.LAST_7_DAYS,
+) -> ChartRequest:
+    return ChartRequest(ChartType.PIE, chart_data, "user", hide=hide, stats_range=stats_range)
+
+
+def _record_hot(chart_request: ChartRequest) -> None:
+    for _ in range(int(prewarm_scheduler.HOT_RATE)):
+        prewarm_scheduler.record(chart_request)
+
+
+def _response() -> WakatimeResponse:
+    return WakatimeResponse(
+        WakatimeData(
+            projects=_get_test_data(), languages=_get_test_data(), editors=_get_test_data()
+        )
+    )
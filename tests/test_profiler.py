@@ -0,0 +1,32 @@
+import time
+from unittest import TestCase
+from unittest.mock import patch
+
+from app import profiler
+
+
+class ProfilerTest(TestCase):
+
+    def test_should_sample_stacks_of_profiled_block(self):
+        with profiler.profile() as stacks:
+            _busy_wait(0.1)
+
+        collapsed = profiler.to_collapsed(stacks)
+
+        self.assertIn("_busy_wait", collapsed)
+        self.assertTrue(collapsed.splitlines()[0].rsplit(" ", 1)[1].isdigit())
+
+    def test_should_authorize_only_configured_token(self):
+        self.assertFalse(profiler.is_authorized("secret"))
+
+        with patch.object(profiler, "PROFILING_TOKEN", "secret"):
+            self.assertTrue(profiler.is_authorized("secret"))
+            self.assertFalse(profiler.is_authorized("wrong"))
+            self.assertFalse(profiler.is_authorized(None))
+
+
+def _busy_wait(seconds: float) -> None:
+    deadline = time.perf_counter() + seconds
+
+    while time.perf_counter() < deadline:
+        pass
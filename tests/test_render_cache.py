@@ -0,0 +1,41 @@
+from unittest import TestCase
+from unittest.mock import patch
+
+from app import render_cache
+
+
+class RenderCacheTest(TestCase):
+
+    def setUp(self):
+        render_cache.clear()
+
+    def test_should_count_hits_and_misses(self):
+        render_cache.put("a", b"<svg/>")
+
+        self.assertEqual(b"<svg/>", render_cache.get("a"))
+        self.assertIsNone(render_cache.get("b"))
+        self.assertEqual({"hits": 1, "misses": 1, "entries": 1}, render_cache.stats())
+
+    def test_should_store_compressed_variants_with_chart(self):
+        render_cache.put("a", b"<svg/>", {"gzip": b"gz"})
+
+        cached_render = render_cache.get_render("a")
+
+        assert cached_render is not None
+        self.assertEqual(b"<svg/>", cached_render.content)
+        self.assertEqual({"gzip": b"gz"}, cached_render.encoded)
+
+        render_cache.put("b", b"<svg/>")
+
+        self.assertEqual({}, getattr(render_cache.get_render("b"), "encoded", None))
+
+    def test_should_evict_least_recently_used(self):
+        with patch.object(render_cache, "MAX_ENTRIES", 2):
+            render_cache.put("a", b"a")
+            render_cache.put("b", b"b")
+            _ = render_cache.get("a")
+            render_cache.put("c", b"c")
+
+        self.assertIsNone(render_cache.get("b"))
+        self.assertEqual(b"a", render_cache.get("a"))
+        self.assertEqual(b"c", render_cache.get("c"))
@@ -0,0 +1,73 @@
+import os
+import signal
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import patch
+
+from app import render_pool
+from app.exception.RenderQueueFullError import RenderQueueFullError
+from app.model.chart.chart_format import ChartFormat
+from app.model.chart.chart_type import ChartType
+from app.model.wakatime.wakatime_item import WakatimeItem
+
+
+class RenderPoolTest(IsolatedAsyncioTestCase):
+
+    async def asyncTearDown(self):
+        render_pool.shutdown()
+
+    async def test_should_render_in_worker_process(self):
+        with patch.object(render_pool, "CHART_RENDERER", "matplotlib"), patch.object(
+            render_pool, "RENDER_WORKERS", 1
+        ):
+            content = await render_pool.render(
+                ChartType.PIE, [_item("Python")], None, 215, 420
+            )
+
+        self.assertTrue(content.startswith(b"<?xml"))
+        self.assertIn(b"<svg", content)
+        self.assertEqual(0, render_pool.queue_depth())
+
+    async def test_should_reject_renders_above_queue_size(self):
+        with patch.object(render_pool, "CHART_RENDERER", "matplotlib"), patch.object(
+            render_pool, "RENDER_QUEUE_SIZE", 0
+        ):
+            with self.assertRaises(RenderQueueFullError):
+                _ = await render_pool.render(ChartType.PIE, [], None, None, None)
+
+    async def test_should_render_on_new_workers_after_worker_died(self):
+        with patch.object(render_pool, "CHART_RENDERER", "matplotlib"), patch.object(
+            render_pool, "RENDER_WORKERS", 1
+        ):
+            await render_pool.start()
+            broken = render_pool._get_executor()  # type: ignore[all]
+
+            for pid in list(broken._processes):  # type: ignore[all]
+                os.kill(pid, signal.SIGKILL)
+
+            content = await render_pool.render(
+                ChartType.PIE, [_item("Python")], None, 215, 420
+            )
+
+        self.assertIn(b"<svg", content)
+        self.assertIsNot(broken, render_pool._get_executor())  # type: ignore[all]
+        self.assertEqual(0, render_pool.queue_depth())
+
+    async def test_should_render_raster_formats_with_matplotlib(self):
+        with patch.object(render_pool, "CHART_RENDERER", "svg"), patch.object(
+            render_pool, "RENDER_WORKERS", 0
+        ):
+            content = await render_pool.render(
+                ChartType.PIE, [_item("Python")], None, 215, 420, ChartFormat.PNG
+            )
+
+        self.assertTrue(content.startswith(b"\x89PNG"))
+
+
+def _item(name: str) -> WakatimeItem:
+    return WakatimeItem(
+        total_seconds=3600,
+        name=name,
+        percent=100,
+        hours=1,
+        minutes=0,
+    )
@@ -0,0 +1,68 @@
+import time
+from email.utils import formatdate
+from unittest import TestCase
+from unittest.mock import patch
+
+from app.client import resilience
+from app.client.resilience import CircuitBreaker, TokenBucket
+
+
+class ResilienceTest(TestCase):
+
+    def test_should_limit_rate_after_burst(self):
+        bucket = TokenBucket(rate=10, capacity=2)
+
+        self.assertEqual(0, bucket.reserve(max_wait=0))
+        self.assertEqual(0, bucket.reserve(max_wait=0))
+        self.assertIsNone(bucket.reserve(max_wait=0))
+        self.assertAlmostEqual(0.1, bucket.reserve(max_wait=1), delta=0.01)
+
+    def test_should_not_limit_without_rate(self):
+        bucket = TokenBucket(rate=0, capacity=0)
+
+        self.assertTrue(all(bucket.reserve(max_wait=0) == 0 for _ in range(100)))
+
+    def test_should_allow_single_trial_call_after_reset_time(self):
+        breaker = CircuitBreaker(failure_threshold=2, reset_seconds=10)
+        now = time.monotonic()
+
+        breaker.record_failure()
+        self.assertTrue(breaker.allow())
+        breaker.record_failure()
+        self.assertFalse(breaker.allow())
+
+        with patch.object(resilience.time, "monotonic", return_value=now + 11):
+            self.assertTrue(breaker.allow())
+            self.assertFalse(breaker.allow())
+
+            breaker.record_failure()
+            self.assertFalse(breaker.allow())
+
+        with patch.object(resilience.time, "monotonic", return_value=now + 22):
+            self.assertTrue(breaker.allow())
+            breaker.record_success()
+
+        self.assertFalse(breaker.is_open())
+        self.assertTrue(breaker.allow())
+
+    def test_should_allow_another_trial_call_after_release(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_seconds=10)
+        now = time.monotonic()
+
+        breaker.record_failure()
+
+        with patch.object(resilience.time, "monotonic", return_value=now + 11):
+            self.assertTrue(breaker.allow())
+            breaker.release()
+            self.assertTrue(breaker.allow())
+
+        self.assertTrue(breaker.is_open())
+        self.assertEqual(1, breaker.failures)
+
+    def test_should_parse_retry_after(self):
+        self.assertEqual(120, resilience.parse_retry_after("120"))
+        self.assertAlmostEqual(
+            60, resilience.parse_retry_after(formatdate(time.time() + 60, usegmt=True)), delta=2
+        )
+        self.assertIsNone(resilience.parse_retry_after("soon"))
+        self.assertIsNone(resilience.parse_retry_after(None))
@@ -0,0 +1,24 @@
+import subprocess
+import sys
+from unittest import TestCase
+
+# imported lazily by the chart builders and the language color index, never by the API process at import time
+HEAVY_MODULES: list[str] = ["matplotlib", "numpy", "ruamel.yaml", "PIL"]
+
+
+class StartupTest(TestCase):
+
+    def test_should_not_import_heavy_modules_with_app(self):
+        result = subprocess.run(
+            [
+                sys.executable,
+                "-c",
+                "import sys, app.main; "
+                f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))",
+            ],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+
+        self.assertEqual("", result.stdout.strip())
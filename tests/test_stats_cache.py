@@ -0,0 +1,146 @@
+import asyncio
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import patch
+
+from app import stats_cache
+from app.exception.WakatimeUnavailableError import WakatimeUnavailableError
+from app.model.wakatime.stats_range import StatsRange
+from app.model.wakatime.wakatime_data import WakatimeData
+from app.model.wakatime.wakatime_response import WakatimeResponse
+
+
+class StatsCacheTest(IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        stats_cache.clear()
+
+    async def test_should_collapse_concurrent_misses_into_one_fetch(self):
+        calls: list[str] = []
+
+        async def slow_fetch(username: str, _: StatsRange) -> WakatimeResponse:
+            calls.append(username)
+            await asyncio.sleep(0.05)
+            return _response()
+
+        with patch.object(
+            stats_cache.wakatime_api_client, "get_stats", side_effect=slow_fetch
+        ):
+            results = await asyncio.gather(
+                *(stats_cache.get_stats("user") for _ in range(8))
+            )
+
+        self.assertEqual(1, len(calls))
+        self.assertEqual(8, len(results))
+        self.assertTrue(all(result is results[0] for result in results))
+        self.assertGreater(results[0].fetched_at, 0)
+
+    async def test_should_serve_stale_stats_while_refreshing(self):
+        stale = _response()
+        fresh = _response()
+        refreshed = asyncio.Event()
+
+        async def fetch(*_: object) -> WakatimeResponse:
+            await refreshed.wait()
+            return fresh
+
+        with patch.object(
+            stats_cache.wakatime_api_client, "get_stats", return_value=stale
+        ):
+            _ = await stats_cache.get_stats("user")
+
+        with patch.object(stats_cache, "TTL_SECONDS", 0), patch.object(
+            stats_cache.wakatime_api_client, "get_stats", side_effect=fetch
+        ) as get_stats:
+            self.assertIs(stale, (await stats_cache.get_stats("user")).response)
+            self.assertIs(stale, (await stats_cache.get_stats("user")).response)
+
+            refreshed.set()
+            await asyncio.sleep(0.01)
+
+            self.assertEqual(1, get_stats.call_count)
+
+        self.assertIs(fresh, (await stats_cache.get_stats("user")).response)
+
+    async def test_should_cache_ranges_separately_with_their_own_ttls(self):
+        with patch.object(stats_cache, "TTL_SECONDS", 0), patch.object(
+            stats_cache.wakatime_api_client, "get_stats", return_value=_response()
+        ) as get_stats:
+            for _ in range(2):
+                _ = await stats_cache.get_stats("user")
+                _ = await stats_cache.get_stats("user", StatsRange.ALL_TIME)
+                await asyncio.sleep(0)
+
+        self.assertEqual(
+            [StatsRange.LAST_7_DAYS, StatsRange.ALL_TIME, StatsRange.LAST_7_DAYS],
+            [call.args[1] for call in get_stats.call_args_list],
+        )
+        self.assertEqual({"hits": 1, "stale_hits": 1, "misses": 2, "snapshots_loaded": 0, "entries": 2}, stats_cache.stats())
+
+    def test_should_scale_ttls_of_all_ranges_by_user_override(self):
+        with patch.object(stats_cache, "TTL_OVERRIDES", {"busy": stats_cache.TTL_SECONDS / 2}):
+            self.assertEqual(stats_cache.TTL_SECONDS / 2, stats_cache.ttl("Busy"))
+            self.assertEqual(
+                stats_cache.RANGE_TTL_SECONDS[StatsRange.ALL_TIME] / 2,
+                stats_cache.ttl("Busy", StatsRange.ALL_TIME),
+            )
+            self.assertEqual(
+                stats_cache.RANGE_TTL_SECONDS[StatsRange.ALL_TIME],
+                stats_cache.ttl("other", StatsRange.ALL_TIME),
+            )
+
+    async def test_should_keep_serving_last_known_good_stats_while_wakatime_is_unavailable(self):
+        stale = _response()
+
+        with patch.object(
+            stats_cache.wakatime_api_client, "get_stats", return_value=stale
+        ):
+            _ = await stats_cache.get_stats("user")
+
+        with patch.object(stats_cache, "TTL_SECONDS", 0), patch.object(
+            stats_cache.wakatime_api_client,
+            "get_stats",
+            side_effect=WakatimeUnavailableError("Wakatime calls are throttled", 30),
+        ):
+            for _ in range(3):
+                self.assertIs(stale, (await stats_cache.get_stats("user")).response)
+                await asyncio.sleep(0)
+
+            with self.assertRaises(WakatimeUnavailableError):
+                _ = await stats_cache.get_stats("other")
+
+    async def test_should_evict_least_recently_used_stats(self):
+        with patch.object(stats_cache, "MAX_ENTRIES", 2), patch.object(
+            stats_cache.wakatime_api_client, "get_stats", return_value=_response()
+        ) as get_stats:
+            _ = await stats_cache.get_stats("first")
+            _ = await stats_cache.get_stats("second")
+            _ = await stats_cache.get_stats("first")
+            _ = await stats_cache.get_stats("third")
+            _ = await stats_cache.get_stats("first")
+
+        self.assertEqual(3, get_stats.call_count)
+        self.assertEqual(2, stats_cache.stats()["entries"])
+        self.assertEqual(0.0, stats_cache.fresh_until("second"))
+
+    async def test_should_not_fill_cleared_cache_with_pending_fetch(self):
+        fetched = asyncio.Event()
+
+        async def fetch(*_: object) -> WakatimeResponse:
+            await fetched.wait()
+            return _response()
+
+        with patch.object(stats_cache.wakatime_api_client, "get_stats", side_effect=fetch):
+            request = asyncio.create_task(stats_cache.get_stats("user"))
+            await asyncio.sleep(0)
+
+            stats_cache.clear()
+            fetched.set()
+
+            with self.assertRaises(asyncio.CancelledError):
+                _ = await request
+
+        self.assertEqual(0, stats_cache.stats()["entries"])
+
+
+def _response() -> WakatimeResponse:
+    return WakatimeResponse(WakatimeData(projects=[], languages=[], editors=[]))
@@ -0,0 +1,124 @@
+import asyncio
+import os
+import tempfile
+import threading
+import time
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import patch
+
+import orjson
+
+from app import stats_cache
+from app import stats_snapshot_store
+from app.model.wakatime.cached_wakatime_response import CachedWakatimeResponse
+from app.model.wakatime.stats_range import StatsRange
+from app.model.wakatime.wakatime_data import WakatimeData
+from app.model.wakatime.wakatime_response import WakatimeResponse
+from tests.test_chart_service import _get_test_data
+
+
+class StatsSnapshotStoreTest(IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.patches = [
+            patch.object(
+                stats_snapshot_store, "PATH", os.path.join(self.directory.name, "stats.sqlite3")
+            ),
+            patch.object(stats_snapshot_store, "ENABLED", True),
+        ]
+
+        for p in self.patches:
+            _ = p.start()
+
+        stats_snapshot_store.close()
+        stats_cache.clear()
+
+    def tearDown(self):
+        stats_snapshot_store.close()
+        stats_cache.clear()
+
+        for p in self.patches:
+            p.stop()
+
+        self.directory.cleanup()
+
+    def test_should_load_saved_snapshots_compactly(self):
+        response = _response()
+        stats_snapshot_store.save("user", StatsRange.ALL_TIME, CachedWakatimeResponse(response, 1000))
+        stats_snapshot_store.close()
+
+        [(username, stats_range, entry)] = stats_snapshot_store.load_all(now=2000)
+
+        self.assertEqual(("user", StatsRange.ALL_TIME, 1000), (username, stats_range, entry.fetched_at))
+        self.assertEqual(response, entry.response)
+        self.assertLess(
+            len(stats_snapshot_store._encode(response.data)),  # type: ignore[all]
+            len(orjson.dumps(response.data)) / 4,
+        )
+
+    def test_should_drop_expired_and_unreadable_snapshots(self):
+        stats_snapshot_store.save("old", StatsRange.LAST_7_DAYS, CachedWakatimeResponse(_response(), 0))
+        stats_snapshot_store.save("broken", StatsRange.LAST_7_DAYS, CachedWakatimeResponse(_response(), 1000))
+        stats_snapshot_store.save("user", StatsRange.LAST_7_DAYS, CachedWakatimeResponse(_response(), 1000))
+
+        with stats_snapshot_store._database.connect(stats_snapshot_store.PATH) as connection:  # type: ignore[all]
+            _ = connection.execute(
+                "UPDATE snapshots SET payload = ? WHERE username = 'broken'", (b"not zlib",)
+            )
+
+        snapshots = stats_snapshot_store.load_all(now=stats_snapshot_store.MAX_AGE_SECONDS + 500)
+
+        self.assertEqual(["user"], [username for username, _, _ in snapshots])
+
+    async def test_should_serve_snapshots_after_restart_while_refreshing(self):
+        before_restart = _response()
+        after_restart = WakatimeResponse(WakatimeData([], [], []))
+
+        with patch.object(
+            stats_cache.wakatime_api_client, "get_stats", return_value=before_restart
+        ):
+            _ = await stats_cache.get_stats("User", StatsRange.LAST_30_DAYS)
+
+        await stats_cache.wait_for_snapshots()
+
+        # a restart loses everything kept in memory
+        stats_cache.clear()
+        stats_snapshot_store.close()
+
+        self.assertEqual(1, await stats_cache.load_snapshots())
+
+        with patch.object(stats_cache, "RANGE_TTL_SECONDS", {StatsRange.LAST_30_DAYS: 0}), patch.object(
+            stats_cache.wakatime_api_client, "get_stats", return_value=after_restart
+        ) as get_stats:
+            served = await stats_cache.get_stats("user", StatsRange.LAST_30_DAYS)
+            await asyncio.sleep(0.05)
+
+        self.assertEqual(before_restart, served.response)
+        self.assertEqual(1, get_stats.call_count)
+        self.assertEqual(0, stats_cache.stats()["misses"])
+        self.assertEqual(after_restart, (await stats_cache.get_stats("user", StatsRange.LAST_30_DAYS)).response)
+
+    async def test_should_not_wait_for_snapshot_writes(self):
+        written = threading.Event()
+
+        def slow_save(*_: object) -> None:
+            _ = written.wait(1)
+
+        with patch.object(stats_snapshot_store, "save", side_effect=slow_save), patch.object(
+            stats_cache.wakatime_api_client, "get_stats", return_value=_response()
+        ):
+            start = time.monotonic()
+            _ = await stats_cache.get_stats("user")
+            elapsed = time.monotonic() - start
+
+            written.set()
+            await stats_cache.wait_for_snapshots()
+
+        self.assertLess(elapsed, 0.5)
+
+
+def _response() -> WakatimeResponse:
+    return WakatimeResponse(
+        WakatimeData(projects=_get_test_data(), languages=_get_test_data(), editors=[])
+    )
@@ -0,0 +1,138 @@
+import os
+import tempfile
+from datetime import date, timedelta
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import patch
+
+from app import stats_cache
+from app import summary_store
+from app.model.wakatime.stats_range import StatsRange
+from app.model.wakatime.wakatime_daily_summary import WakatimeDailySummary
+from app.model.wakatime.wakatime_data import WakatimeData
+from app.model.wakatime.wakatime_item import WakatimeItem
+from app.model.wakatime.wakatime_response import WakatimeResponse
+
+TODAY: date = date(2024, 5, 31)
+
+
+class SummaryStoreTest(IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.patches = [
+            patch.object(summary_store, "PATH", os.path.join(self.directory.name, "summaries.sqlite3")),
+            patch.object(summary_store, "ENABLED", True),
+        ]
+
+        for p in self.patches:
+            _ = p.start()
+
+        summary_store.close()
+        stats_cache.clear()
+
+    def tearDown(self):
+        summary_store.close()
+
+        for p in self.patches:
+            p.stop()
+
+        self.directory.cleanup()
+
+    async def test_should_fetch_only_missing_and_mutable_days(self):
+        with patch.object(
+            summary_store.wakatime_api_client, "get_summaries", side_effect=_get_summaries
+        ) as get_summaries:
+            _ = await summary_store.get_stats("user", StatsRange.LAST_7_DAYS, TODAY)
+            _ = await summary_store.get_stats("user", StatsRange.LAST_7_DAYS, TODAY)
+            _ = await summary_store.get_stats("user", StatsRange.LAST_7_DAYS, TODAY + timedelta(days=1))
+            _ = await summary_store.get_stats("user", StatsRange.LAST_30_DAYS, TODAY + timedelta(days=1))
+
+        self.assertEqual(
+            [
+                ("user", date(2024, 5, 25), date(2024, 5, 31)),
+                ("user", date(2024, 5, 30), date(2024, 5, 31)),
+                ("user", date(2024, 5, 31), date(2024, 6, 1)),
+                ("user", date(2024, 5, 3), date(2024, 5, 24)),
+                ("user", date(2024, 5, 31), date(2024, 6, 1)),
+            ],
+            [call.args for call in get_summaries.call_args_list],
+        )
+
+    async def test_should_sum_range_from_stored_days(self):
+        with patch.object(
+            summary_store.wakatime_api_client, "get_summaries", side_effect=_get_summaries
+        ):
+            response = await summary_store.get_stats("user", StatsRange.LAST_7_DAYS, TODAY)
+
+        # every day has 1 hour of wakatime-pie, and odd days have 30 more minutes of Python
+        self.assertEqual(
+            [
+                WakatimeItem(
+                    total_seconds=7 * 3600,
+                    name="wakatime-pie",
+                    percent=77.78,
+                    hours=7,
+                    minutes=0,
+                ),
+                WakatimeItem(
+                    total_seconds=4 * 1800,
+                    name="Python",
+                    percent=22.22,
+                    hours=2,
+                    minutes=0,
+                ),
+            ],
+            response.data.projects,
+        )
+        self.assertEqual([], response.data.editors)
+
+    async def test_should_keep_stored_days_across_restarts(self):
+        with patch.object(
+            summary_store.wakatime_api_client, "get_summaries", side_effect=_get_summaries
+        ):
+            _ = await summary_store.get_stats("user", StatsRange.LAST_7_DAYS, TODAY)
+
+        summary_store.close()
+
+        with patch.object(
+            summary_store.wakatime_api_client, "get_summaries", side_effect=_get_summaries
+        ) as get_summaries:
+            response = await summary_store.get_stats("User", StatsRange.LAST_7_DAYS, TODAY)
+
+        self.assertEqual(1, get_summaries.call_count)
+        self.assertEqual(7 * 3600, response.data.projects[0].total_seconds)
+        self.assertEqual(0, len(summary_store._user_locks))  # type: ignore[all]
+
+    async def test_should_serve_summable_ranges_of_stats_cache(self):
+        with patch.object(
+            summary_store.wakatime_api_client, "get_summaries", side_effect=_get_summaries
+        ), patch.object(
+            stats_cache.wakatime_api_client,
+            "get_stats",
+            return_value=WakatimeResponse(WakatimeData([], [], [])),
+        ) as get_stats:
+            last_year = await stats_cache.get_stats("user", StatsRange.LAST_YEAR)
+            _ = await stats_cache.get_stats("user", StatsRange.ALL_TIME)
+
+        self.assertEqual("wakatime-pie", last_year.response.data.projects[0].name)
+        self.assertEqual([StatsRange.ALL_TIME], [call.args[1] for call in get_stats.call_args_list])
+
+
+async def _get_summaries(_: str, start: date, end: date) -> list[WakatimeDailySummary]:
+    summaries: list[WakatimeDailySummary] = []
+    day = start
+
+    while day <= end:
+        projects = [_item("wakatime-pie", 3600)]
+
+        if day.day % 2 == 1:
+            projects.append(_item("Python", 1800))
+
+        summaries.append(WakatimeDailySummary(day, WakatimeData(projects, [_item("Python", 3600)], [])))
+        day += timedelta(days=1)
+
+    return summaries
+
+
+def _item(name: str, total_seconds: float) -> WakatimeItem:
+    return WakatimeItem(total_seconds, name, 0, 0, 0)
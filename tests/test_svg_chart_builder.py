@@ -0,0 +1,56 @@
+from unittest import TestCase
+from xml.etree import ElementTree
+
+from app import svg_chart_builder
+from app.model.chart.chart_format import ChartFormat
+from app.model.wakatime.wakatime_item import WakatimeItem
+
+SVG_NAMESPACE = "{http://www.w3.org/2000/svg}"
+
+# a five-slice donut at the default size
+BYTE_BUDGET: int = 2 * 1024
+
+
+class SvgChartBuilderTest(TestCase):
+
+    def test_should_render_top_items_as_wedges_and_legend(self):
+        data = [_item(f"Project <{index}>", 10 - index) for index in range(8)]
+
+        svg = svg_chart_builder.render_pie_chart(data, {"project <0>": "#ffffff"}, 215, 420)
+        root = ElementTree.fromstring(svg)
+
+        wedges = root.findall(f"{SVG_NAMESPACE}path")
+        labels = [text.text for text in root.iter(f"{SVG_NAMESPACE}text")]
+
+        self.assertEqual("302.4pt", root.get("width"))
+        self.assertEqual("0 0 420 215", root.get("viewBox"))
+        self.assertEqual(5, len(wedges))
+        self.assertEqual("#ffffff", wedges[0].get("fill"))
+        self.assertEqual("Project <0> - 1h 10m", labels[0])
+        self.assertEqual(5, len(labels))
+
+    def test_should_render_single_item_as_full_ring(self):
+        svg = svg_chart_builder.render_pie_chart([_item("Python", 30)], None, None, None)
+        root = ElementTree.fromstring(svg)
+
+        self.assertEqual(1, len(root.findall(f"{SVG_NAMESPACE}circle")))
+        self.assertEqual(0, len(root.findall(f"{SVG_NAMESPACE}path")))
+
+    def test_should_render_within_byte_budget(self):
+        data = [_item(f"project-{index}", 50 - index) for index in range(5)]
+
+        self.assertLess(len(svg_chart_builder.render_pie_chart(data, None, None, None)), BYTE_BUDGET)
+
+    def test_should_reject_raster_formats(self):
+        with self.assertRaises(ValueError):
+            _ = svg_chart_builder.render_pie_chart([_item("Python", 30)], None, None, None, ChartFormat.PNG)
+
+
+def _item(name: str, minutes: int) -> WakatimeItem:
+    return WakatimeItem(
+        total_seconds=3600 + minutes * 60,
+        name=name,
+        percent=float(minutes),
+        hours=1,
+        minutes=minutes,
+    )
@@ -0,0 +1,195 @@
+import asyncio
+import os
+import time
+from datetime import date
+from typing import Any, Callable
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import patch
+
+import httpx
+import orjson
+
+from app.client import http_client
+from app.client import wakatime_api_client
+from app.client.resilience import CircuitBreaker, TokenBucket
+from app.exception.WakatimeRequestRejectedError import WakatimeRequestRejectedError
+from app.exception.WakatimeUnavailableError import WakatimeUnavailableError
+from app.exception.WakatimeUserNotFoundError import WakatimeUserNotFoundError
+from app.model.wakatime.stats_range import StatsRange
+
+STATS: bytes = orjson.dumps({"data": {"projects": [], "languages": [], "editors": []}})
+
+
+class WakatimeApiClientTest(IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.requests: list[httpx.Request] = []
+        self.responses: list[httpx.Response] = []
+        self.patches = [
+            patch.dict(
+                os.environ,
+                {"WAKATIME_BASE_URL": "https://wakatime.test/api/v1", "WAKATIME_API_KEY": "key"},
+            ),
+            patch.object(wakatime_api_client, "rate_limiter", TokenBucket(0, 0)),
+            patch.object(wakatime_api_client, "circuit_breaker", CircuitBreaker(3, 60)),
+            patch.object(wakatime_api_client, "BACKOFF_BASE_SECONDS", 0.001),
+        ]
+
+        for p in self.patches:
+            _ = p.start()
+
+    def tearDown(self):
+        for p in self.patches:
+            p.stop()
+
+    def _serve(self, handler: Callable[[httpx.Request], Any]) -> Any:
+        def record(request: httpx.Request) -> Any:
+            self.requests.append(request)
+            return handler(request)
+
+        return patch.object(
+            http_client, "_client", httpx.AsyncClient(transport=httpx.MockTransport(record))
+        )
+
+    async def test_should_retry_server_errors(self):
+        statuses = iter([503, 502, 200])
+
+        with self._serve(lambda _: httpx.Response(next(statuses), content=STATS)):
+            response = await wakatime_api_client.get_stats("user")
+
+        self.assertEqual([], response.data.projects)
+        self.assertEqual(3, len(self.requests))
+
+    async def test_should_request_stats_of_range(self):
+        with self._serve(lambda _: httpx.Response(200, content=STATS)):
+            _ = await wakatime_api_client.get_stats("user", StatsRange.ALL_TIME)
+
+        self.assertEqual("/api/v1/users/user/stats/all_time", self.requests[0].url.path)
+
+    async def test_should_not_retry_stats_that_are_still_computed(self):
+        with self._serve(lambda _: httpx.Response(202, content=STATS)):
+            with self.assertRaises(WakatimeUnavailableError):
+                _ = await wakatime_api_client.get_stats("user", StatsRange.LAST_YEAR)
+
+        self.assertEqual(1, len(self.requests))
+
+    async def test_should_request_summaries_of_days(self):
+        content = orjson.dumps({"data": [], "start": "2024-05-01", "end": "2024-05-07"})
+
+        with self._serve(lambda _: httpx.Response(200, content=content)):
+            summaries = await wakatime_api_client.get_summaries(
+                "user", date(2024, 5, 1), date(2024, 5, 7)
+            )
+
+        self.assertEqual([], summaries)
+        self.assertEqual("/api/v1/users/user/summaries", self.requests[0].url.path)
+        self.assertEqual(
+            {"start": "2024-05-01", "end": "2024-05-07"}, dict(self.requests[0].url.params)
+        )
+
+    async def test_should_not_retry_unknown_user(self):
+        with self._serve(lambda _: httpx.Response(404)):
+            with self.assertRaises(WakatimeUserNotFoundError):
+                _ = await wakatime_api_client.get_stats("user")
+
+        self.assertEqual(1, len(self.requests))
+
+    async def test_should_not_retry_rejected_requests(self):
+        for status in (400, 401, 403):
+            self.requests.clear()
+
+            with self.subTest(status=status), self._serve(lambda _: httpx.Response(status)):
+                with self.assertRaises(WakatimeRequestRejectedError) as rejected:
+                    _ = await wakatime_api_client.get_stats("user")
+
+                self.assertEqual(status, rejected.exception.status_code)
+                self.assertEqual(1, len(self.requests))
+
+        self.assertFalse(wakatime_api_client.circuit_breaker.is_open())
+
+    async def test_should_keep_circuit_open_when_trial_call_is_throttled(self):
+        breaker = wakatime_api_client.circuit_breaker
+
+        for _ in range(3):
+            breaker.record_failure()
+
+        breaker.opened_at = time.monotonic() - breaker.reset_seconds
+
+        with self._serve(lambda _: httpx.Response(429)), patch.object(
+            wakatime_api_client, "MAX_RETRIES", 0
+        ):
+            with self.assertRaises(WakatimeUnavailableError):
+                _ = await wakatime_api_client.get_stats("user")
+
+        self.assertEqual(1, len(self.requests))
+        self.assertTrue(breaker.is_open())
+        self.assertEqual(3, breaker.failures)
+        self.assertTrue(breaker.allow())
+
+    async def test_should_pause_calls_for_retry_after_of_throttled_response(self):
+        with self._serve(lambda _: httpx.Response(429, headers={"Retry-After": "30"})), patch.object(
+            wakatime_api_client, "rate_limiter", TokenBucket(100, 100)
+        ):
+            with self.assertRaises(WakatimeUnavailableError) as throttled:
+                _ = await wakatime_api_client.get_stats("user")
+
+            with self.assertRaises(WakatimeUnavailableError):
+                _ = await wakatime_api_client.get_stats("user")
+
+        # retrying within the deadline is impossible, so the second call doesn't reach Wakatime at all
+        self.assertEqual(1, len(self.requests))
+        self.assertEqual(30, throttled.exception.retry_after)
+
+    async def test_should_stop_calls_while_circuit_is_open(self):
+        with self._serve(lambda _: httpx.Response(500)), patch.object(
+            wakatime_api_client, "MAX_RETRIES", 0
+        ):
+            for _ in range(3):
+                with self.assertRaises(WakatimeUnavailableError):
+                    _ = await wakatime_api_client.get_stats("user")
+
+            with self.assertRaises(WakatimeUnavailableError) as rejected:
+                _ = await wakatime_api_client.get_stats("user")
+
+        self.assertEqual(3, len(self.requests))
+        self.assertGreater(rejected.exception.retry_after, 0)
+
+    async def test_should_bound_latency_of_hanging_upstream(self):
+        async def hang(_: httpx.Request) -> httpx.Response:
+            await asyncio.sleep(10)
+            return httpx.Response(200, content=STATS)
+
+        start = time.monotonic()
+
+        with self._serve(hang), patch.object(wakatime_api_client, "DEADLINE_SECONDS", 0.2):
+            with self.assertRaises(WakatimeUnavailableError):
+                _ = await wakatime_api_client.get_stats("user")
+
+        self.assertLess(time.monotonic() - start, 1)
+
+    async def test_should_not_count_cancelled_calls_as_failures(self):
+        async def hang(_: httpx.Request) -> httpx.Response:
+            await asyncio.sleep(10)
+            return httpx.Response(200, content=STATS)
+
+        with self._serve(hang):
+            for _ in range(3):
+                call = asyncio.create_task(wakatime_api_client.get_stats("user"))
+                await asyncio.sleep(0.01)
+                _ = call.cancel()
+
+                with self.assertRaises(asyncio.CancelledError):
+                    _ = await call
+
+        self.assertEqual(3, len(self.requests))
+        self.assertEqual(0, wakatime_api_client.circuit_breaker.failures)
+
+    async def test_should_not_call_once_deadline_passed(self):
+        with self._serve(lambda _: httpx.Response(200, content=STATS)), patch.object(
+            wakatime_api_client, "DEADLINE_SECONDS", 0
+        ):
+            with self.assertRaises(WakatimeUnavailableError):
+                _ = await wakatime_api_client.get_stats("user")
+
+        self.assertEqual([], self.requests)
+        self.assertEqual(0, wakatime_api_client.circuit_breaker.failures)
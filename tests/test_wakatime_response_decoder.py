@@ -0,0 +1,159 @@
+import tracemalloc
+from datetime import date
+from typing import Any
+from unittest import TestCase
+
+import orjson
+
+from app.client import wakatime_response_decoder
+from app.exception.WakatimeResponseMalformedError import WakatimeResponseMalformedError
+from app.model.wakatime.wakatime_item import WakatimeItem
+
+
+class WakatimeResponseDecoderTest(TestCase):
+
+    def test_should_decode_charted_sections_only(self):
+        payload = _payload()
+        payload["data"]["categories"] = [{"name": "Coding"}]
+        payload["data"]["range"] = "last_7_days"
+
+        response = wakatime_response_decoder.decode(orjson.dumps(payload))
+
+        self.assertEqual(
+            [
+                WakatimeItem(
+                    total_seconds=38520.0,
+                    name="wakatime-pie",
+                    percent=61.37,
+                    hours=10,
+                    minutes=42,
+                )
+            ],
+            response.data.projects,
+        )
+        self.assertEqual("Python", response.data.languages[0].name)
+        self.assertEqual([], response.data.editors)
+        self.assertFalse(hasattr(response.data, "categories"))
+
+    def test_should_format_text_fields_from_hours_and_minutes(self):
+        response = wakatime_response_decoder.decode(orjson.dumps(_payload()))
+        item = response.data.projects[0]
+
+        short_item = WakatimeItem(total_seconds=2340.0, name="vim", percent=1.0, hours=0, minutes=39)
+
+        self.assertEqual(("10:42", "10.70", "10 hrs 42 mins"), (item.digital, item.decimal, item.text))
+        self.assertEqual(("0:39", "0.65", "39 mins"), (short_item.digital, short_item.decimal, short_item.text))
+
+    def test_should_keep_decoded_items_small(self):
+        payload = _payload()
+        payload["data"]["projects"] = [
+            dict(payload["data"]["projects"][0], name=f"project-{i}") for i in range(10_000)
+        ]
+        content = orjson.dumps(payload)
+
+        tracemalloc.start()
+
+        try:
+            response = wakatime_response_decoder.decode(content)
+            allocated, _ = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        # the item, its numbers, its name and its list slot, the text fields used to add about 170 bytes
+        self.assertFalse(hasattr(response.data.projects[0], "__dict__"))
+        self.assertLess(allocated / len(response.data.projects), 220)
+
+    def test_should_accept_integer_numbers(self):
+        payload = _payload()
+        payload["data"]["projects"][0]["total_seconds"] = 38520
+
+        response = wakatime_response_decoder.decode(orjson.dumps(payload))
+
+        self.assertIsInstance(response.data.projects[0].total_seconds, float)
+
+    def test_should_name_missing_field(self):
+        payload = _payload()
+        del payload["data"]["languages"][0]["hours"]
+
+        with self.assertRaisesRegex(
+            WakatimeResponseMalformedError, r"^data\.languages\[0\]\.hours is missing$"
+        ):
+            _ = wakatime_response_decoder.decode(orjson.dumps(payload))
+
+    def test_should_name_mistyped_field(self):
+        for field, value in (("percent", True), ("percent", "61.37"), ("minutes", 42.0), ("name", None)):
+            payload = _payload()
+            payload["data"]["projects"][0][field] = value
+
+            with self.subTest(field=field, value=value), self.assertRaisesRegex(
+                WakatimeResponseMalformedError, rf"^data\.projects\[0\]\.{field} should be"
+            ):
+                _ = wakatime_response_decoder.decode(orjson.dumps(payload))
+
+    def test_should_reject_malformed_structure(self):
+        for content, message in (
+            (b"<html>", "isn't valid JSON"),
+            (b'{"error": "Not found"}', r"^response\.data is missing$"),
+            (b'{"data": []}', r"^response\.data should be an object, got list$"),
+            (b'{"data": {"projects": [], "languages": []}}', r"^data\.editors is missing$"),
+            (b'{"data": {"projects": [1], "languages": [], "editors": []}}', r"^data\.projects\[0\] should be an object"),
+        ):
+            with self.subTest(content=content), self.assertRaisesRegex(
+                WakatimeResponseMalformedError, message
+            ):
+                _ = wakatime_response_decoder.decode(content)
+
+    def test_should_decode_daily_summaries(self):
+        summary = _payload()["data"]
+        summary["range"] = {"date": "2024-05-01", "timezone": "UTC"}
+
+        summaries = wakatime_response_decoder.decode_summaries(orjson.dumps({"data": [summary]}))
+
+        self.assertEqual(1, len(summaries))
+        self.assertEqual(date(2024, 5, 1), summaries[0].day)
+        self.assertEqual("wakatime-pie", summaries[0].data.projects[0].name)
+
+    def test_should_name_malformed_summary_field(self):
+        for day, message in (
+            (None, r"^data\[0\]\.range\.date should be a string, got NoneType$"),
+            ("yesterday", r"^data\[0\]\.range\.date should be an ISO date"),
+        ):
+            summary = _payload()["data"]
+            summary["range"] = {"date": day}
+
+            with self.subTest(day=day), self.assertRaisesRegex(WakatimeResponseMalformedError, message):
+                _ = wakatime_response_decoder.decode_summaries(orjson.dumps({"data": [summary]}))
+
+
+
+def _payload() -> dict[str, Any]:
+    return {
+        "data": {
+            "projects": [
+                {
+                    "total_seconds": 38520.0,
+                    "name": "wakatime-pie",
+                    "percent": 61.37,
+                    "digital": "10:42",
+                    "decimal": "10.70",
+                    "text": "10 hrs 42 mins",
+                    "hours": 10,
+                    "minutes": 42,
+                    "color": None,
+                }
+            ],
+            "languages": [
+                {
+                    "total_seconds": 17100.0,
+                    "name": "Python",
+                    "percent": 27.24,
+                    "digital": "4:45",
+                    "decimal": "4.75",
+                    "text": "4 hrs 45 mins",
+                    "hours": 4,
+                    "minutes": 45,
+                }
+            ],
+            "editors": [],
+        }
+    }